@@ -9,7 +9,15 @@ from blueprints.demands import demands_bp
 from blueprints.reports import reports_bp
 from blueprints.tracker import tracker_bp
 from config import Config
-from extensions import mysql
+from extensions import (
+    cache,
+    mysql,
+    query_log,
+    request_metrics,
+    static_assets,
+    template_cache,
+)
+from rollups import rollups_cli
 
 
 def create_app(config_class=Config):
@@ -24,6 +32,11 @@ def create_app(config_class=Config):
 
     # Inicializa as extensões com o app
     mysql.init_app(app)
+    cache.init_app(app)
+    request_metrics.init_app(app)
+    query_log.init_app(app)
+    static_assets.init_app(app)
+    template_cache.init_app(app)
 
     # Rota Global simplificada
     @app.route("/")
@@ -36,6 +49,9 @@ def create_app(config_class=Config):
     app.register_blueprint(tracker_bp, url_prefix="/tracker")
     app.register_blueprint(reports_bp, url_prefix="/reports")
 
+    # Comandos de manutenção (ex.: flask rollups rebuild)
+    app.cli.add_command(rollups_cli)
+
     return app
 
 
@@ -0,0 +1,221 @@
+# assets.py
+# Arquivos estáticos com hash de conteúdo no nome (fingerprint).
+#
+# `flask assets build` copia static/ para static/dist/ como
+# <nome>.<hash>.<ext>, gera variantes .gz/.br dos arquivos de texto e .webp
+# das imagens, e grava um manifest.json. Com o manifest presente:
+#   - url_for("static", filename="style.css") aponta para a cópia com hash;
+#   - /static/dist/... é servido com Cache-Control immutable (o nome muda a
+#     cada alteração do conteúdo) e na melhor codificação aceita pelo
+#     navegador.
+# Sem o manifest (ex.: desenvolvimento), nada muda no url_for.
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+import click
+from flask import current_app, request, send_from_directory
+from flask.cli import AppGroup, with_appcontext
+
+DIST_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+
+# Arquivos que não são publicados (planilhas e afins deixados em static/).
+EXCLUDED_EXTENSIONS = {".xlsx", ".xls", ".csv", ".zip"}
+
+# Tipos de texto que valem a pena comprimir.
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg", ".json", ".txt", ".map"}
+
+# Imagens convertidas para WebP (quando o Pillow está instalado).
+WEBP_SOURCE_EXTENSIONS = {".png", ".jpg", ".jpeg"}
+
+# Variantes em ordem de preferência: (Content-Encoding, sufixo do arquivo).
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def _fingerprint(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def _hashed_name(relpath, digest):
+    root, ext = os.path.splitext(relpath)
+    return f"{root}.{digest}{ext}"
+
+
+def _compress(path):
+    """Grava as variantes .gz e (se o brotli estiver instalado) .br."""
+    with open(path, "rb") as f:
+        data = f.read()
+    encodings = []
+
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+    if brotli is not None:
+        compressed = brotli.compress(data, quality=11)
+        if len(compressed) < len(data):
+            with open(path + ".br", "wb") as f:
+                f.write(compressed)
+            encodings.append("br")
+
+    # mtime=0: a mesma entrada gera sempre o mesmo .gz
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(compressed) < len(data):
+        with open(path + ".gz", "wb") as f:
+            f.write(compressed)
+        encodings.append("gzip")
+    return encodings
+
+
+def _webp(source, target):
+    """Converte a imagem para WebP; devolve False sem o Pillow ou se não compensar."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return False
+    with Image.open(source) as image:
+        image.save(target, "WEBP", quality=85, method=6)
+    if os.path.getsize(target) >= os.path.getsize(source):
+        os.remove(target)
+        return False
+    return True
+
+
+def build(static_folder, log=print):
+    """
+    Gera static/dist/ e o manifest.json a partir de static/. Retorna o
+    manifest: {arquivo original: {"path", "encodings", "webp"}}.
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    shutil.rmtree(dist, ignore_errors=True)
+    os.makedirs(dist)
+
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != dist)
+        for filename in sorted(files):
+            source = os.path.join(root, filename)
+            relpath = os.path.relpath(source, static_folder).replace(os.sep, "/")
+            ext = os.path.splitext(filename)[1].lower()
+            if ext in EXCLUDED_EXTENSIONS:
+                log(f"ignorado: {relpath}")
+                continue
+
+            hashed = _hashed_name(relpath, _fingerprint(source))
+            target = os.path.join(dist, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(source, target)
+
+            entry = {"path": hashed, "encodings": [], "webp": None}
+            if ext in COMPRESSIBLE_EXTENSIONS:
+                entry["encodings"] = _compress(target)
+            if ext in WEBP_SOURCE_EXTENSIONS:
+                webp = os.path.splitext(hashed)[0] + ".webp"
+                if _webp(source, os.path.join(dist, webp)):
+                    entry["webp"] = webp
+            manifest[relpath] = entry
+            log(f"{relpath} -> {hashed}")
+
+    with open(os.path.join(dist, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_folder):
+    path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {}
+    # Índice reverso para o servidor: caminho com hash -> entrada
+    return {
+        "files": manifest,
+        "hashed": {entry["path"]: entry for entry in manifest.values()},
+    }
+
+
+def _url_defaults(endpoint, values):
+    if endpoint != "static" or "filename" not in values:
+        return
+    manifest = current_app.extensions["assets"]
+    entry = manifest["files"].get(values["filename"])
+    if entry is not None:
+        values["filename"] = f"{DIST_DIR}/{entry['path']}"
+
+
+def _accepts_webp():
+    return "image/webp" in request.headers.get("Accept", "")
+
+
+def serve_dist(filename):
+    """Arquivo com hash, na variante aceita pelo navegador e com cache eterno."""
+    entry = current_app.extensions["assets"]["hashed"].get(filename)
+    dist = os.path.join(current_app.static_folder, DIST_DIR)
+    if entry is None:
+        return send_from_directory(dist, filename)
+
+    served, encoding, vary = filename, None, []
+    if entry["webp"]:
+        vary.append("Accept")
+        if _accepts_webp():
+            served = entry["webp"]
+    if entry["encodings"]:
+        vary.append("Accept-Encoding")
+        for name, suffix in ENCODINGS:
+            if name in entry["encodings"] and name in request.accept_encodings:
+                served, encoding = filename + suffix, name
+                break
+
+    response = send_from_directory(dist, served, max_age=IMMUTABLE_MAX_AGE)
+    if encoding:
+        # O tipo é o do arquivo original, não o do .gz/.br
+        response.headers["Content-Encoding"] = encoding
+        response.mimetype = mimetypes.guess_type(filename)[0]
+    if vary:
+        response.vary.update(vary)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+class Assets:
+    """Extensão Flask: url_for com fingerprint e a rota de /static/dist."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.cli.add_command(assets_cli)
+        manifest = load_manifest(app.static_folder)
+        if not manifest:
+            return
+        app.extensions["assets"] = manifest
+        app.url_defaults(_url_defaults)
+        app.add_url_rule(
+            f"{app.static_url_path}/{DIST_DIR}/<path:filename>",
+            "assets",
+            serve_dist,
+        )
+
+
+assets_cli = AppGroup("assets", help="Arquivos estáticos com fingerprint.")
+
+
+@assets_cli.command("build")
+@with_appcontext
+def build_command():
+    """Gera static/dist/ (cópias com hash, .gz/.br, .webp) e o manifest."""
+    manifest = build(current_app.static_folder, log=click.echo)
+    click.echo(f"{len(manifest)} arquivos em {DIST_DIR}/.")
@@ -0,0 +1,228 @@
+# benchmarks/concurrency.py
+# Vazão (req/s) e latência de cauda do gunicorn em cada tipo de worker, com o
+# mesmo número de workers, contra o MySQL de benchmarks/routes.py. O RSS
+# somado do master e dos workers é medido ao fim de cada carga, para comparar
+# os modos com a mesma memória.
+#
+# N clientes simultâneos repetem as rotas de leitura de LOAD_ROUTES durante
+# alguns segundos. Um MySQL local responde em microssegundos; para reproduzir
+# a espera pelo servidor remoto, --query-delay-ms atrasa cada query (com
+# gevent, o atraso cede a vez às outras requisições do worker, como a espera
+# real pela rede).
+#
+#   python -m benchmarks.concurrency --query-delay-ms 20
+#   python -m benchmarks.concurrency --mode sync --mode gevent --clients 64 --json
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import quote
+
+import metrics
+from app import create_app
+from benchmarks.routes import ROUTES, BenchConfig, percentile, sample_context
+from extensions import mysql
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Rotas GET de leitura usadas como carga.
+LOAD_ROUTES = (
+    "demands.dashboard",
+    "demands.detail",
+    "demands.work_history",
+    "demands.api_list",
+    "demands.search_demands",
+    "tracker.index",
+    "reports.index",
+    "reports.summary",
+)
+
+# GUNICORN_WORKER_CLASS de cada modo (ver gunicorn.conf.py).
+MODES = ("sync", "gthread", "gevent")
+
+
+def bench_app():
+    """App servido pelo gunicorn em cada modo (com o atraso nas queries)."""
+    app = create_app(BenchConfig)
+    delay = float(os.environ.get("BENCH_QUERY_DELAY_MS", "0")) / 1000
+    if delay:
+        # Só o atraso: a medição das queries continua com o wrapper do app
+        pool = app.extensions["mysql"]
+        pool._connect = metrics.instrument_connect(
+            pool._connect, on_query=None, before_query=lambda: time.sleep(delay)
+        )
+    return app
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _rss_mb(pid):
+    """RSS do processo e de seus filhos (master do gunicorn e workers)."""
+    total = 0
+    pids = [pid]
+    while pids:
+        current = pids.pop()
+        try:
+            with open(f"/proc/{current}/status") as status:
+                line = next(row for row in status if row.startswith("VmRSS:"))
+            total += int(line.split()[1])
+            with open(f"/proc/{current}/task/{current}/children") as children:
+                pids.extend(int(child) for child in children.read().split())
+        except (OSError, StopIteration):
+            continue
+    return total / 1024
+
+
+def start_server(mode, workers, threads, query_delay_ms):
+    port = _free_port()
+    env = dict(
+        os.environ,
+        GUNICORN_WORKER_CLASS=mode,
+        GUNICORN_THREADS=str(threads),
+        BENCH_QUERY_DELAY_MS=str(query_delay_ms),
+    )
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "--workers",
+            str(workers),
+            "--bind",
+            f"127.0.0.1:{port}",
+            "--log-level",
+            "warning",
+            "benchmarks.concurrency:bench_app()",
+        ],
+        cwd=ROOT_DIR,
+        env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/auth/login")
+            conn.getresponse().read()
+            return process, port
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError(f"gunicorn ({mode}) encerrou ao iniciar")
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"gunicorn ({mode}) não respondeu em 30 s")
+
+
+def run_load(port, urls, clients, seconds):
+    """Latências (s) das respostas bem-sucedidas e número de erros."""
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def client(offset):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        local, failed = [], 0
+        i = offset
+        while time.monotonic() < deadline:
+            url = urls[i % len(urls)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                conn.request("GET", url)
+                response = conn.getresponse()
+                response.read()
+                ok = response.status < 500
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                ok = False
+            if ok:
+                local.append(time.perf_counter() - start)
+            else:
+                failed += 1
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [
+        threading.Thread(target=client, args=(n,), daemon=True) for n in range(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0]
+
+
+def measure_mode(mode, urls, args):
+    process, port = start_server(mode, args.workers, args.threads, args.query_delay_ms)
+    try:
+        # Aquecimento: conexões do pool, templates e caches de cada worker
+        run_load(port, urls, args.clients, args.warmup)
+        latencies, errors = run_load(port, urls, args.clients, args.seconds)
+        rss_mb = _rss_mb(process.pid)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    latencies_ms = [value * 1000 for value in latencies]
+    return {
+        "requests": len(latencies_ms),
+        "errors": errors,
+        "rps": len(latencies_ms) / args.seconds,
+        "p50_ms": percentile(latencies_ms, 50),
+        "p95_ms": percentile(latencies_ms, 95),
+        "p99_ms": percentile(latencies_ms, 99),
+        "rss_mb": rss_mb,
+    }
+
+
+def print_table(results):
+    print(
+        f"{'modo':<10} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+        f"{'p99 ms':>8} {'erros':>6} {'RSS MB':>8}"
+    )
+    for mode, r in results.items():
+        print(
+            f"{mode:<10} {r['rps']:>8.1f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+            f"{r['p99_ms']:>8.2f} {r['errors']:>6} {r['rss_mb']:>8.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos tipos de worker.")
+    parser.add_argument("--mode", action="append", choices=MODES)
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=8, help="Modo gthread")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--query-delay-ms", type=float, default=0)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        ctx = sample_context(mysql.connection)
+    urls = [quote(ROUTES[name](ctx, 0)[1], safe="/?&=,:") for name in LOAD_ROUTES]
+
+    results = {}
+    for mode in args.mode or MODES:
+        results[mode] = measure_mode(mode, urls, args)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+# benchmarks/dataset.py
+# Gerador de dados sintéticos em volume de produção (ou maior) para o banco
+# descartável dos benchmarks. NUNCA aponte para um banco com dados reais:
+# reset_schema() apaga todas as tabelas.
+#
+# Exemplo (10 milhões de work_logs):
+#   python -m benchmarks.dataset --reset --demands 100000 --sessions 4000000 \
+#       --work-logs 10000000 --attachments 60000 --years 4
+#
+# Com --method infile (padrão do comando) os dados são gravados em CSVs
+# temporários e carregados com LOAD DATA LOCAL INFILE; o servidor precisa de
+# local_infile=ON. Com --method insert usa INSERTs de várias linhas.
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+from array import array
+from datetime import datetime, timedelta
+
+import MySQLdb
+
+import rollups
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SCHEMA_PATH = os.path.join(ROOT_DIR, "sql", "schema.sql")
+
+# Ordem de remoção respeitando as chaves estrangeiras.
+TABLES = (
+    "demand_events",
+    "export_jobs",
+    "data_versions",
+    "daily_demand_minutes",
+    "daily_session_minutes",
+    "work_logs",
+    "work_sessions",
+    "attachments",
+    "demands",
+    "users",
+)
+
+STATUSES = ("Em Fila", "Em Execução", "Concluída", "Cancelada")
+# Demandas recentes ainda estão na fila; as antigas, quase todas encerradas.
+RECENT_DAYS = 90
+RECENT_STATUS_WEIGHTS = (0.45, 0.2, 0.3, 0.05)
+OLD_STATUS_WEIGHTS = (0.04, 0.01, 0.85, 0.1)
+
+# Expoente da distribuição de Zipf: poucas demandas concentram a maior parte
+# das horas e dos anexos.
+ZIPF_EXPONENT = 1.1
+
+# Sessões acontecem em dias úteis, dentro do expediente.
+WORKDAY_START_HOUR = 8
+WORKDAY_SECONDS = 10 * 3600
+
+LOG_MINUTES = (10, 120)
+LOG_DESCRIPTIONS = (
+    "Análise de requisitos",
+    "Desenvolvimento",
+    "Revisão de código",
+    "Testes",
+    "Reunião de alinhamento",
+    "Correção de defeito",
+    "Documentação",
+    "Deploy e acompanhamento",
+)
+
+INSERT_BATCH_SIZE = 5000
+CHUNK_SESSIONS = 50000
+
+
+def connect(**overrides):
+    """Conexão direta (fora do pool) com o banco de benchmark."""
+    settings = {
+        "host": os.environ.get("BENCH_MYSQL_HOST", "127.0.0.1"),
+        "port": int(os.environ.get("BENCH_MYSQL_PORT", "3306")),
+        "user": os.environ.get("BENCH_MYSQL_USER", "root"),
+        "passwd": os.environ.get("BENCH_MYSQL_PASSWORD", ""),
+        "db": os.environ.get("BENCH_MYSQL_DB", "demand_tracker_bench"),
+        "charset": "utf8mb4",
+    }
+    settings.update(overrides)
+    return MySQLdb.connect(**settings)
+
+
+def schema_statements(path=SCHEMA_PATH):
+    with open(path, encoding="utf-8") as f:
+        lines = [line for line in f if not line.lstrip().startswith("--")]
+    return [stmt.strip() for stmt in "".join(lines).split(";") if stmt.strip()]
+
+
+def reset_schema(conn):
+    cur = conn.cursor()
+    cur.execute("SET FOREIGN_KEY_CHECKS = 0")
+    for table in TABLES:
+        cur.execute(f"DROP TABLE IF EXISTS `{table}`")
+    cur.execute("SET FOREIGN_KEY_CHECKS = 1")
+    for statement in schema_statements():
+        cur.execute(statement)
+    conn.commit()
+    cur.close()
+
+
+def insert_rows(cur, table, columns, rows, batch_size=INSERT_BATCH_SIZE):
+    """INSERT de várias linhas por comando, em lotes de `batch_size`."""
+    placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    prefix = f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            cur.execute(prefix + ", ".join([placeholders] * len(batch)), _flat(batch))
+            batch = []
+    if batch:
+        cur.execute(prefix + ", ".join([placeholders] * len(batch)), _flat(batch))
+
+
+def _flat(rows):
+    return tuple(value for row in rows for value in row)
+
+
+def load_infile(cur, table, columns, rows):
+    """Grava as linhas em um CSV temporário e carrega com LOAD DATA LOCAL INFILE."""
+    with tempfile.NamedTemporaryFile(
+        "w", suffix=".csv", newline="", encoding="utf-8", delete=False
+    ) as f:
+        writer = csv.writer(f, lineterminator="\n")
+        for row in rows:
+            writer.writerow(["\\N" if value is None else value for value in row])
+        path = f.name
+    try:
+        cur.execute(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} "
+            "CHARACTER SET utf8mb4 "
+            "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+            f"LINES TERMINATED BY '\\n' ({', '.join(columns)})",
+            (path,),
+        )
+    finally:
+        os.unlink(path)
+
+
+class _Loader:
+    def __init__(self, cur, method):
+        if method not in ("insert", "infile"):
+            raise ValueError(f"Método de carga desconhecido: {method}")
+        self.cur = cur
+        self.method = method
+        self.rows = {}
+
+    def load(self, table, columns, rows):
+        if self.method == "infile":
+            load_infile(self.cur, table, columns, rows)
+        else:
+            insert_rows(self.cur, table, columns, rows)
+        self.rows[table] = self.rows.get(table, 0) + len(rows)
+
+
+def zipf_cum_weights(n, exponent=ZIPF_EXPONENT):
+    total = 0.0
+    cum_weights = []
+    for rank in range(1, n + 1):
+        total += 1 / rank**exponent
+        cum_weights.append(total)
+    return cum_weights
+
+
+def split_counts(rng, total, parts):
+    """
+    Divide `total` em `parts` inteiros >= 1 com soma exata, com variação
+    aleatória em torno da média.
+    """
+    if parts <= 0 or total < parts:
+        raise ValueError("São necessárias ao menos tantas unidades quanto partes.")
+    # Pontos de corte aleatórios sobre os `total - parts` itens excedentes
+    extra = total - parts
+    cuts = sorted(rng.randint(0, extra) for _ in range(parts - 1))
+    bounds = [0] + cuts + [extra]
+    return [1 + bounds[i + 1] - bounds[i] for i in range(parts)]
+
+
+def _workdays(start, end):
+    day = start
+    days = []
+    while day <= end:
+        if day.weekday() < 5:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def _session_starts(rng, count, workdays):
+    """
+    Instantes de início em ordem cronológica (os ids seguem o tempo, como
+    em produção): intervalos exponenciais sobre o tempo útil acumulado.
+    """
+    span = len(workdays) * WORKDAY_SECONDS
+    rate = count / span
+    offset = 0.0
+    for _ in range(count):
+        offset = min(offset + rng.expovariate(rate), span - 1)
+        day_index, second = divmod(int(offset), WORKDAY_SECONDS)
+        yield workdays[day_index] + timedelta(hours=WORKDAY_START_HOUR, seconds=second)
+
+
+def generate(
+    conn,
+    demands=2000,
+    sessions=20000,
+    work_logs=50000,
+    attachments=500,
+    years=2,
+    method="insert",
+    seed=42,
+    log=None,
+):
+    """
+    Popula um banco vazio (ver reset_schema) e reconstrói as tabelas de
+    totais diários. Retorna o número de linhas gravadas por tabela.
+    """
+    if work_logs < sessions:
+        raise ValueError("work_logs deve ser maior ou igual a sessions.")
+    log = log or (lambda message: None)
+    rng = random.Random(seed)
+    now = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    first_day = now - timedelta(days=365 * years)
+    workdays = _workdays(first_day, now - timedelta(days=1))
+
+    # Demandas em ordem de popularidade aleatória, pesos de Zipf por posição
+    popularity = list(range(1, demands + 1))
+    rng.shuffle(popularity)
+    cum_weights = zipf_cum_weights(demands)
+
+    minutes_by_demand = array("q", [0]) * (demands + 1)
+    first_use = array("d", [0.0]) * (demands + 1)
+
+    conn.autocommit(False)
+    cur = conn.cursor()
+    cur.execute("SET SESSION foreign_key_checks = 0, unique_checks = 0")
+    loader = _Loader(cur, method)
+
+    started = time.monotonic()
+    logs_per_session = split_counts(rng, work_logs, sessions)
+    starts = _session_starts(rng, sessions, workdays)
+    log_id = 0
+    for chunk_start in range(0, sessions, CHUNK_SESSIONS):
+        chunk_end = min(chunk_start + CHUNK_SESSIONS, sessions)
+        counts = logs_per_session[chunk_start:chunk_end]
+        picks = iter(rng.choices(popularity, cum_weights=cum_weights, k=sum(counts)))
+
+        session_rows = []
+        log_rows = []
+        for session_id, count in enumerate(counts, start=chunk_start + 1):
+            start_time = next(starts)
+            total = 0
+            for _ in range(count):
+                demand_id = next(picks)
+                minutes = rng.randint(*LOG_MINUTES)
+                total += minutes
+                log_id += 1
+                log_rows.append(
+                    (
+                        log_id,
+                        session_id,
+                        demand_id,
+                        minutes,
+                        rng.choice(LOG_DESCRIPTIONS),
+                        None,
+                    )
+                )
+                minutes_by_demand[demand_id] += minutes
+                if not first_use[demand_id]:
+                    first_use[demand_id] = start_time.timestamp()
+            session_rows.append(
+                (session_id, start_time, start_time + timedelta(minutes=total), total)
+            )
+
+        loader.load(
+            "work_sessions",
+            ("id", "start_time", "end_time", "total_minutes"),
+            session_rows,
+        )
+        loader.load(
+            "work_logs",
+            (
+                "id",
+                "work_session_id",
+                "demand_id",
+                "minutes_spent",
+                "description",
+                "status_changed_to",
+            ),
+            log_rows,
+        )
+        conn.commit()
+        log(f"sessões {chunk_end}/{sessions}, logs {log_id}/{work_logs}")
+
+    # Demandas: criadas antes do primeiro trabalho registrado nelas
+    demand_rows = []
+    queue_position = 0
+    span_seconds = (now - first_day).total_seconds()
+    for demand_id in range(1, demands + 1):
+        if first_use[demand_id]:
+            first = datetime.fromtimestamp(first_use[demand_id])
+            created_at = max(
+                first_day, first - timedelta(seconds=rng.randrange(30 * 86400))
+            )
+        else:
+            created_at = first_day + timedelta(seconds=rng.random() * span_seconds)
+        recent = (now - created_at).days <= RECENT_DAYS
+        weights = RECENT_STATUS_WEIGHTS if recent else OLD_STATUS_WEIGHTS
+        status = rng.choices(STATUSES, weights)[0]
+        queue_position += status in ("Em Fila", "Em Execução")
+        minutes = minutes_by_demand[demand_id]
+        demand_rows.append(
+            (
+                demand_id,
+                f"Demanda {demand_id}",
+                f"Descrição da demanda sintética {demand_id}",
+                status,
+                queue_position * 1024,
+                round(max(1.0, minutes / 60 * rng.uniform(0.6, 1.5)), 2),
+                round(minutes / 60, 2),
+                created_at.replace(microsecond=0),
+            )
+        )
+    loader.load(
+        "demands",
+        (
+            "id",
+            "title",
+            "description",
+            "status",
+            "priority",
+            "estimated_hours",
+            "executed_hours",
+            "created_at",
+        ),
+        demand_rows,
+    )
+
+    attachment_rows = []
+    for attachment_id, demand_id in enumerate(
+        rng.choices(popularity, cum_weights=cum_weights, k=attachments), start=1
+    ):
+        filename = f"anexo-{attachment_id}.pdf"
+        attachment_rows.append(
+            (
+                attachment_id,
+                demand_id,
+                filename,
+                f"https://bench.s3.amazonaws.com/demands/{demand_id}/{filename}",
+            )
+        )
+    loader.load(
+        "attachments", ("id", "demand_id", "filename", "filepath"), attachment_rows
+    )
+    conn.commit()
+    log(f"demandas e anexos gravados ({time.monotonic() - started:.0f}s)")
+
+    rollups.rebuild(cur)
+    cur.execute("SET SESSION foreign_key_checks = 1, unique_checks = 1")
+    conn.commit()
+    cur.close()
+    log(f"totais diários reconstruídos ({time.monotonic() - started:.0f}s)")
+    return loader.rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gerador de dados sintéticos.")
+    parser.add_argument("--demands", type=int, default=100000)
+    parser.add_argument("--sessions", type=int, default=4000000)
+    parser.add_argument("--work-logs", type=int, default=10000000)
+    parser.add_argument("--attachments", type=int, default=60000)
+    parser.add_argument("--years", type=int, default=4)
+    parser.add_argument("--method", choices=("infile", "insert"), default="infile")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="Recria as tabelas")
+    args = parser.parse_args()
+
+    conn = connect(local_infile=1) if args.method == "infile" else connect()
+    try:
+        if args.reset:
+            reset_schema(conn)
+        started = time.monotonic()
+        rows = generate(
+            conn,
+            demands=args.demands,
+            sessions=args.sessions,
+            work_logs=args.work_logs,
+            attachments=args.attachments,
+            years=args.years,
+            method=args.method,
+            seed=args.seed,
+            log=print,
+        )
+    finally:
+        conn.close()
+
+    elapsed = time.monotonic() - started
+    total = sum(rows.values())
+    for table, count in rows.items():
+        print(f"{table:<15} {count:>12,}")
+    print(f"{total:,} linhas em {elapsed:.0f}s ({total / elapsed:,.0f} linhas/s)")
+
+
+if __name__ == "__main__":
+    main()
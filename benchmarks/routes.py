@@ -0,0 +1,437 @@
+# benchmarks/routes.py
+# Benchmark das rotas dos blueprints contra um MySQL local descartável.
+#
+# Mede latência (p50/p95/p99) e número de queries por rota, com o SQL real
+# de demands, tracker e reports. Exemplo com um servidor temporário:
+#
+#   docker run --rm -d -p 3307:3306 -e MYSQL_ALLOW_EMPTY_PASSWORD=yes \
+#       -e MYSQL_DATABASE=demand_tracker_bench mysql:8.0
+#   BENCH_MYSQL_PORT=3307 python -m benchmarks.routes --reset
+#   (ou popule antes em escala com python -m benchmarks.dataset)
+#   python -m benchmarks.routes --save-baseline      # grava a referência
+#   python -m benchmarks.routes --compare            # falha em regressões
+#
+# A rota de criação de demandas (upload para o S3) não entra no benchmark;
+# as demais rotas dos blueprints devem estar em ROUTES (ver UNMEASURED).
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import timedelta
+
+import MySQLdb
+import MySQLdb.cursors
+
+import metrics
+from app import create_app
+from benchmarks import dataset
+from config import Config
+from extensions import mysql
+from pagination import encode_cursor
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "routes.json")
+
+# Tolerância sobre o p95 da referência antes de acusar regressão, e variação
+# mínima em milissegundos (abaixo disso é ruído de medição).
+REGRESSION_TOLERANCE = float(os.environ.get("BENCH_REGRESSION_TOLERANCE", "0.2"))
+REGRESSION_MIN_DELTA_MS = float(os.environ.get("BENCH_REGRESSION_MIN_DELTA_MS", "1.0"))
+
+
+class BenchConfig(Config):
+    MYSQL_HOST = os.environ.get("BENCH_MYSQL_HOST", "127.0.0.1")
+    MYSQL_PORT = int(os.environ.get("BENCH_MYSQL_PORT", "3306"))
+    MYSQL_USER = os.environ.get("BENCH_MYSQL_USER", "root")
+    MYSQL_PASSWORD = os.environ.get("BENCH_MYSQL_PASSWORD", "")
+    MYSQL_DB = os.environ.get("BENCH_MYSQL_DB", "demand_tracker_bench")
+    # Sem cache por padrão: o objetivo é medir o SQL de cada rota.
+    CACHE_BACKEND = os.environ.get("BENCH_CACHE_BACKEND", "null")
+
+
+class QueryCounter:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def record(self, seconds, query=None, args=None, many=False):
+        self.count += 1
+        self.seconds += seconds
+
+
+def instrument(app, counter):
+    # As conexões novas do pool passam a ser medidas também pelo contador.
+    pool = app.extensions["mysql"]
+    pool._connect = metrics.instrument_connect(pool._connect, on_query=counter.record)
+
+
+def sample_context(conn):
+    """IDs e datas reais do banco usados para montar as requisições."""
+    cur = conn.cursor(MySQLdb.cursors.DictCursor)
+    cur.execute(
+        "SELECT demand_id FROM work_logs GROUP BY demand_id "
+        "ORDER BY COUNT(*) DESC LIMIT 1"
+    )
+    hot = cur.fetchone()
+    cur.execute("SELECT MIN(id) AS id FROM attachments")
+    attachment = cur.fetchone()
+    cur.execute(
+        "SELECT id FROM demands WHERE status IN ('Em Fila', 'Em Execução') "
+        "ORDER BY priority LIMIT 2"
+    )
+    queue = [row["id"] for row in cur.fetchall()]
+    cur.execute("SELECT MAX(start_time) AS last FROM work_sessions")
+    last = cur.fetchone()["last"]
+    # Job de exportação concluído para as rotas de acompanhamento e download
+    cur.execute(
+        "REPLACE INTO export_jobs (id, cache_key, format, status, rows_done, "
+        "rows_total, artifact_key) VALUES (%s, %s, 'csv', 'done', 1, 1, %s)",
+        (BENCH_EXPORT_JOB_ID, BENCH_EXPORT_JOB_ID, "exports/benchmark.csv"),
+    )
+    conn.commit()
+    cur.close()
+
+    if not hot or len(queue) < 2 or last is None:
+        raise SystemExit("Banco sem dados suficientes: rode com --reset.")
+
+    last_day = last.date()
+    return {
+        "hot_demand_id": hot["demand_id"],
+        "attachment_id": attachment["id"],
+        "queue_ids": queue,
+        "month_start": (last_day - timedelta(days=30)).isoformat(),
+        "year_start": (last_day - timedelta(days=365)).isoformat(),
+        "last_day": last_day.isoformat(),
+        # Cursor logo após a sessão mais recente: a primeira página do
+        # histórico pela rota de carregamento sob demanda
+        "history_cursor": encode_cursor(
+            {"start_time": last + timedelta(seconds=1), "id": 0},
+            ("start_time", "id"),
+        ),
+    }
+
+
+def _log_work_payload(ctx, iteration):
+    start = f"{ctx['last_day']}T08:00:00Z"
+    end = f"{ctx['last_day']}T09:30:00Z"
+    return {
+        "start_time": start,
+        "end_time": end,
+        "total_minutes": 90,
+        "allocations": [
+            {
+                "demand_id": demand_id,
+                "minutes_spent": 45,
+                "description": f"Benchmark {iteration}",
+            }
+            for demand_id in ctx["queue_ids"]
+        ],
+    }
+
+
+def _move_payload(ctx, iteration):
+    first, second = ctx["queue_ids"]
+    # Alterna as duas primeiras demandas da fila, mantendo a fila estável.
+    if iteration % 2:
+        return {"id": first, "before_id": second}
+    return {"id": second, "before_id": first}
+
+
+# Job de exportação gravado por sample_context.
+BENCH_EXPORT_JOB_ID = "benchmark"
+
+# Sessões por requisição no cenário de sincronização em lote.
+BULK_SESSIONS = 20
+
+# Endpoints deliberadamente fora do benchmark.
+UNMEASURED = {
+    "demands.save_demand",
+    "auth.logout",
+    "home",
+    "static",
+    "assets",
+    "metrics",
+    "querylog",
+    # Stream SSE de longa duração (o tempo é o de EVENTS_STREAM_SECONDS)
+    "demands.events_stream",
+}
+
+# nome -> função (ctx, iteração) que devolve (método, url, kwargs do cliente)
+ROUTES = {
+    "auth.login": lambda ctx, i: ("GET", "/auth/login", {}),
+    "demands.dashboard": lambda ctx, i: ("GET", "/demands/", {}),
+    "demands.dashboard[all]": lambda ctx, i: ("GET", "/demands/?view=all", {}),
+    "demands.detail": lambda ctx, i: (
+        "GET",
+        f"/demands/{ctx['hot_demand_id']}",
+        {},
+    ),
+    "demands.work_history": lambda ctx, i: (
+        "GET",
+        f"/demands/{ctx['hot_demand_id']}/history?after={ctx['history_cursor']}",
+        {},
+    ),
+    "demands.detail[new]": lambda ctx, i: ("GET", "/demands/0", {}),
+    "demands.api_list": lambda ctx, i: ("GET", "/demands/api", {}),
+    "demands.api_list[fields]": lambda ctx, i: (
+        "GET",
+        "/demands/api?fields=id,priority&order=created&limit=500",
+        {},
+    ),
+    "demands.search_demands": lambda ctx, i: (
+        "GET",
+        "/demands/search?q=revisão código",
+        {},
+    ),
+    "demands.search_demands[json]": lambda ctx, i: (
+        "GET",
+        "/demands/search?q=sintética&format=json",
+        {},
+    ),
+    "demands.prioritize": lambda ctx, i: ("GET", "/demands/prioritize/0", {}),
+    "demands.attachment_links": lambda ctx, i: (
+        "GET",
+        f"/demands/{ctx['hot_demand_id']}/attachment-links",
+        {},
+    ),
+    "demands.download_attachment": lambda ctx, i: (
+        "GET",
+        f"/demands/attachment/{ctx['attachment_id']}",
+        {},
+    ),
+    "demands.events_poll": lambda ctx, i: (
+        "GET",
+        "/demands/events/poll?last_id=0",
+        {},
+    ),
+    "demands.update_priorities": lambda ctx, i: (
+        "POST",
+        "/demands/update_priorities",
+        {"json": _move_payload(ctx, i)},
+    ),
+    "tracker.index": lambda ctx, i: ("GET", "/tracker/", {}),
+    "tracker.log_work": lambda ctx, i: (
+        "POST",
+        "/tracker/log_work",
+        {"json": _log_work_payload(ctx, i)},
+    ),
+    "tracker.log_work_bulk": lambda ctx, i: (
+        "POST",
+        "/tracker/log_work/bulk",
+        {"json": {"sessions": [_log_work_payload(ctx, i)] * BULK_SESSIONS}},
+    ),
+    "reports.index": lambda ctx, i: (
+        "GET",
+        f"/reports/?start_date={ctx['month_start']}&end_date={ctx['last_day']}",
+        {},
+    ),
+    "reports.sessions_json": lambda ctx, i: (
+        "GET",
+        f"/reports/sessions?start_date={ctx['year_start']}&end_date={ctx['last_day']}",
+        {},
+    ),
+    "reports.summary": lambda ctx, i: (
+        "GET",
+        f"/reports/summary?start_date={ctx['year_start']}&end_date={ctx['last_day']}",
+        {},
+    ),
+    # Exportação: mede o caminho da requisição (registro ou reaproveitamento
+    # do job); o arquivo é montado pelo pool de export_jobs
+    "reports.export_report": lambda ctx, i: (
+        "POST",
+        "/reports/export",
+        {"data": {"start_date": ctx["month_start"], "end_date": ctx["last_day"]}},
+    ),
+    "reports.export_job": lambda ctx, i: (
+        "GET",
+        f"/reports/exports/{BENCH_EXPORT_JOB_ID}",
+        {},
+    ),
+    "reports.export_status": lambda ctx, i: (
+        "GET",
+        f"/reports/exports/{BENCH_EXPORT_JOB_ID}/status",
+        {},
+    ),
+    "reports.download_export": lambda ctx, i: (
+        "GET",
+        f"/reports/exports/{BENCH_EXPORT_JOB_ID}/download",
+        {},
+    ),
+    "reports.export_report[csv]": lambda ctx, i: (
+        "POST",
+        "/reports/export",
+        {
+            "data": {
+                "start_date": ctx["year_start"],
+                "end_date": ctx["last_day"],
+                "format": "csv",
+            }
+        },
+    ),
+    "reports.export_report[parquet]": lambda ctx, i: (
+        "POST",
+        "/reports/export",
+        {
+            "data": {
+                "start_date": ctx["year_start"],
+                "end_date": ctx["last_day"],
+                "format": "parquet",
+            }
+        },
+    ),
+}
+
+
+def percentile(samples, pct):
+    """Percentil com interpolação linear entre as amostras ordenadas."""
+    ordered = sorted(samples)
+    if not ordered:
+        raise ValueError("Sem amostras.")
+    position = (len(ordered) - 1) * pct / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def summarize(latencies, query_counts, query_seconds):
+    latencies_ms = [value * 1000 for value in latencies]
+    return {
+        "iterations": len(latencies_ms),
+        "p50_ms": percentile(latencies_ms, 50),
+        "p95_ms": percentile(latencies_ms, 95),
+        "p99_ms": percentile(latencies_ms, 99),
+        "queries": max(query_counts),
+        "db_ms": statistics.median(query_seconds) * 1000,
+    }
+
+
+def run_route(client, counter, build, ctx, iterations, warmup):
+    latencies, query_counts, query_seconds = [], [], []
+    for iteration in range(warmup + iterations):
+        method, url, kwargs = build(ctx, iteration)
+        counter.reset()
+        start = time.perf_counter()
+        response = client.open(url, method=method, **kwargs)
+        response.get_data()  # Consome respostas em streaming (ex.: export)
+        elapsed = time.perf_counter() - start
+        if response.status_code >= 500:
+            raise RuntimeError(f"{method} {url} respondeu {response.status_code}")
+        if iteration >= warmup:
+            latencies.append(elapsed)
+            query_counts.append(counter.count)
+            query_seconds.append(counter.seconds)
+    return summarize(latencies, query_counts, query_seconds)
+
+
+def compare(results, baseline):
+    """Lista de regressões em relação à referência gravada."""
+    regressions = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        if current["queries"] > reference["queries"]:
+            regressions.append(
+                f"{name}: {current['queries']} queries (referência: "
+                f"{reference['queries']})"
+            )
+        limit = reference["p95_ms"] * (1 + REGRESSION_TOLERANCE)
+        delta = current["p95_ms"] - reference["p95_ms"]
+        if current["p95_ms"] > limit and delta > REGRESSION_MIN_DELTA_MS:
+            regressions.append(
+                f"{name}: p95 de {current['p95_ms']:.1f} ms (referência: "
+                f"{reference['p95_ms']:.1f} ms)"
+            )
+    return regressions
+
+
+def load_baseline(path=BASELINE_PATH):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(results, path=BASELINE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def print_table(results):
+    print(
+        f"{'rota':<30} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'db ms':>8} {'q':>4}"
+    )
+    for name, r in results.items():
+        print(
+            f"{name:<30} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+            f"{r['p99_ms']:>8.2f} {r['db_ms']:>8.2f} {r['queries']:>4}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das rotas.")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--route", action="append", help="Rotas a medir (prefixo)")
+    parser.add_argument("--reset", action="store_true", help="Recria e popula o banco")
+    parser.add_argument("--demands", type=int, default=2000)
+    parser.add_argument("--sessions", type=int, default=20000)
+    parser.add_argument("--work-logs", type=int, default=50000)
+    parser.add_argument("--attachments", type=int, default=500)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    app = create_app(BenchConfig)
+    counter = QueryCounter()
+    instrument(app, counter)
+
+    with app.app_context():
+        conn = mysql.connection
+        if args.reset:
+            dataset.reset_schema(conn)
+            dataset.generate(
+                conn,
+                demands=args.demands,
+                sessions=args.sessions,
+                work_logs=args.work_logs,
+                attachments=args.attachments,
+            )
+        ctx = sample_context(conn)
+
+    client = app.test_client()
+    results = {}
+    for name, build in ROUTES.items():
+        if args.route and not any(name.startswith(r) for r in args.route):
+            continue
+        results[name] = run_route(
+            client, counter, build, ctx, args.iterations, args.warmup
+        )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results)
+
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"Referência gravada em {args.baseline}")
+
+    if args.compare:
+        regressions = compare(results, load_baseline(args.baseline))
+        for regression in regressions:
+            print(f"REGRESSÃO: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# benchmarks/startup.py
+# Mede o cold start de um worker: importação de `app`, create_app() e pico de
+# memória (RSS), cada execução em um interpretador novo.
+#
+# Uso:
+#   python benchmarks/startup.py              # relatório legível
+#   python benchmarks/startup.py --json       # saída em JSON
+#   python benchmarks/startup.py --check      # falha se estourar o orçamento
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Orçamento de cold start (medianas). Ajustável por variáveis de ambiente
+# para máquinas de CI mais lentas.
+BUDGET_SECONDS = float(os.environ.get("STARTUP_BUDGET_SECONDS", "1.0"))
+BUDGET_RSS_MB = float(os.environ.get("STARTUP_BUDGET_RSS_MB", "120"))
+
+# Dependências pesadas que só devem ser carregadas sob demanda.
+HEAVY_MODULES = ("boto3", "botocore", "pandas", "numpy", "openpyxl", "pyarrow")
+
+# O pico de RSS vem de VmHWM (/proc), que começa do zero no exec; o
+# ru_maxrss do Linux herda o pico do processo pai (ex.: o pytest).
+_CHILD_CODE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+booted = time.perf_counter()
+try:
+    with open("/proc/self/status") as status:
+        line = next(l for l in status if l.startswith("VmHWM:"))
+    peak_rss_mb = int(line.split()[1]) / 1024
+except OSError:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = rss / 1024 / (1024 if sys.platform == "darwin" else 1)
+print(json.dumps({
+    "import_seconds": imported - start,
+    "boot_seconds": booted - imported,
+    "total_seconds": booted - start,
+    "peak_rss_mb": peak_rss_mb,
+    "heavy_modules": sorted(m for m in %r if m in sys.modules),
+}))
+""" % (
+    HEAVY_MODULES,
+)
+
+
+def measure_once():
+    output = subprocess.run(
+        [sys.executable, "-c", _CHILD_CODE],
+        cwd=ROOT_DIR,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure(runs=5):
+    samples = [measure_once() for _ in range(runs)]
+    result = {
+        key: statistics.median(sample[key] for sample in samples)
+        for key in ("import_seconds", "boot_seconds", "total_seconds", "peak_rss_mb")
+    }
+    result["heavy_modules"] = sorted(
+        {module for sample in samples for module in sample["heavy_modules"]}
+    )
+    result["runs"] = runs
+    return result
+
+
+def check_budget(result):
+    """Lista de violações do orçamento (vazia quando tudo está dentro)."""
+    problems = []
+    if result["total_seconds"] > BUDGET_SECONDS:
+        problems.append(
+            f"cold start de {result['total_seconds']:.3f}s excede {BUDGET_SECONDS:.3f}s"
+        )
+    if result["peak_rss_mb"] > BUDGET_RSS_MB:
+        problems.append(
+            f"pico de RSS de {result['peak_rss_mb']:.1f} MB excede {BUDGET_RSS_MB:.1f} MB"
+        )
+    if result["heavy_modules"]:
+        problems.append(
+            "módulos pesados carregados no boot: " + ", ".join(result["heavy_modules"])
+        )
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start de um worker.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--check", action="store_true")
+    args = parser.parse_args()
+
+    result = measure(args.runs)
+    problems = check_budget(result)
+
+    if args.json:
+        print(json.dumps(dict(result, problems=problems), indent=2))
+    else:
+        print(f"Execuções:          {result['runs']}")
+        print(f"Importação de app:  {result['import_seconds'] * 1000:.1f} ms")
+        print(f"create_app():       {result['boot_seconds'] * 1000:.1f} ms")
+        print(f"Total:              {result['total_seconds'] * 1000:.1f} ms")
+        print(f"Pico de RSS:        {result['peak_rss_mb']:.1f} MB")
+        print(f"Módulos pesados:    {', '.join(result['heavy_modules']) or 'nenhum'}")
+        for problem in problems:
+            print(f"FALHA: {problem}")
+
+    if args.check and problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
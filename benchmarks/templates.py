@@ -0,0 +1,164 @@
+# benchmarks/templates.py
+# Tempo de renderização das páginas com e sem o cache de templates
+# (templating.py), contra o mesmo MySQL de benchmarks/routes.py.
+#
+# Mede só o Jinja (carregamento/compilação + render do template da página,
+# com os includes), não o SQL da rota:
+#   - 1ª render: primeira requisição de um worker novo. Sem cache, o template
+#     é compilado; com cache, o bytecode vem de TEMPLATE_BYTECODE_CACHE_DIR.
+#   - p50: renderizações seguintes. Com cache, os trechos {% cache %} (layout
+#     e tabelas) são reaproveitados enquanto os dados não mudam.
+#
+#   python -m benchmarks.templates              # tabela
+#   python -m benchmarks.templates --json
+import argparse
+import json
+import tempfile
+import time
+
+from jinja2 import Template
+
+from app import create_app
+from benchmarks.routes import ROUTES, BenchConfig, percentile, sample_context
+from extensions import mysql
+
+# Cenários de benchmarks/routes.py que renderizam uma página HTML.
+PAGES = (
+    "auth.login",
+    "demands.dashboard",
+    "demands.dashboard[all]",
+    "demands.detail",
+    "demands.detail[new]",
+    "demands.prioritize",
+    "tracker.index",
+    "reports.index",
+    "reports.summary",
+)
+
+
+class RenderTimer:
+    """Tempo gasto no Jinja e templates renderizados em uma requisição."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+def instrument(app, timer):
+    """Cronometra o carregamento e o render dos templates do app."""
+    env = app.jinja_env
+    load = env.get_or_select_template
+
+    def timed_load(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return load(*args, **kwargs)
+        finally:
+            timer.seconds += time.perf_counter() - start
+
+    class TimedTemplate(Template):
+        def render(self, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return super().render(*args, **kwargs)
+            finally:
+                timer.count += 1
+                timer.seconds += time.perf_counter() - start
+
+    env.get_or_select_template = timed_load
+    env.template_class = TimedTemplate
+
+
+def make_config(bytecode_dir, fragments):
+    class Config(BenchConfig):
+        TEMPLATE_BYTECODE_CACHE_DIR = bytecode_dir
+        FRAGMENT_CACHE_ENABLED = fragments
+        # Sem 304: toda requisição renderiza a página
+        CONDITIONAL_GET_ENABLED = False
+
+    return Config
+
+
+def measure_page(config, build, ctx, iterations):
+    """(1ª render, renders seguintes) em segundos, em um app novo."""
+    app = create_app(config)
+    timer = RenderTimer()
+    instrument(app, timer)
+    client = app.test_client()
+
+    samples = []
+    for iteration in range(iterations + 1):
+        method, url, kwargs = build(ctx, iteration)
+        timer.reset()
+        response = client.open(url, method=method, **kwargs)
+        if response.status_code != 200 or not timer.count:
+            raise RuntimeError(f"{url} não renderizou uma página")
+        samples.append(timer.seconds)
+    return samples[0], samples[1:]
+
+
+def run(ctx, iterations, pages=PAGES):
+    bytecode_dir = tempfile.mkdtemp(prefix="bench-jinja-")
+    modes = {
+        "off": make_config("", False),
+        "on": make_config(bytecode_dir, True),
+    }
+    # Bytecode gerado antes: o worker medido já encontra o cache preenchido
+    warm = create_app(modes["on"])
+    for name in warm.jinja_env.list_templates(extensions=["html"]):
+        warm.jinja_env.get_template(name)
+
+    results = {}
+    for name in pages:
+        result = {}
+        for mode, config in modes.items():
+            first, rest = measure_page(config, ROUTES[name], ctx, iterations)
+            result[f"first_ms_{mode}"] = first * 1000
+            result[f"p50_ms_{mode}"] = percentile(rest, 50) * 1000
+        result["saved_ms"] = result["p50_ms_off"] - result["p50_ms_on"]
+        results[name] = result
+    return results
+
+
+def print_table(results):
+    print(
+        f"{'página':<26} {'1ª sem':>8} {'1ª com':>8} "
+        f"{'p50 sem':>8} {'p50 com':>8} {'ganho ms':>9} {'ganho':>6}"
+    )
+    for name, r in results.items():
+        share = r["saved_ms"] / r["p50_ms_off"] if r["p50_ms_off"] else 0
+        print(
+            f"{name:<26} {r['first_ms_off']:>8.2f} {r['first_ms_on']:>8.2f} "
+            f"{r['p50_ms_off']:>8.2f} {r['p50_ms_on']:>8.2f} "
+            f"{r['saved_ms']:>9.2f} {share:>6.0%}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do cache de templates.")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--page", action="append", help="Páginas a medir (prefixo)")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        ctx = sample_context(mysql.connection)
+
+    pages = [
+        name
+        for name in PAGES
+        if not args.page or any(name.startswith(p) for p in args.page)
+    ]
+    results = run(ctx, args.iterations, pages)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,11 @@
 # blueprints/demands.py
 import traceback
+from datetime import datetime
 
-import boto3
 import MySQLdb.cursors
-from botocore.exceptions import NoCredentialsError
 from flask import (
     Blueprint,
+    Response,
     current_app,
     flash,
     jsonify,
@@ -16,9 +16,14 @@ from flask import (
 )
 from werkzeug.utils import secure_filename
 
-from extensions import mysql
-
-s3_client = boto3.client("s3")
+import events
+import fastjson
+import priorities
+import search
+import storage
+import versions
+from extensions import cache, mysql
+from pagination import decode_cursor, paginate, parse_datetime
 
 demands_bp = Blueprint("demands", __name__)
 
@@ -31,74 +36,399 @@ def allowed_file(filename):
     )
 
 
+# Colunas usadas na ordenação de cada visão; também compõem o cursor de paginação.
+DASHBOARD_ORDER_KEYS = {
+    "prioritize": ("priority", "created_at", "id"),
+    "all": ("created_at", "id"),
+}
+DASHBOARD_CURSOR_TYPES = {
+    "prioritize": (int, parse_datetime, int),
+    "all": (parse_datetime, int),
+}
+
+
 @demands_bp.route("/")
+@versions.conditional(versions.DEMANDS)
 def dashboard():
     view = request.args.get("view", "prioritize")  # 'prioritize' or 'all'
+    if view not in DASHBOARD_ORDER_KEYS:
+        view = "prioritize"
+    page_size = current_app.config["DEMANDS_PAGE_SIZE"]
+
+    cursor_values = None
+    after = request.args.get("after")
+    if after:
+        try:
+            cursor_values = decode_cursor(after, DASHBOARD_CURSOR_TYPES[view])
+        except ValueError:
+            flash("Link de paginação inválido, exibindo a primeira página.", "warning")
+
+    # Lido antes da página: eventos posteriores chegam pelo stream SSE
+    last_event_id = events.last_id()
+
+    if view == "prioritize" and cache.enabled:
+        # Fila ativa vinda do cache; a página é recortada em memória a partir
+        # da primeira linha posterior ao cursor
+        queue = priorities.active_queue()
+        start = 0
+        if cursor_values:
+            after_key = _queue_key(*cursor_values)
+            start = next(
+                (
+                    index
+                    for index, row in enumerate(queue)
+                    if _queue_key(row["priority"], row["created_at"], row["id"])
+                    > after_key
+                ),
+                len(queue),
+            )
+        rows = queue[start : start + page_size + 1]
+    else:
+        rows = _fetch_dashboard_page(view, cursor_values, page_size)
+
+    demands, next_cursor = paginate(rows, page_size, DASHBOARD_ORDER_KEYS[view])
+
+    # Posição do primeiro item da página, apenas para a numeração exibida na fila.
+    position = request.args.get("pos", 0, type=int) if cursor_values else 0
+
+    return render_template(
+        "pages/demands/dashboard.html",
+        demands=demands,
+        current_view=view,
+        next_cursor=next_cursor,
+        position=position,
+        is_first_page=cursor_values is None,
+        last_event_id=last_event_id,
+    )
+
+
+def _queue_key(priority, created_at, demand_id):
+    # priority e created_at são NOT NULL desde a migração 009; em um banco
+    # ainda não migrado, NULL vem antes de qualquer valor (como no ORDER BY
+    # do MySQL) e nunca é comparado diretamente
+    return (
+        (priority is not None, priority or 0),
+        (created_at is not None, created_at or datetime.min),
+        demand_id,
+    )
+
+
+DASHBOARD_COLUMNS = (
+    "id",
+    "title",
+    "status",
+    "created_at",
+    "priority",
+    "executed_hours",
+    "estimated_hours",
+)
+
+
+def _fetch_dashboard_page(view, cursor_values, page_size):
+    filters = [priorities.QUEUE_FILTER] if view == "prioritize" else []
+    return _fetch_demands_page(
+        view, cursor_values, page_size, DASHBOARD_COLUMNS, filters
+    )
+
+
+def _fetch_demands_page(view, cursor_values, page_size, columns, filters, params=()):
+    """
+    Página de demandas na ordem da visão, buscando page_size + 1 linhas.
+    `filters` são cláusulas SQL (com placeholders em `params`) unidas por AND.
+    """
     cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
 
-    query_base = "SELECT id, title, status, created_at, priority, executed_hours, estimated_hours FROM demands"
+    where_clauses = list(filters)
+    params = list(params)
 
+    # Paginação por cursor (keyset): cada página continua a partir da última
+    # linha da anterior, usando os índices idx_demands_queue e idx_demands_created.
     if view == "prioritize":
-        query = f"{query_base} WHERE status IN ('Em Fila', 'Em Execução') ORDER BY priority ASC, created_at ASC"
+        if cursor_values:
+            where_clauses.append("(priority, created_at, id) > (%s, %s, %s)")
+            params.extend(cursor_values)
+        order_by = "priority ASC, created_at ASC, id ASC"
     else:  # 'all'
-        query = f"{query_base} ORDER BY created_at DESC"
-
-    cur.execute(query)
-    demands = cur.fetchall()
+        if cursor_values:
+            where_clauses.append("(created_at, id) < (%s, %s)")
+            params.extend(cursor_values)
+        order_by = "created_at DESC, id DESC"
+
+    query = f"SELECT {', '.join(columns)} FROM demands"
+    if where_clauses:
+        query += " WHERE " + " AND ".join(where_clauses)
+    query += f" ORDER BY {order_by} LIMIT %s"
+    params.append(page_size + 1)
+
+    cur.execute(query, tuple(params))
+    rows = cur.fetchall()
     cur.close()
+    return rows
+
+
+# API de leitura: colunas permitidas em fields= (description só quando pedida)
+API_FIELDS = DASHBOARD_COLUMNS + ("description", "updated_at")
+API_ORDERS = {"priority": "prioritize", "created": "all"}
+
+
+def _split_param(name):
+    values = []
+    for raw in request.args.getlist(name):
+        values.extend(value.strip() for value in raw.split(",") if value.strip())
+    return values
+
+
+@demands_bp.route("/api")
+@versions.conditional(versions.DEMANDS)
+def api_list():
+    """
+    Listagem em JSON, sem template:
+      ?fields=id,priority   colunas devolvidas (padrão: as do painel)
+      ?status=Em Fila,...   filtro por status (também repetível)
+      ?order=priority|created
+      ?limit=N              até DEMANDS_API_MAX_LIMIT
+      ?after=<next_cursor>  próxima página
+    """
+    fields = _split_param("fields") or list(DASHBOARD_COLUMNS)
+    unknown = [field for field in fields if field not in API_FIELDS]
+    if unknown:
+        return fastjson.response(
+            {"status": "error", "message": f"Campos inválidos: {', '.join(unknown)}"},
+            400,
+        )
 
-    return render_template(
-        "pages/demands/dashboard.html", demands=demands, current_view=view
+    view = API_ORDERS.get(request.args.get("order", "priority"))
+    if view is None:
+        return fastjson.response(
+            {"status": "error", "message": "order deve ser priority ou created."}, 400
+        )
+
+    max_limit = current_app.config["DEMANDS_API_MAX_LIMIT"]
+    limit = request.args.get("limit", current_app.config["DEMANDS_PAGE_SIZE"], type=int)
+    if limit is None or not 1 <= limit <= max_limit:
+        return fastjson.response(
+            {"status": "error", "message": f"limit deve estar entre 1 e {max_limit}."},
+            400,
+        )
+
+    cursor_values = None
+    after = request.args.get("after")
+    if after:
+        try:
+            cursor_values = decode_cursor(after, DASHBOARD_CURSOR_TYPES[view])
+        except ValueError as e:
+            return fastjson.response({"status": "error", "message": str(e)}, 400)
+
+    filters, params = [], []
+    statuses = _split_param("status")
+    if statuses:
+        filters.append(f"status IN ({', '.join(['%s'] * len(statuses))})")
+        params.extend(statuses)
+
+    # As colunas de ordenação são sempre lidas, para montar o cursor
+    order_keys = DASHBOARD_ORDER_KEYS[view]
+    columns = list(dict.fromkeys(list(fields) + list(order_keys)))
+    rows = _fetch_demands_page(view, cursor_values, limit, columns, filters, params)
+    demands, next_cursor = paginate(rows, limit, order_keys)
+
+    return fastjson.response(
+        {
+            "demands": [{field: row[field] for field in fields} for row in demands],
+            "next_cursor": next_cursor,
+        }
     )
 
 
-@demands_bp.route("/<int:demand_id>")
-def detail(demand_id):
-    cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+@demands_bp.route("/search")
+@versions.conditional(versions.DEMANDS, versions.WORK_LOGS)
+def search_demands():
+    """
+    Busca em títulos, descrições e anotações de trabalho (?q=...), em ordem
+    de relevância; com ?format=json devolve os resultados em JSON.
+    """
+    query = request.args.get("q", "").strip()
+    limit = current_app.config["SEARCH_RESULTS_LIMIT"]
+    results = search.search(query, limit) if query else []
+
+    if request.args.get("format") == "json":
+        return fastjson.response(
+            {
+                "query": query,
+                "terms": search.terms(query),
+                "results": [
+                    {
+                        "id": result["id"],
+                        "title": result["title"],
+                        "status": result["status"],
+                        "score": result["score"],
+                        "title_html": str(result["title_html"]),
+                        "description_html": result["description_html"]
+                        and str(result["description_html"]),
+                        "note_html": result["note_html"] and str(result["note_html"]),
+                    }
+                    for result in results
+                ],
+            }
+        )
 
-    if demand_id == 0:  # Indicates a new demand
-        demand = None
-        attachments = []
-        work_history = []
-    else:
-        cur.execute("SELECT * FROM demands WHERE id = %s", (demand_id,))
-        demand = cur.fetchone()
+    return render_template(
+        "pages/demands/search.html",
+        query=query,
+        results=results,
+        too_short=bool(query) and not search.terms(query),
+        min_term_length=search.MIN_TERM_LENGTH,
+    )
 
-        if not demand:
-            flash("Demanda não encontrada.", "danger")
-            return redirect(url_for("demands.dashboard"))
 
-        cur.execute(
-            "SELECT id, filename, filepath FROM attachments WHERE demand_id = %s",
-            (demand_id,),
-        )
-        attachments = cur.fetchall()
-
-        cur.execute(
-            """
-            SELECT wl.*, ws.start_time, ws.end_time 
-            FROM work_logs wl
-            JOIN work_sessions ws ON wl.work_session_id = ws.id
-            WHERE wl.demand_id = %s
-            ORDER BY ws.start_time DESC
+# Cabeçalho, anexos e totais (das tabelas de rollup) em uma única consulta:
+# uma linha por anexo, ou uma só linha com as colunas do anexo nulas.
+DETAIL_QUERY = """
+    SELECT d.id, d.title, d.description, d.status, d.priority,
+           d.estimated_hours, d.executed_hours, d.created_at, d.updated_at,
+           a.id AS attachment_id, a.filename, a.filepath,
+           totals.log_count, totals.minutes, totals.last_day
+    FROM demands d
+    LEFT JOIN attachments a ON a.demand_id = d.id
+    CROSS JOIN (
+        SELECT COALESCE(SUM(log_count), 0) AS log_count,
+               COALESCE(SUM(minutes), 0) AS minutes,
+               MAX(day) AS last_day
+        FROM daily_demand_minutes
+        WHERE demand_id = %s
+    ) totals
+    WHERE d.id = %s
+    ORDER BY a.id
+"""
+
+DEMAND_COLUMNS = (
+    "id",
+    "title",
+    "description",
+    "status",
+    "priority",
+    "estimated_hours",
+    "executed_hours",
+    "created_at",
+    "updated_at",
+)
+
+# Histórico de trabalho: mais recente primeiro, paginado por (start_time, id).
+HISTORY_ORDER_KEYS = ("start_time", "id")
+HISTORY_CURSOR_TYPES = (parse_datetime, int)
+
+
+def _fetch_detail(cur, demand_id):
+    """Retorna (demanda, anexos, totais), ou (None, [], None) se não existir."""
+    cur.execute(DETAIL_QUERY, (demand_id, demand_id))
+    rows = cur.fetchall()
+    if not rows:
+        return None, [], None
+
+    first = rows[0]
+    demand = {column: first[column] for column in DEMAND_COLUMNS}
+    attachments = [
+        {
+            "id": row["attachment_id"],
+            "filename": row["filename"],
+            "filepath": row["filepath"],
+        }
+        for row in rows
+        if row["attachment_id"] is not None
+    ]
+    totals = {
+        "log_count": first["log_count"],
+        "minutes": first["minutes"],
+        "last_day": first["last_day"],
+    }
+    return demand, attachments, totals
+
+
+def _fetch_history_page(cur, demand_id, cursor_values, page_size):
+    where = "wl.demand_id = %s"
+    params = [demand_id]
+    if cursor_values:
+        where += " AND (ws.start_time, wl.id) < (%s, %s)"
+        params.extend(cursor_values)
+    params.append(page_size + 1)
+    cur.execute(
+        f"""
+        SELECT wl.id, wl.minutes_spent, wl.description, ws.start_time, ws.end_time
+        FROM work_logs wl
+        JOIN work_sessions ws ON wl.work_session_id = ws.id
+        WHERE {where}
+        ORDER BY ws.start_time DESC, wl.id DESC
+        LIMIT %s
         """,
-            (demand_id,),
+        tuple(params),
+    )
+    return paginate(cur.fetchall(), page_size, HISTORY_ORDER_KEYS)
+
+
+@demands_bp.route("/<int:demand_id>")
+@versions.conditional(versions.DEMANDS, versions.WORK_LOGS)
+def detail(demand_id):
+    if demand_id == 0:  # Indicates a new demand
+        return render_template(
+            "pages/demands/detail.html",
+            demand=None,
+            attachments=[],
+            totals=None,
+            work_history=[],
+            history_cursor=None,
         )
-        work_history = cur.fetchall()
 
+    cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+    demand, attachments, totals = _fetch_detail(cur, demand_id)
+    if not demand:
+        cur.close()
+        flash("Demanda não encontrada.", "danger")
+        return redirect(url_for("demands.dashboard"))
+
+    # Só a primeira página do histórico; o restante é carregado sob demanda
+    work_history, history_cursor = _fetch_history_page(
+        cur, demand_id, None, current_app.config["DEMAND_HISTORY_PAGE_SIZE"]
+    )
     cur.close()
 
     return render_template(
         "pages/demands/detail.html",
         demand=demand,
+        # O HTML (com ETag) só leva a rota de download; as URLs diretas, que
+        # expiram, vêm de attachment_links depois que a página carrega
         attachments=attachments,
+        totals=totals,
         work_history=work_history,
+        history_cursor=history_cursor,
+    )
+
+
+@demands_bp.route("/<int:demand_id>/history")
+@versions.conditional(versions.WORK_LOGS)
+def work_history(demand_id):
+    """Próximas linhas do histórico (fragmento HTML anexado pela página)."""
+    try:
+        cursor_values = decode_cursor(
+            request.args.get("after", ""), HISTORY_CURSOR_TYPES
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+    rows, history_cursor = _fetch_history_page(
+        cur, demand_id, cursor_values, current_app.config["DEMAND_HISTORY_PAGE_SIZE"]
+    )
+    cur.close()
+
+    return render_template(
+        "pages/demands/_work_history_rows.html",
+        demand_id=demand_id,
+        work_history=rows,
+        history_cursor=history_cursor,
     )
 
 
 @demands_bp.route("/save", methods=["POST"])
 def save_demand():
-    print("Estou na rota save_demand")
     demand_id = request.form.get("demand_id")
     title = request.form.get("title")
     description = request.form.get("description")
@@ -113,9 +443,8 @@ def save_demand():
     cur = conn.cursor(MySQLdb.cursors.DictCursor)
 
     try:
-        print("Tentando salvar a demanda...")
         if demand_id and demand_id != "0":  # Update existing demand
-            print(f"Atualizando demanda com ID: {demand_id}")
+            current_app.logger.debug("Atualizando demanda %s", demand_id)
             cur.execute(
                 """
                 UPDATE demands SET title=%s, description=%s, status=%s, estimated_hours=%s, updated_at=NOW()
@@ -123,19 +452,20 @@ def save_demand():
             """,
                 (title, description, status, estimated_hours, demand_id),
             )
+            priority = None
             flash("Demanda atualizada com sucesso!", "success")
             redirect_url = url_for("demands.detail", demand_id=demand_id)
         else:  # Create new demand
-            print("Criando uma nova demanda...")
+            current_app.logger.debug("Criando uma nova demanda")
             cur.execute("SELECT COALESCE(MAX(priority), -1) AS max_p FROM demands")
             result = cur.fetchone()
-            max_priority = result["max_p"]
+            priority = result["max_p"] + 1
             cur.execute(
                 """
                 INSERT INTO demands (title, description, status, estimated_hours, priority)
                 VALUES (%s, %s, %s, %s, %s)
             """,
-                (title, description, status, estimated_hours, max_priority + 1),
+                (title, description, status, estimated_hours, priority),
             )
             demand_id = cur.lastrowid
             flash("Demanda criada! Agora, defina sua prioridade.", "info")
@@ -143,57 +473,129 @@ def save_demand():
                 "demands.prioritize", new_demand_id=demand_id
             )  # Redirect to prioritization
 
-        if "attachments" in request.files:
-            files_to_upload = request.files.getlist("attachments")
-            for file in files_to_upload:
-                if file and file.filename != "" and allowed_file(file.filename):
-                    filename = secure_filename(file.filename)
-
-                    try:
-                        s3_client.upload_fileobj(
-                            file,
-                            current_app.config["S3_BUCKET"],
-                            f"demands/{demand_id}/{filename}",
-                        )
-                        file_url = f"{current_app.config['S3_LOCATION']}demands/{demand_id}/{filename}"
-                        # Salvar file_url no banco
-                        cur.execute(
-                            "INSERT INTO attachments (demand_id, filename, filepath) VALUES (%s, %s, %s)",
-                            (demand_id, filename, file_url),  # Salva a URL
-                        )
-                    except NoCredentialsError:
-                        flash("Credenciais AWS não configuradas no servidor.", "danger")
-                    except Exception as e:
-                        flash(f"Erro ao enviar arquivo para o S3: {e}", "danger")
-
+        events.publish(
+            cur,
+            events.DEMAND,
+            {
+                "id": int(demand_id),
+                "title": title,
+                "status": status,
+                "priority": priority,
+            },
+        )
+        versions.bump(cur, versions.DEMANDS)
         conn.commit()
+        priorities.invalidate_queue()
     except Exception as e:
         conn.rollback()
 
         traceback.print_exc()  # Isso imprime o stack trace completo no terminal
         flash(f"Erro ao salvar demanda: {e}", "danger")
-        redirect_url = url_for("demands.dashboard")
+        return redirect(url_for("demands.dashboard"))
     finally:
         cur.close()
 
+    # Os anexos são enviados depois do commit: a transação (e seus locks) não
+    # fica aberta enquanto os arquivos sobem para o S3.
+    if "attachments" in request.files:
+        _save_attachments(demand_id, request.files.getlist("attachments"))
+
     return redirect(redirect_url)
 
 
+def _save_attachments(demand_id, files_to_upload):
+    files = []
+    for file in files_to_upload:
+        if file and file.filename != "" and allowed_file(file.filename):
+            filename = secure_filename(file.filename)
+            if filename:
+                files.append((filename, file.stream))
+
+    if not files:
+        return
+
+    # Só aqui, com anexos a enviar: o botocore é carregado junto com o cliente
+    from botocore.exceptions import NoCredentialsError
+
+    # Envios em paralelo (pool limitado), com multipart para arquivos grandes
+    uploaded, failed = storage.upload_attachments(
+        storage.get_client(),
+        current_app.config["S3_BUCKET"],
+        demand_id,
+        files,
+        current_app.config,
+    )
+
+    for filename, error in failed:
+        if isinstance(error, NoCredentialsError):
+            flash("Credenciais AWS não configuradas no servidor.", "danger")
+        else:
+            flash(f"Erro ao enviar arquivo {filename} para o S3: {error}", "danger")
+
+    if not uploaded:
+        return
+
+    # Todos os anexos enviados são registrados em um único lote
+    conn = mysql.connection
+    cur = conn.cursor()
+    try:
+        cur.executemany(
+            "INSERT INTO attachments (demand_id, filename, filepath) VALUES (%s, %s, %s)",
+            [
+                (demand_id, filename, f"{current_app.config['S3_LOCATION']}{key}")
+                for filename, key in uploaded
+            ],
+        )
+        versions.bump(cur, versions.DEMANDS)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        traceback.print_exc()
+        flash(f"Erro ao registrar anexos: {e}", "danger")
+    finally:
+        cur.close()
+
+
 @demands_bp.route("/prioritize/<int:new_demand_id>")
 def prioritize(new_demand_id):
-    cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-    query = "SELECT id, title, status, priority FROM demands WHERE status IN ('Em Fila', 'Em Execução') ORDER BY priority ASC, created_at ASC"
-    cur.execute(query)
-    demands = cur.fetchall()
-    cur.close()
+    demands = priorities.active_queue()
 
     return render_template(
         "pages/demands/prioritize.html", demands=demands, new_demand_id=new_demand_id
     )
 
 
+@demands_bp.route("/<int:demand_id>/attachment-links")
+def attachment_links(demand_id):
+    """
+    Links diretos para o S3 dos anexos da demanda, assinados em lote.
+    Fica fora do GET condicional da página de detalhe: as URLs expiram
+    independentemente das escritas que mudam o ETag.
+    """
+    cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+    cur.execute(
+        "SELECT id, filepath FROM attachments WHERE demand_id = %s", (demand_id,)
+    )
+    attachments = cur.fetchall()
+    cur.close()
+
+    urls = storage.presign_attachments(attachments)
+    response = jsonify(
+        links={str(attachment_id): url for attachment_id, url in urls.items()},
+        # Validade mínima garantida: a URL sai do cache com essa folga
+        valid_for=current_app.config["S3_PRESIGNED_URL_MARGIN"],
+    )
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
 @demands_bp.route("/attachment/<int:attachment_id>")
 def download_attachment(attachment_id):
+    # URL ainda válida no cache: nem consulta ao banco nem nova assinatura
+    cached_url = storage.cached_presigned_url(attachment_id)
+    if cached_url:
+        return redirect(cached_url)
+
     cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
     cur.execute(
         "SELECT filename, filepath FROM attachments WHERE id = %s", (attachment_id,)
@@ -204,21 +606,9 @@ def download_attachment(attachment_id):
     if not attachment:
         return "Arquivo não encontrado", 404
 
-    # --- MODIFICAÇÃO PRINCIPAL AQUI ---
     try:
-        bucket_name = current_app.config["S3_BUCKET"]
-
-        # Extrai o object_key da URL completa salva no banco
-        # Ex: https://bucket-name.s3.amazonaws.com/demands/1/file.pdf -> demands/1/file.pdf
-        object_key = attachment["filepath"].split(f"{bucket_name}.s3.amazonaws.com/")[1]
-
         # Gera uma URL segura e temporária para download
-        presigned_url = s3_client.generate_presigned_url(
-            "get_object",
-            Params={"Bucket": bucket_name, "Key": object_key},
-            ExpiresIn=300,  # A URL expira em 5 minutos (300 segundos)
-        )
-
+        presigned_url = storage.presigned_url(attachment_id, attachment["filepath"])
         return redirect(presigned_url)
 
     except Exception as e:
@@ -229,22 +619,56 @@ def download_attachment(attachment_id):
 
 @demands_bp.route("/update_priorities", methods=["POST"])
 def update_priorities():
-    data = request.get_json()
+    data = request.get_json() or {}
     ordered_ids = data.get("ordered_ids")
+    move_id = data.get("id")
 
-    if not ordered_ids or not isinstance(ordered_ids, list):
+    if move_id is None and (not ordered_ids or not isinstance(ordered_ids, list)):
         return jsonify(status="error", message="Lista de IDs inválida."), 400
 
     conn = mysql.connection
-    cur = conn.cursor()
+    cur = conn.cursor(MySQLdb.cursors.DictCursor)
     try:
-        # Update priority for each demand in a single transaction
-        for index, demand_id in enumerate(ordered_ids):
-            cur.execute(
-                "UPDATE demands SET priority = %s WHERE id = %s", (index, demand_id)
+        if move_id is not None:
+            # Movimento único: o cliente envia só a demanda arrastada e o vizinho
+            before_id, after_id = data.get("before_id"), data.get("after_id")
+            new_priority = priorities.move(
+                cur, move_id, before_id=before_id, after_id=after_id
             )
+            events.publish(
+                cur,
+                events.MOVE,
+                {
+                    "id": int(move_id),
+                    "priority": new_priority,
+                    "before_id": None if before_id is None else int(before_id),
+                    "after_id": None if after_id is None else int(after_id),
+                },
+            )
+            versions.bump(cur, versions.DEMANDS)
+            conn.commit()
+            priorities.invalidate_queue()
+            return (
+                jsonify(
+                    status="success",
+                    message="Prioridade atualizada.",
+                    priority=new_priority,
+                ),
+                200,
+            )
+
+        # Lista completa: toda a nova ordem é gravada em um único UPDATE
+        priorities.reorder(cur, ordered_ids)
+        events.publish(
+            cur, events.REORDER, {"ids": [int(demand_id) for demand_id in ordered_ids]}
+        )
+        versions.bump(cur, versions.DEMANDS)
         conn.commit()
+        priorities.invalidate_queue()
         return jsonify(status="success", message="Prioridades atualizadas."), 200
+    except ValueError as e:
+        conn.rollback()
+        return jsonify(status="error", message=str(e)), 400
     except Exception as e:
         conn.rollback()
         return (
@@ -253,3 +677,58 @@ def update_priorities():
         )
     finally:
         cur.close()
+
+
+def _event_id(value):
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+@demands_bp.route("/events")
+def events_stream():
+    """
+    Stream SSE das alterações da fila. Não usa o banco nem o contexto da
+    requisição durante o envio: os eventos vêm do broker do processo.
+    """
+    after_id = _event_id(
+        request.headers.get("Last-Event-ID") or request.args.get("last_id")
+    )
+
+    broker = events.get_broker()
+    subscriber = broker.subscribe(after_id)
+    if subscriber is None:
+        # Limite de streams do processo: 204 faz o EventSource parar de
+        # reconectar e a página passa a usar events_poll
+        return Response(status=204)
+    return Response(
+        events.stream(
+            broker,
+            subscriber,
+            current_app.config["EVENTS_STREAM_SECONDS"],
+            current_app.config["EVENTS_HEARTBEAT_SECONDS"],
+        ),
+        mimetype="text/event-stream",
+        # Sem cache e sem buffer no proxy: cada evento sai assim que é gerado
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@demands_bp.route("/events/poll")
+def events_poll():
+    """
+    Alternativa ao stream quando o processo atingiu EVENTS_MAX_SUBSCRIBERS:
+    devolve na hora os eventos em memória após `last_id`, sem prender o worker.
+    """
+    broker = events.get_broker()
+    items, last_id = broker.events_since(_event_id(request.args.get("last_id")))
+    response = jsonify(
+        events=[
+            {"id": event_id, "kind": kind, "data": data}
+            for event_id, kind, data in items
+        ],
+        last_id=last_id,
+    )
+    response.headers["Cache-Control"] = "no-store"
+    return response
@@ -1,12 +1,15 @@
 # blueprints/reports.py
-import io
-from datetime import datetime
+import importlib.util
+import os
+from datetime import date
 
 import MySQLdb.cursors
-import pandas as pd
 from flask import (
     Blueprint,
+    abort,
+    current_app,
     flash,
+    jsonify,
     redirect,
     render_template,
     request,
@@ -14,134 +17,443 @@ from flask import (
     url_for,
 )
 
+import export_jobs
+import exporters
+import rollups
+import versions
 from extensions import mysql
+from pagination import decode_cursor, paginate, parse_datetime
 
 reports_bp = Blueprint("reports", __name__)
 
+EXPORT_HEADERS = [
+    "Início da Sessão",
+    "Fim da Sessão",
+    "Duração Total da Sessão (min)",
+    "Demanda",
+    "Minutos Alocados na Demanda",
+    "Descrição do Trabalho",
+]
+
+
+# Colunas dos formatos para carga em BI (CSV, Parquet, Arrow): nomes
+# estáveis e tipos nativos, na mesma ordem de EXPORT_HEADERS.
+EXPORT_COLUMNS = [
+    ("session_start", "timestamp"),
+    ("session_end", "timestamp"),
+    ("session_minutes", "int"),
+    ("demand", "string"),
+    ("demand_minutes", "int"),
+    ("description", "string"),
+]
+
+# format= -> (extensão, mimetype)
+EXPORT_FORMATS = {
+    "xlsx": ("xlsx", exporters.XLSX_MIMETYPE),
+    "csv": ("csv", exporters.CSV_MIMETYPE),
+    "parquet": ("parquet", exporters.PARQUET_MIMETYPE),
+    "arrow": ("arrows", exporters.ARROW_MIMETYPE),
+}
+
+
+def _format_datetime(value):
+    return value.strftime("%d/%m/%Y %H:%M") if value else None
+
+
+# Ordenação das sessões no relatório; também compõe o cursor de paginação.
+SESSION_ORDER_KEYS = ("start_time", "id")
+SESSION_CURSOR_TYPES = (parse_datetime, int)
+
 
 @reports_bp.route("/")
+@versions.conditional(versions.DEMANDS, versions.WORK_LOGS)
 def index():
     start_date = request.args.get("start_date")
     end_date = request.args.get("end_date")
 
+    cursor_values = None
+    after = request.args.get("after")
+    if after:
+        try:
+            cursor_values = decode_cursor(after, SESSION_CURSOR_TYPES)
+        except ValueError:
+            flash("Link de paginação inválido, exibindo a primeira página.", "warning")
+
     cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
 
-    query = """
-        SELECT 
-            ws.id,
-            ws.start_time,
-            ws.end_time,
-            ws.total_minutes,
-            GROUP_CONCAT(d.title SEPARATOR '; ') as demands_worked,
-            GROUP_CONCAT(wl.description SEPARATOR '; ') as work_descriptions
-        FROM work_sessions ws
-        JOIN work_logs wl ON ws.id = wl.work_session_id
-        JOIN demands d ON wl.demand_id = d.id
+    # Totais do período vêm da tabela de totais diários, sem reagregar os logs
+    totals = _period_totals(cur, start_date, end_date)
+    work_sessions, next_cursor = _fetch_sessions_page(
+        cur, start_date, end_date, cursor_values
+    )
+    cur.close()
+
+    return render_template(
+        "pages/reports/index.html",
+        sessions=work_sessions,
+        totals=totals,
+        start_date=start_date,
+        end_date=end_date,
+        next_cursor=next_cursor,
+        is_first_page=cursor_values is None,
+    )
+
+
+@reports_bp.route("/sessions")
+@versions.conditional(versions.DEMANDS, versions.WORK_LOGS)
+def sessions_json():
     """
-    params = []
+    Mesma listagem do relatório em JSON, com as alocações de cada sessão
+    como lista estruturada. Paginação por cursor: ?after=<next_cursor>.
+    """
+    start_date = request.args.get("start_date")
+    end_date = request.args.get("end_date")
+
+    cursor_values = None
+    after = request.args.get("after")
+    if after:
+        try:
+            cursor_values = decode_cursor(after, SESSION_CURSOR_TYPES)
+        except ValueError as e:
+            return jsonify(status="error", message=str(e)), 400
 
+    cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+    work_sessions, next_cursor = _fetch_sessions_page(
+        cur, start_date, end_date, cursor_values
+    )
+    cur.close()
+
+    return jsonify(
+        sessions=[
+            {
+                "id": session["id"],
+                "start_time": session["start_time"].isoformat(),
+                "end_time": session["end_time"].isoformat(),
+                "total_minutes": session["total_minutes"],
+                "allocations": session["allocations"],
+            }
+            for session in work_sessions
+        ],
+        next_cursor=next_cursor,
+    )
+
+
+def _session_filters(start_date, end_date):
     where_clauses = []
+    params = []
     if start_date:
         where_clauses.append("ws.start_time >= %s")
         params.append(start_date)
     if end_date:
+        # Uma sessão termina depois de começar: o limite em start_time não
+        # muda o resultado e permite varrer só o intervalo do índice.
+        where_clauses.append("ws.start_time <= %s")
         where_clauses.append("ws.end_time <= %s")
-        params.append(end_date + " 23:59:59")
+        params.extend([end_date + " 23:59:59"] * 2)
+    return where_clauses, params
+
+
+def _fetch_sessions_page(cur, start_date, end_date, cursor_values):
+    """
+    Página de sessões (mais recentes primeiro) pelo índice
+    idx_work_sessions_start, com as alocações de todas elas buscadas em
+    uma única consulta extra.
+    """
+    page_size = current_app.config["REPORTS_PAGE_SIZE"]
+    where_clauses, params = _session_filters(start_date, end_date)
+    # Mesmo critério do JOIN anterior: só sessões com algum log
+    where_clauses.append(
+        "EXISTS (SELECT 1 FROM work_logs wl WHERE wl.work_session_id = ws.id)"
+    )
+    if cursor_values:
+        where_clauses.append("(ws.start_time, ws.id) < (%s, %s)")
+        params.extend(cursor_values)
+
+    cur.execute(
+        "SELECT ws.id, ws.start_time, ws.end_time, ws.total_minutes "
+        "FROM work_sessions ws WHERE "
+        + " AND ".join(where_clauses)
+        + " ORDER BY ws.start_time DESC, ws.id DESC LIMIT %s",
+        tuple(params) + (page_size + 1,),
+    )
+    work_sessions, next_cursor = paginate(cur.fetchall(), page_size, SESSION_ORDER_KEYS)
+
+    for session in work_sessions:
+        session["allocations"] = []
+    if work_sessions:
+        by_id = {session["id"]: session for session in work_sessions}
+        placeholders = ", ".join(["%s"] * len(by_id))
+        cur.execute(
+            "SELECT wl.work_session_id, wl.demand_id, d.title AS demand_title, "
+            "wl.minutes_spent, wl.description, wl.status_changed_to "
+            "FROM work_logs wl JOIN demands d ON d.id = wl.demand_id "
+            f"WHERE wl.work_session_id IN ({placeholders}) "
+            "ORDER BY wl.work_session_id, wl.id",
+            tuple(by_id),
+        )
+        for allocation in cur.fetchall():
+            session_id = allocation.pop("work_session_id")
+            by_id[session_id]["allocations"].append(allocation)
+
+    return work_sessions, next_cursor
+
+
+def _period_totals(cur, start_date, end_date):
+    clauses, params = rollups.period_filters(start_date, end_date)
+    query = (
+        "SELECT COALESCE(SUM(session_count), 0) AS session_count, "
+        "COALESCE(SUM(total_minutes), 0) AS total_minutes "
+        "FROM daily_session_minutes"
+    )
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    cur.execute(query, tuple(params))
+    return cur.fetchone() or {"session_count": 0, "total_minutes": 0}
 
-    if where_clauses:
-        query += " WHERE " + " AND ".join(where_clauses)
 
-    query += " GROUP BY ws.id ORDER BY ws.start_time DESC"
+@reports_bp.route("/summary")
+@versions.conditional(versions.DEMANDS, versions.WORK_LOGS)
+def summary():
+    start_date = request.args.get("start_date")
+    end_date = request.args.get("end_date")
+
+    cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
 
+    totals = _period_totals(cur, start_date, end_date)
+
+    clauses, params = rollups.period_filters(start_date, end_date, column="r.day")
+    query = """
+        SELECT
+            d.id,
+            d.title,
+            d.status,
+            SUM(r.minutes) AS minutes,
+            SUM(r.log_count) AS log_count,
+            MAX(r.day) AS last_day
+        FROM daily_demand_minutes r
+        JOIN demands d ON d.id = r.demand_id
+    """
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " GROUP BY r.demand_id ORDER BY minutes DESC"
     cur.execute(query, tuple(params))
-    work_sessions = cur.fetchall()
+    by_demand = cur.fetchall()
+
+    clauses, params = rollups.period_filters(start_date, end_date)
+    query = "SELECT day, session_count, total_minutes FROM daily_session_minutes"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY day DESC"
+    cur.execute(query, tuple(params))
+    by_day = cur.fetchall()
     cur.close()
 
     return render_template(
-        "pages/reports/index.html",
-        sessions=work_sessions,
+        "pages/reports/summary.html",
+        totals=totals,
+        by_demand=by_demand,
+        by_day=by_day,
         start_date=start_date,
         end_date=end_date,
     )
 
 
-@reports_bp.route("/export", methods=["POST"])
-def export_report():
-    start_date = request.form.get("start_date")
-    end_date = request.form.get("end_date")
+EXPORT_QUERY_FROM = """
+    FROM work_sessions ws
+    JOIN work_logs wl ON ws.id = wl.work_session_id
+    JOIN demands d ON wl.demand_id = d.id
+"""
+
+
+def export_filename(job):
+    extension = EXPORT_FORMATS[job["format"]][0]
+    period = "_".join(
+        str(d).replace("-", "") for d in (job["start_date"], job["end_date"]) if d
+    )
+    return f"Relatorio_Horas_{period or 'completo'}.{extension}"
+
+
+def build_export(job, out, progress):
+    """
+    Grava a exportação de `job` em `out` e devolve o número de linhas;
+    executada pelo pool de export_jobs, fora da requisição.
+    """
+    start_date = job["start_date"] and str(job["start_date"])
+    end_date = job["end_date"] and str(job["end_date"])
+    where_clauses, params = _session_filters(start_date, end_date)
+    where = " WHERE " + " AND ".join(where_clauses) if where_clauses else ""
 
     cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+    cur.execute(f"SELECT COUNT(*) AS total {EXPORT_QUERY_FROM}{where}", tuple(params))
+    total = cur.fetchone()["total"]
+    cur.close()
+    if not total:
+        return 0
+    progress(0, total)
 
-    query = """
-        SELECT 
+    # Cursor do lado do servidor: as linhas são lidas do MySQL em lotes,
+    # sem carregar o resultado inteiro na memória do worker. As tuplas já vêm
+    # na ordem de EXPORT_COLUMNS e viram colunas sem conversão intermediária.
+    cur = mysql.connection.cursor(MySQLdb.cursors.SSCursor)
+    cur.execute(
+        """
+        SELECT
             ws.start_time,
             ws.end_time,
             ws.total_minutes,
             d.title AS demand_title,
             wl.minutes_spent,
             wl.description
-        FROM work_sessions ws
-        JOIN work_logs wl ON ws.id = wl.work_session_id
-        JOIN demands d ON wl.demand_id = d.id
-    """
-    params = []
+        """
+        + EXPORT_QUERY_FROM
+        + where
+        + " ORDER BY ws.start_time ASC, d.title ASC",
+        tuple(params),
+    )
+    rows_done = 0
 
-    where_clauses = []
-    if start_date:
-        where_clauses.append("ws.start_time >= %s")
-        params.append(start_date)
-    if end_date:
-        where_clauses.append("ws.end_time <= %s")
-        params.append(end_date + " 23:59:59")
+    def generate_chunks():
+        nonlocal rows_done
+        chunk_size = current_app.config["EXPORT_CHUNK_SIZE"]
+        try:
+            chunk = cur.fetchmany(chunk_size)
+            while chunk:
+                yield chunk
+                rows_done += len(chunk)
+                progress(rows_done, total)
+                chunk = cur.fetchmany(chunk_size)
+        finally:
+            cur.close()
 
-    if where_clauses:
-        query += " WHERE " + " AND ".join(where_clauses)
+    def xlsx_rows():
+        for chunk in generate_chunks():
+            for row in chunk:
+                yield [_format_datetime(row[0]), _format_datetime(row[1]), *row[2:]]
 
-    query += " ORDER BY ws.start_time ASC, d.title ASC"
+    export_format = job["format"]
+    if export_format == "xlsx":
+        body = exporters.stream_xlsx(
+            EXPORT_HEADERS, xlsx_rows(), sheet_name="HorasTrabalhadas"
+        )
+    elif export_format == "csv":
+        body = exporters.stream_csv(
+            [name for name, _ in EXPORT_COLUMNS], generate_chunks()
+        )
+    else:
+        body = exporters.stream_arrow(
+            EXPORT_COLUMNS, generate_chunks(), format=export_format
+        )
+    for data in body:
+        out.write(data)
+    return rows_done
+
+
+def _job_status(job):
+    status = {
+        "id": job["id"],
+        "status": job["status"],
+        "format": job["format"],
+        "rows_done": job["rows_done"],
+        "rows_total": job["rows_total"],
+        "progress": None,
+        "error": job["error"],
+        "download_url": None,
+    }
+    if job["rows_total"]:
+        status["progress"] = round(100 * job["rows_done"] / job["rows_total"])
+    if job["status"] == export_jobs.DONE and job["artifact_key"]:
+        status["download_url"] = url_for("reports.download_export", job_id=job["id"])
+    return status
 
-    cur.execute(query, tuple(params))
-    data = cur.fetchall()
-    cur.close()
 
-    if not data:
-        flash("Nenhum dado encontrado para exportar no período selecionado.", "warning")
+@reports_bp.route("/export", methods=["POST"])
+def export_report():
+    """
+    Registra a exportação em segundo plano (ou reaproveita uma equivalente)
+    e leva para a página de acompanhamento; chamadas que aceitam JSON
+    recebem 202 com o id do job.
+    """
+    start_date = request.form.get("start_date") or None
+    end_date = request.form.get("end_date") or None
+    export_format = request.form.get("format", "xlsx")
+
+    try:
+        start_date, end_date = (
+            date.fromisoformat(value).isoformat() if value else None
+            for value in (start_date, end_date)
+        )
+    except ValueError:
+        message = "Período inválido: use datas no formato AAAA-MM-DD."
+        if request.accept_mimetypes.best == "application/json":
+            return jsonify({"status": "error", "message": message}), 400
+        flash(message, "danger")
         return redirect(url_for("reports.index"))
 
-    # Create a pandas DataFrame
-    df = pd.DataFrame(data)
-
-    # Format data for Excel
-    df.rename(
-        columns={
-            "start_time": "Início da Sessão",
-            "end_time": "Fim da Sessão",
-            "total_minutes": "Duração Total da Sessão (min)",
-            "demand_title": "Demanda",
-            "minutes_spent": "Minutos Alocados na Demanda",
-            "description": "Descrição do Trabalho",
-        },
-        inplace=True,
-    )
+    if export_format not in EXPORT_FORMATS:
+        flash("Formato de exportação inválido.", "danger")
+        return redirect(url_for("reports.index"))
+    if export_format in ("parquet", "arrow") and not importlib.util.find_spec(
+        "pyarrow"
+    ):
+        flash("Exportação em Parquet/Arrow indisponível (pyarrow ausente).", "danger")
+        return redirect(url_for("reports.index"))
 
-    df["Início da Sessão"] = pd.to_datetime(df["Início da Sessão"]).dt.strftime(
-        "%d/%m/%Y %H:%M"
-    )
-    df["Fim da Sessão"] = pd.to_datetime(df["Fim da Sessão"]).dt.strftime(
-        "%d/%m/%Y %H:%M"
+    job_id, reused = export_jobs.enqueue(
+        start_date,
+        end_date,
+        export_format,
+        EXPORT_FORMATS[export_format][0],
+        build_export,
     )
 
-    # Create an in-memory Excel file
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="HorasTrabalhadas")
+    if request.accept_mimetypes.best == "application/json":
+        return (
+            jsonify(
+                job_id=job_id,
+                reused=reused,
+                status_url=url_for("reports.export_status", job_id=job_id),
+            ),
+            202,
+        )
+    return redirect(url_for("reports.export_job", job_id=job_id))
 
-    output.seek(0)
 
-    filename = f"Relatorio_Horas_{datetime.now().strftime('%Y%m%d')}.xlsx"
+def _get_job_or_404(job_id):
+    job = export_jobs.get(job_id)
+    if job is None:
+        abort(404)
+    return job
 
-    return send_file(
-        output,
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        as_attachment=True,
-        download_name=filename,
+
+@reports_bp.route("/exports/<job_id>")
+def export_job(job_id):
+    job = _get_job_or_404(job_id)
+    return render_template(
+        "pages/reports/export_job.html",
+        job=_job_status(job),
+        filename=export_filename(job),
     )
+
+
+@reports_bp.route("/exports/<job_id>/status")
+def export_status(job_id):
+    return jsonify(_job_status(_get_job_or_404(job_id)))
+
+
+@reports_bp.route("/exports/<job_id>/download")
+def download_export(job_id):
+    job = _get_job_or_404(job_id)
+    if job["status"] != export_jobs.DONE or not job["artifact_key"]:
+        abort(404)
+    filename = export_filename(job)
+    if export_jobs.stored_locally(current_app.config):
+        path = export_jobs.local_path(current_app.config, job["artifact_key"])
+        if not os.path.exists(path):
+            abort(404)
+        return send_file(
+            path,
+            mimetype=EXPORT_FORMATS[job["format"]][1],
+            as_attachment=True,
+            download_name=filename,
+        )
+    return redirect(export_jobs.download_url(job, filename))
@@ -1,9 +1,13 @@
 # blueprints/tracker.py
+import uuid
 from datetime import datetime
 
-import MySQLdb.cursors
-from flask import Blueprint, flash, jsonify, render_template, request
+from flask import Blueprint, current_app, flash, jsonify, render_template, request
 
+import events
+import priorities
+import rollups
+import versions
 from extensions import mysql
 
 tracker_bp = Blueprint("tracker", __name__)
@@ -11,80 +15,203 @@ tracker_bp = Blueprint("tracker", __name__)
 
 @tracker_bp.route("/")
 def index():
-    cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-    cur.execute(
-        "SELECT id, title FROM demands WHERE status IN ('Em Fila', 'Em Execução') ORDER BY priority ASC"
-    )
-    pending_demands = cur.fetchall()
-    cur.close()
+    pending_demands = priorities.active_queue()
     return render_template("pages/tracker/index.html", pending_demands=pending_demands)
 
 
-@tracker_bp.route("/log_work", methods=["POST"])
-def log_work():
-    data = request.get_json()
+def _parse_iso(value):
+    # Lida com o formato 'Z' (Zulu time) enviado pelo JavaScript que o fromisoformat() não entende nativamente
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    return datetime.fromisoformat(value)
+
+
+def _parse_session(data):
+    """Valida o payload de uma sessão de trabalho. Lança ValueError se inválido."""
+    if not isinstance(data, dict):
+        raise ValueError("Dados incompletos.")
+
     start_time_str = data.get("start_time")
     end_time_str = data.get("end_time")
     total_minutes = data.get("total_minutes")
     allocations = data.get("allocations")
+    session_uuid = data.get("session_uuid")
 
     if not all([start_time_str, end_time_str, total_minutes, allocations]):
-        return jsonify({"status": "error", "message": "Dados incompletos."}), 400
+        raise ValueError("Dados incompletos.")
+    if not isinstance(start_time_str, str) or not isinstance(end_time_str, str):
+        raise ValueError("Horários de início e fim devem ser textos ISO 8601.")
+    if not isinstance(allocations, list):
+        raise ValueError("Alocações devem ser uma lista.")
+    # Gerado pelo navegador: identifica a sessão nas reenvios da fila offline
+    if session_uuid is not None:
+        try:
+            session_uuid = str(uuid.UUID(session_uuid))
+        except (AttributeError, TypeError, ValueError):
+            raise ValueError("Identificador da sessão inválido.") from None
 
-    # Lida com o formato 'Z' (Zulu time) enviado pelo JavaScript que o fromisoformat() não entende nativamente
-    if start_time_str and start_time_str.endswith("Z"):
-        start_time_str = start_time_str[:-1] + "+00:00"
+    parsed_allocations = []
+    for alloc in allocations:
+        if not isinstance(alloc, dict):
+            raise ValueError("Alocação de demanda inválida.")
+        demand_id = alloc.get("demand_id")
+        minutes_spent = alloc.get("minutes_spent")
+        description = alloc.get("description")
 
-    if end_time_str and end_time_str.endswith("Z"):
-        end_time_str = end_time_str[:-1] + "+00:00"
+        if not all([demand_id, minutes_spent, description]):
+            raise ValueError("Alocação de demanda com dados incompletos.")
+        # "5" e 5 são a mesma demanda: os totais do lote são somados por id
+        if isinstance(demand_id, bool) or not isinstance(demand_id, (int, str)):
+            raise ValueError("Id de demanda inválido.")
+        try:
+            demand_id = int(demand_id)
+        except ValueError:
+            raise ValueError("Id de demanda inválido.") from None
 
-    # --- FIM DA CORREÇÃO ---
+        parsed_allocations.append(
+            {
+                "demand_id": demand_id,
+                "minutes_spent": minutes_spent,
+                "description": description,
+                "new_status": alloc.get("new_status"),
+            }
+        )
 
-    conn = mysql.connection
-    cur = conn.cursor()
+    return {
+        "start_time": _parse_iso(start_time_str),
+        "end_time": _parse_iso(end_time_str),
+        "total_minutes": total_minutes,
+        "allocations": parsed_allocations,
+        "session_uuid": session_uuid,
+    }
 
-    try:
 
-        start_time = datetime.fromisoformat(start_time_str)
-        end_time = datetime.fromisoformat(end_time_str)
-        # 1. Create the work session record
+def _stored_sessions(cur, sessions):
+    """{session_uuid: id} das sessões do lote que já foram gravadas antes."""
+    uuids = list({s["session_uuid"] for s in sessions if s["session_uuid"]})
+    if not uuids:
+        return {}
+    cur.execute(
+        "SELECT client_uuid, id FROM work_sessions "
+        f"WHERE client_uuid IN ({', '.join(['%s'] * len(uuids))})",
+        tuple(uuids),
+    )
+    return {client_uuid: session_id for client_uuid, session_id in cur.fetchall()}
+
+
+def _save_sessions(cur, sessions):
+    """
+    Grava as sessões e suas alocações com o mínimo de round-trips:
+    um INSERT por sessão (para obter o id), um executemany para todos os
+    work_logs, um único UPDATE agregado nos contadores das demandas e o
+    incremento dos totais diários.
+    Sessões cujo session_uuid já está gravado (reenvio da fila offline) não
+    são gravadas de novo. Retorna os ids das sessões, na ordem recebida.
+    """
+    stored = _stored_sessions(cur, sessions)
+    session_ids = []
+    new_session_ids = []
+    log_rows = []
+    minutes_by_demand = {}
+    status_by_demand = {}
+
+    for session in sessions:
+        session_uuid = session["session_uuid"]
+        if session_uuid in stored:
+            session_ids.append(stored[session_uuid])
+            continue
+
         cur.execute(
-            "INSERT INTO work_sessions (start_time, end_time, total_minutes) VALUES (%s, %s, %s)",
-            (start_time, end_time, total_minutes),
+            "INSERT INTO work_sessions (start_time, end_time, total_minutes, client_uuid) "
+            "VALUES (%s, %s, %s, %s)",
+            (
+                session["start_time"],
+                session["end_time"],
+                session["total_minutes"],
+                session_uuid,
+            ),
         )
         session_id = cur.lastrowid
+        session_ids.append(session_id)
+        new_session_ids.append(session_id)
+        if session_uuid:
+            stored[session_uuid] = session_id
 
-        # 2. Iterate through allocations to create logs and update demands
-        for alloc in allocations:
-            demand_id = alloc.get("demand_id")
-            minutes_spent = alloc.get("minutes_spent")
-            description = alloc.get("description")
-            new_status = alloc.get("new_status")
+        for alloc in session["allocations"]:
+            demand_id = alloc["demand_id"]
+            log_rows.append(
+                (
+                    session_id,
+                    demand_id,
+                    alloc["minutes_spent"],
+                    alloc["description"],
+                    alloc["new_status"],
+                )
+            )
+            minutes_by_demand[demand_id] = minutes_by_demand.get(demand_id, 0) + float(
+                alloc["minutes_spent"]
+            )
+            # Em sessões sincronizadas em lote, prevalece o último status informado
+            if alloc["new_status"]:
+                status_by_demand[demand_id] = alloc["new_status"]
 
-            if not all([demand_id, minutes_spent, description]):
-                raise ValueError("Alocação de demanda com dados incompletos.")
+    if not new_session_ids:
+        return session_ids
 
-            # Create work_log
-            cur.execute(
-                "INSERT INTO work_logs (work_session_id, demand_id, minutes_spent, description, status_changed_to) VALUES (%s, %s, %s, %s, %s)",
-                (session_id, demand_id, minutes_spent, description, new_status),
-            )
+    cur.executemany(
+        "INSERT INTO work_logs (work_session_id, demand_id, minutes_spent, description, status_changed_to) VALUES (%s, %s, %s, %s, %s)",
+        log_rows,
+    )
 
-            # Update demand's executed_hours
-            hours_spent = float(minutes_spent) / 60.0
-            cur.execute(
-                "UPDATE demands SET executed_hours = executed_hours + %s WHERE id = %s",
-                (hours_spent, demand_id),
-            )
+    demand_ids = list(minutes_by_demand)
+    params = []
+    hours_cases = " ".join(["WHEN %s THEN %s"] * len(demand_ids))
+    for demand_id in demand_ids:
+        params.extend([demand_id, minutes_by_demand[demand_id] / 60.0])
+    query = f"UPDATE demands SET executed_hours = executed_hours + CASE id {hours_cases} END"
 
-            # Update demand's status if changed
-            if new_status:
-                cur.execute(
-                    "UPDATE demands SET status = %s WHERE id = %s",
-                    (new_status, demand_id),
-                )
+    if status_by_demand:
+        status_cases = " ".join(["WHEN %s THEN %s"] * len(status_by_demand))
+        for demand_id, new_status in status_by_demand.items():
+            params.extend([demand_id, new_status])
+        query += f", status = CASE id {status_cases} ELSE status END"
+
+    query += f" WHERE id IN ({', '.join(['%s'] * len(demand_ids))})"
+    params.extend(demand_ids)
+    cur.execute(query, tuple(params))
+    if status_by_demand:
+        events.publish(
+            cur,
+            events.STATUS,
+            {
+                "demands": [
+                    {"id": int(demand_id), "status": new_status}
+                    for demand_id, new_status in status_by_demand.items()
+                ]
+            },
+        )
+
+    # Totais diários dos relatórios, atualizados na mesma transação
+    rollups.record_sessions(cur, new_session_ids)
+    versions.bump(cur, versions.DEMANDS, versions.WORK_LOGS)
+
+    return session_ids
 
+
+@tracker_bp.route("/log_work", methods=["POST"])
+def log_work():
+    try:
+        session = _parse_session(request.get_json())
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    conn = mysql.connection
+    cur = conn.cursor()
+
+    try:
+        _save_sessions(cur, [session])
         conn.commit()
+        priorities.invalidate_queue()
         flash("Sessão de trabalho registrada com sucesso!", "success")
         return jsonify({"status": "success", "message": "Log de trabalho salvo."}), 201
 
@@ -94,3 +221,68 @@ def log_work():
         return jsonify({"status": "error", "message": f"Erro no servidor: {e}"}), 500
     finally:
         cur.close()
+
+
+@tracker_bp.route("/log_work/bulk", methods=["POST"])
+def log_work_bulk():
+    """Sincroniza várias sessões (ex.: registradas offline) em uma única transação."""
+    data = request.get_json() or {}
+    raw_sessions = data.get("sessions")
+
+    if not raw_sessions or not isinstance(raw_sessions, list):
+        return (
+            jsonify({"status": "error", "message": "Lista de sessões inválida."}),
+            400,
+        )
+
+    max_sessions = current_app.config["TRACKER_BULK_MAX_SESSIONS"]
+    if len(raw_sessions) > max_sessions:
+        return (
+            jsonify(
+                {
+                    "status": "error",
+                    "message": f"Envie no máximo {max_sessions} sessões por requisição.",
+                }
+            ),
+            413,
+        )
+
+    sessions = []
+    for index, raw_session in enumerate(raw_sessions):
+        try:
+            sessions.append(_parse_session(raw_session))
+        except ValueError as e:
+            return (
+                jsonify(
+                    {
+                        "status": "error",
+                        "message": f"Sessão {index}: {e}",
+                        "index": index,
+                    }
+                ),
+                400,
+            )
+
+    conn = mysql.connection
+    cur = conn.cursor()
+
+    try:
+        session_ids = _save_sessions(cur, sessions)
+        conn.commit()
+        priorities.invalidate_queue()
+        return (
+            jsonify(
+                {
+                    "status": "success",
+                    "message": f"{len(session_ids)} sessões sincronizadas.",
+                    "session_ids": session_ids,
+                }
+            ),
+            201,
+        )
+
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"status": "error", "message": f"Erro no servidor: {e}"}), 500
+    finally:
+        cur.close()
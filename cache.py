@@ -0,0 +1,338 @@
+# cache.py
+# Camada de cache com invalidação por versão (version stamp).
+#
+# Backends:
+#   - "local":  LRU/TTL em memória, por worker. As versões ficam em arquivos
+#               no mesmo host, então uma escrita em um worker invalida a
+#               cópia de todos os outros.
+#   - "socket": servidor local (socket Unix) compartilhado pelos workers do
+#               gunicorn; iniciado pelo gunicorn.conf.py ou `python -m cache`.
+#   - "null":   desativado (toda leitura é um miss).
+import argparse
+import fcntl
+import os
+import pickle
+import socket
+import socketserver
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+_FRAME = struct.Struct("!I")
+
+
+class LRUCache:
+    """Dicionário LRU com expiração por TTL, seguro para threads."""
+
+    def __init__(self, maxsize=256, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class FileVersions:
+    """Contadores de versão em arquivos, compartilhados pelos processos do host."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name.replace(":", "_") + ".version")
+
+    def get(self, name):
+        try:
+            with open(self._path(name), "rb") as f:
+                return int(f.read() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def bump(self, name):
+        with open(self._path(name), "a+b") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                version = int(f.read() or 0) + 1
+                f.seek(0)
+                f.truncate()
+                f.write(str(version).encode("ascii"))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return version
+
+
+class LocalBackend:
+    def __init__(self, maxsize, ttl, version_dir):
+        self._values = LRUCache(maxsize, ttl)
+        self._versions = FileVersions(version_dir)
+
+    def get_versioned(self, name):
+        version = self._versions.get(name)
+        return version, self._values.get(f"{name}:v{version}")
+
+    def set_versioned(self, name, version, value, ttl=None):
+        self._values.set(f"{name}:v{version}", value, ttl)
+
+    def bump(self, name):
+        return self._versions.bump(name)
+
+    def version(self, name):
+        return self._versions.get(name)
+
+
+class NullBackend:
+    def get_versioned(self, name):
+        return 0, None
+
+    def set_versioned(self, name, version, value, ttl=None):
+        pass
+
+    def bump(self, name):
+        return 0
+
+    def version(self, name):
+        return 0
+
+
+def _send(sock, payload):
+    data = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+    sock.sendall(_FRAME.pack(len(data)) + data)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError("Conexão com o servidor de cache encerrada.")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv(sock):
+    (size,) = _FRAME.unpack(_recv_exact(sock, _FRAME.size))
+    # O socket é local e só acessível ao usuário da aplicação (modo 0600).
+    return pickle.loads(_recv_exact(sock, size))  # nosec B301
+
+
+class SocketBackend:
+    """
+    Cliente do servidor de cache local. Qualquer falha de comunicação na
+    leitura vira um miss: a aplicação cai para o banco, nunca para um valor
+    antigo. Se um incremento de versão não chega ao servidor, o nome é
+    invalidado pelo contador em arquivo (FileVersions), visto por todos os
+    workers do host, e o valor que ficou no servidor deixa de ser servido.
+    A versão devolvida é o par (versão do servidor, versão do arquivo).
+    """
+
+    def __init__(self, path, version_dir, timeout=0.5):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._fallback = FileVersions(version_dir)
+
+    def _call(self, *request):
+        sock = getattr(self._local, "sock", None)
+        try:
+            if sock is None:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.settimeout(self.timeout)
+                sock.connect(self.path)
+                self._local.sock = sock
+            _send(sock, request)
+            return _recv(sock)
+        except (OSError, ConnectionError, pickle.PickleError, struct.error):
+            if sock is not None:
+                sock.close()
+            self._local.sock = None
+            return None
+
+    def get_versioned(self, name):
+        # Lida antes do servidor, como a versão no LocalBackend
+        fallback = self._fallback.get(name)
+        result = self._call("vget", name)
+        if result is None:
+            return None, None
+        version, entry = result
+        if entry is None or entry[0] != fallback:
+            return (version, fallback), None
+        return (version, fallback), entry[1]
+
+    def set_versioned(self, name, version, value, ttl=None):
+        if version is not None:
+            server_version, fallback = version
+            self._call("vset", name, server_version, (fallback, value), ttl)
+
+    def bump(self, name):
+        version = self._call("bump", name)
+        if version is None:
+            current_app.logger.warning(
+                "Servidor de cache indisponível ao invalidar %s; "
+                "usando o contador em arquivo.",
+                name,
+            )
+            return None, self._fallback.bump(name)
+        return version, self._fallback.get(name)
+
+    def version(self, name):
+        return self._call("version", name), self._fallback.get(name)
+
+
+class _CacheRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        store = self.server.store
+        while True:
+            try:
+                op, *args = _recv(self.request)
+            except (ConnectionError, OSError, EOFError):
+                return
+            _send(self.request, store.dispatch(op, args))
+
+
+class _CacheStore:
+    def __init__(self, maxsize, ttl):
+        self.values = LRUCache(maxsize, ttl)
+        self.versions = {}
+        self.lock = threading.Lock()
+
+    def dispatch(self, op, args):
+        if op == "vget":
+            (name,) = args
+            with self.lock:
+                version = self.versions.get(name, 0)
+            return version, self.values.get(f"{name}:v{version}")
+        if op == "vset":
+            name, version, value, ttl = args
+            self.values.set(f"{name}:v{version}", value, ttl)
+            return True
+        if op == "bump":
+            (name,) = args
+            with self.lock:
+                self.versions[name] = self.versions.get(name, 0) + 1
+                return self.versions[name]
+        if op == "version":
+            (name,) = args
+            with self.lock:
+                return self.versions.get(name, 0)
+        return None
+
+
+class CacheServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, maxsize=1024, ttl=300):
+        if os.path.exists(path):
+            os.unlink(path)
+        self.store = _CacheStore(maxsize, ttl)
+        super().__init__(path, _CacheRequestHandler)
+        os.chmod(path, 0o600)
+
+    def start_in_thread(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+class Cache:
+    """Extensão Flask que escolhe o backend a partir de CACHE_BACKEND."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        config = app.config
+        kind = config.get("CACHE_BACKEND", "local")
+        version_dir = config.get("CACHE_VERSION_DIR") or os.path.join(
+            tempfile.gettempdir(), "demand-tracker-cache"
+        )
+        if kind == "local":
+            backend = LocalBackend(
+                config.get("CACHE_MAXSIZE", 256),
+                config.get("CACHE_TTL", 300),
+                version_dir,
+            )
+        elif kind == "socket":
+            backend = SocketBackend(config["CACHE_SOCKET_PATH"], version_dir)
+        elif kind == "null":
+            backend = NullBackend()
+        else:
+            raise ValueError(f"CACHE_BACKEND desconhecido: {kind}")
+        app.extensions["cache"] = backend
+
+    @property
+    def backend(self):
+        return current_app.extensions["cache"]
+
+    @property
+    def enabled(self):
+        return not isinstance(self.backend, NullBackend)
+
+    def get_or_load(self, name, loader, ttl=None):
+        """
+        Devolve o valor da versão atual de `name` ou chama `loader()` e o
+        guarda. A versão é lida antes do loader, então um valor carregado
+        durante uma escrita fica na versão antiga e nunca é servido depois.
+        """
+        version, value = self.backend.get_versioned(name)
+        if value is None:
+            value = loader()
+            self.backend.set_versioned(name, version, value, ttl)
+        return value
+
+    def invalidate(self, name):
+        return self.backend.bump(name)
+
+    def version(self, name):
+        return self.backend.version(name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de cache local.")
+    parser.add_argument("--socket", required=True, help="Caminho do socket Unix")
+    parser.add_argument("--maxsize", type=int, default=1024)
+    parser.add_argument("--ttl", type=int, default=300)
+    args = parser.parse_args()
+
+    server = CacheServer(args.socket, args.maxsize, args.ttl)
+    print(f"Servidor de cache ouvindo em {args.socket}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,32 @@ class Config:
     S3_BUCKET = os.environ.get("S3_BUCKET")
     S3_LOCATION = f"https://{S3_BUCKET}.s3.amazonaws.com/"
 
+    # Endpoint alternativo do S3 (ex.: MinIO/LocalStack em desenvolvimento).
+    S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL") or None
+
+    # Links de download: validade da URL pré-assinada e margem de segurança
+    # com que ela deixa o cache antes de expirar.
+    S3_PRESIGNED_URL_EXPIRES = int(os.environ.get("S3_PRESIGNED_URL_EXPIRES", "300"))
+    S3_PRESIGNED_URL_MARGIN = int(os.environ.get("S3_PRESIGNED_URL_MARGIN", "60"))
+    S3_PRESIGN_CACHE_SIZE = int(os.environ.get("S3_PRESIGN_CACHE_SIZE", "1024"))
+
+    # Envio de anexos: uploads em paralelo e multipart para arquivos grandes.
+    S3_UPLOAD_WORKERS = int(os.environ.get("S3_UPLOAD_WORKERS", "4"))
+    S3_MULTIPART_THRESHOLD = int(
+        os.environ.get("S3_MULTIPART_THRESHOLD", str(8 * 1024 * 1024))
+    )
+    S3_MULTIPART_PART_SIZE = int(
+        os.environ.get("S3_MULTIPART_PART_SIZE", str(8 * 1024 * 1024))
+    )
+    S3_MULTIPART_CONCURRENCY = int(os.environ.get("S3_MULTIPART_CONCURRENCY", "4"))
+
+    # Conexões HTTP mantidas pelo cliente S3 compartilhado. Com workers gevent
+    # muitas requisições usam o cliente ao mesmo tempo; acima deste número
+    # as conexões excedentes são abertas e descartadas a cada chamada.
+    # Nunca fica abaixo de S3_UPLOAD_WORKERS × S3_MULTIPART_CONCURRENCY
+    # (ver storage.max_pool_connections).
+    S3_MAX_POOL_CONNECTIONS = int(os.environ.get("S3_MAX_POOL_CONNECTIONS", "10"))
+
     # Configuração do Banco de Dados MySQL lida das variáveis de ambiente.
     MYSQL_HOST = os.environ.get(
         "MYSQL_HOST", "bs9ttstmwbpyexuox7iu-mysql.services.clever-cloud.com"
@@ -22,6 +48,106 @@ class Config:
     MYSQL_DB = os.environ.get("MYSQL_DB", "bs9ttstmwbpyexuox7iu")
     MYSQL_CURSORCLASS = "DictCursor"  # Adicionado aqui para centralizar a configuração.
 
+    # "mysqlclient" (extensão em C) ou "pymysql" (Python puro, cooperativo com
+    # workers gevent; ver extensions.py e gunicorn.conf.py).
+    MYSQL_DRIVER = os.environ.get("MYSQL_DRIVER", "mysqlclient")
+
+    # Pool de conexões (extensions.ConnectionPool): evita um handshake
+    # TCP+TLS+auth com o MySQL remoto a cada requisição.
+    MYSQL_POOL_SIZE = int(os.environ.get("MYSQL_POOL_SIZE", "5"))
+    MYSQL_POOL_MAX_OVERFLOW = int(os.environ.get("MYSQL_POOL_MAX_OVERFLOW", "10"))
+    MYSQL_POOL_TIMEOUT = float(os.environ.get("MYSQL_POOL_TIMEOUT", "30"))
+    MYSQL_POOL_PRE_PING = os.environ.get("MYSQL_POOL_PRE_PING", "1") == "1"
+    MYSQL_POOL_RECYCLE = int(os.environ.get("MYSQL_POOL_RECYCLE", "3600"))
+
+    # Quantidade de demandas por página no painel (paginação por cursor).
+    DEMANDS_PAGE_SIZE = int(os.environ.get("DEMANDS_PAGE_SIZE", "50"))
+
+    # Sessões por página no relatório de horas (paginação por cursor).
+    REPORTS_PAGE_SIZE = int(os.environ.get("REPORTS_PAGE_SIZE", "100"))
+
+    # Limite de itens por página na API de demandas (/demands/api).
+    DEMANDS_API_MAX_LIMIT = int(os.environ.get("DEMANDS_API_MAX_LIMIT", "500"))
+
+    # Registros por página no histórico de trabalho do detalhe da demanda.
+    DEMAND_HISTORY_PAGE_SIZE = int(os.environ.get("DEMAND_HISTORY_PAGE_SIZE", "50"))
+
+    # Máximo de resultados da busca textual (/demands/search).
+    SEARCH_RESULTS_LIMIT = int(os.environ.get("SEARCH_RESULTS_LIMIT", "50"))
+
+    # Linhas lidas do banco por lote na exportação de relatórios (streaming).
+    EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", "2000"))
+
+    # Exportações em segundo plano (export_jobs.py): threads por worker (0
+    # executa na própria requisição), validade do arquivo pronto e tempo sem
+    # progresso após o qual um job em andamento é considerado perdido.
+    EXPORT_JOB_WORKERS = int(os.environ.get("EXPORT_JOB_WORKERS", "2"))
+    EXPORT_JOB_TTL = int(os.environ.get("EXPORT_JOB_TTL", str(24 * 3600)))
+    EXPORT_JOB_STALE_SECONDS = int(os.environ.get("EXPORT_JOB_STALE_SECONDS", "600"))
+    # Diretório dos arquivos prontos quando S3_BUCKET não está configurado
+    # (padrão: pasta no diretório temporário do sistema).
+    EXPORT_LOCAL_DIR = os.environ.get("EXPORT_LOCAL_DIR")
+
+    # Eventos da fila por SSE (events.py): intervalo de leitura do broker,
+    # retenção na tabela demand_events, duração máxima de cada conexão (o
+    # navegador reconecta) e intervalo dos heartbeats.
+    EVENTS_POLL_INTERVAL = float(os.environ.get("EVENTS_POLL_INTERVAL", "1.0"))
+    EVENTS_RETENTION_SECONDS = int(
+        os.environ.get("EVENTS_RETENTION_SECONDS", str(24 * 3600))
+    )
+    EVENTS_STREAM_SECONDS = int(os.environ.get("EVENTS_STREAM_SECONDS", "300"))
+    EVENTS_HEARTBEAT_SECONDS = int(os.environ.get("EVENTS_HEARTBEAT_SECONDS", "15"))
+    # Streams SSE simultâneos por processo. Cada um prende uma thread do
+    # worker gthread: o padrão deixa 6 das 8 threads livres para as páginas
+    # (com --workers 3, até 6 painéis recebem eventos pelo stream). Os demais
+    # consultam /demands/events/poll a cada EVENTS_POLL_FALLBACK_SECONDS. O
+    # gunicorn.conf.py ajusta o limite ao tipo de worker (0 no "sync").
+    EVENTS_MAX_SUBSCRIBERS = int(os.environ.get("EVENTS_MAX_SUBSCRIBERS", "2"))
+    EVENTS_POLL_FALLBACK_SECONDS = int(
+        os.environ.get("EVENTS_POLL_FALLBACK_SECONDS", "15")
+    )
+
+    # Limite de sessões aceitas por requisição na sincronização em lote do tracker.
+    TRACKER_BULK_MAX_SESSIONS = int(os.environ.get("TRACKER_BULK_MAX_SESSIONS", "500"))
+
+    # Cache da fila de demandas ativas: "local" (LRU/TTL por worker),
+    # "socket" (servidor local compartilhado entre workers) ou "null".
+    CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "local")
+    CACHE_MAXSIZE = int(os.environ.get("CACHE_MAXSIZE", "256"))
+    CACHE_TTL = int(os.environ.get("CACHE_TTL", "300"))
+    CACHE_SOCKET_PATH = os.environ.get(
+        "CACHE_SOCKET_PATH", "/tmp/demand-tracker-cache.sock"
+    )
+    # Contadores de versão em arquivo: usados pelo backend "local" e, no
+    # "socket", quando o servidor não recebe uma invalidação.
+    CACHE_VERSION_DIR = os.environ.get("CACHE_VERSION_DIR")
+
+    # Cache dos templates (templating.py): diretório do bytecode compilado,
+    # compartilhado pelos workers (vazio desativa), e LRU por worker dos
+    # trechos marcados com {% cache %}.
+    TEMPLATE_BYTECODE_CACHE_DIR = os.environ.get("TEMPLATE_BYTECODE_CACHE_DIR")
+    FRAGMENT_CACHE_ENABLED = os.environ.get("FRAGMENT_CACHE_ENABLED", "1") == "1"
+    FRAGMENT_CACHE_MAXSIZE = int(os.environ.get("FRAGMENT_CACHE_MAXSIZE", "512"))
+    FRAGMENT_CACHE_TTL = int(os.environ.get("FRAGMENT_CACHE_TTL", "300"))
+
+    # Métricas no formato do Prometheus em /metrics (ver metrics.py).
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+
+    # Perfil de SQL por requisição (querylog.py): opt-in, para desenvolvimento.
+    QUERY_LOG_ENABLED = os.environ.get("QUERY_LOG_ENABLED", "0") == "1"
+    QUERY_LOG_SLOW_MS = float(os.environ.get("QUERY_LOG_SLOW_MS", "100"))
+    QUERY_LOG_REPEAT_THRESHOLD = int(os.environ.get("QUERY_LOG_REPEAT_THRESHOLD", "5"))
+    QUERY_LOG_EXPLAIN = os.environ.get("QUERY_LOG_EXPLAIN", "1") == "1"
+    QUERY_LOG_PANEL = os.environ.get("QUERY_LOG_PANEL", "1") == "1"
+    QUERY_LOG_HISTORY = int(os.environ.get("QUERY_LOG_HISTORY", "100"))
+    QUERY_LOG_DUMP_PATH = os.environ.get("QUERY_LOG_DUMP_PATH")
+
+    # GET condicional (ETag) nas páginas de leitura, a partir dos contadores
+    # de versão em data_versions (ver versions.py). APP_RELEASE identifica o
+    # deploy; sem ele, o ETag usa as datas de modificação dos templates.
+    CONDITIONAL_GET_ENABLED = os.environ.get("CONDITIONAL_GET_ENABLED", "1") == "1"
+    APP_RELEASE = os.environ.get("APP_RELEASE")
+
     # Configuração de Upload de Arquivos
     # AVISO: O sistema de arquivos do Render é efêmero. Uploads serão perdidos em reinicializações.
     # A solução permanente é usar um serviço de armazenamento como o AWS S3.
@@ -51,3 +177,12 @@ class TestConfig(Config):
     MYSQL_USER = os.environ.get("TEST_MYSQL_USER", "")
     MYSQL_PASSWORD = os.environ.get("TEST_MYSQL_PASSWORD", "")
     MYSQL_DB = os.environ.get("TEST_MYSQL_DB", "")
+
+    # Cache, trechos de template e GET condicional desligados: cada teste
+    # controla o que o banco (mock) devolve
+    CACHE_BACKEND = "null"
+    CONDITIONAL_GET_ENABLED = False
+    FRAGMENT_CACHE_ENABLED = False
+
+    # Exportações executadas na própria requisição
+    EXPORT_JOB_WORKERS = 0
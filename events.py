@@ -0,0 +1,226 @@
+# events.py
+# Eventos da fila de demandas (prioridade, status, demandas novas) enviados
+# aos navegadores por Server-Sent Events em /demands/events.
+#
+# Cada escrita grava o evento na tabela demand_events, na mesma transação da
+# alteração. Em cada processo, uma única thread (o broker) lê os eventos
+# novos e os distribui às conexões SSE abertas nesse processo; assim o aviso
+# chega a todos os workers e hosts com uma consulta por processo, e não uma
+# por navegador.
+#
+# Cada stream aberto ocupa uma thread (gthread) ou um greenlet (gevent) do
+# worker por até EVENTS_STREAM_SECONDS. Acima de EVENTS_MAX_SUBSCRIBERS
+# streams no processo, o navegador passa a consultar /demands/events/poll,
+# que responde na hora com os eventos em memória.
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import MySQLdb.cursors
+from flask import current_app
+
+import extensions
+import fastjson
+
+# Tipos de evento (o campo `event:` do SSE).
+DEMAND = "demand"  # demanda criada ou editada: id, title, status, priority
+MOVE = "move"  # demanda reposicionada: id, priority, before_id/after_id
+REORDER = "reorder"  # nova ordem de um trecho da fila: ids
+STATUS = "status"  # status alterados pelo registro de horas: demands[id, status]
+RESET = "reset"  # eventos perdidos: o cliente deve recarregar a página
+
+# Eventos mantidos em memória para quem reconecta com Last-Event-ID.
+BUFFER_SIZE = 1000
+
+# Ids anteriores ao último lido que são consultados de novo: um evento de
+# id menor pode ser confirmado (commit) depois de um de id maior.
+LOOKBACK_IDS = 100
+
+# Intervalo entre limpezas dos eventos antigos na tabela.
+PRUNE_INTERVAL_SECONDS = 600
+
+_lock = threading.Lock()
+_broker = None
+
+
+def publish(cur, kind, payload):
+    """Registra o evento; chamar antes do commit da escrita."""
+    cur.execute(
+        "INSERT INTO demand_events (kind, payload) VALUES (%s, %s)",
+        (kind, fastjson.dumps(payload).decode("utf-8")),
+    )
+
+
+def last_id():
+    """Último evento gravado; a página o usa para assinar o stream sem lacunas."""
+    cur = extensions.mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+    cur.execute("SELECT MAX(id) AS last_id FROM demand_events")
+    row = cur.fetchone()
+    cur.close()
+    return (row and row["last_id"]) or 0
+
+
+def format_event(event_id, kind, data):
+    return f"id: {event_id}\nevent: {kind}\ndata: {data}\n\n"
+
+
+class Broker:
+    """Lê demand_events periodicamente e repassa aos assinantes do processo."""
+
+    def __init__(self, app):
+        self.app = app
+        self.poll_interval = app.config["EVENTS_POLL_INTERVAL"]
+        self.retention = app.config["EVENTS_RETENTION_SECONDS"]
+        self.max_subscribers = app.config["EVENTS_MAX_SUBSCRIBERS"]
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._buffer = deque(maxlen=BUFFER_SIZE)  # (id, kind, data)
+        self._seen = set()
+        self.last_id = None
+        # Eventos até este id não estão (ou não estão mais) no buffer
+        self._floor = None
+        self.pid = os.getpid()
+        self._last_prune = time.monotonic()
+        self._thread = threading.Thread(
+            target=self._run, name="demand-events", daemon=True
+        )
+
+    def start(self):
+        self.last_id = self._query(
+            "SELECT COALESCE(MAX(id), 0) AS last_id FROM demand_events"
+        )[0]["last_id"]
+        self._floor = self.last_id
+        self._thread.start()
+
+    def _query(self, sql, params=()):
+        pool = self.app.extensions["mysql"]
+        conn = pool.checkout()
+        try:
+            cur = conn.cursor(MySQLdb.cursors.DictCursor)
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+            # Encerra a transação de leitura: a próxima consulta enxerga os
+            # eventos confirmados depois desta
+            conn.commit()
+            cur.close()
+            return rows
+        finally:
+            pool.checkin(conn)
+
+    def _backlog(self, after_id):
+        # Chamado com self._lock
+        if after_id is None:
+            return []
+        if after_id < self._floor:
+            # O cliente perdeu eventos: recarrega a página
+            return [(self.last_id, RESET, "{}")]
+        return [item for item in self._buffer if item[0] > after_id]
+
+    def subscribe(self, after_id=None):
+        """
+        Nova fila de eventos. Com `after_id`, já recebe os eventos posteriores
+        ainda em memória, ou um evento "reset" se eles não estão mais lá.
+        Devolve None quando o processo já tem EVENTS_MAX_SUBSCRIBERS streams.
+        """
+        subscriber = queue.SimpleQueue()
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            for item in self._backlog(after_id):
+                subscriber.put(item)
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def events_since(self, after_id):
+        """Eventos em memória após `after_id` e o último id lido (polling)."""
+        with self._lock:
+            return self._backlog(after_id), self.last_id
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def poll(self):
+        rows = self._query(
+            "SELECT id, kind, payload FROM demand_events WHERE id > %s ORDER BY id",
+            (max(0, self.last_id - LOOKBACK_IDS),),
+        )
+        with self._lock:
+            for row in rows:
+                if row["id"] in self._seen:
+                    continue
+                item = (row["id"], row["kind"], row["payload"])
+                if len(self._buffer) == self._buffer.maxlen:
+                    evicted_id = self._buffer[0][0]
+                    self._seen.discard(evicted_id)
+                    self._floor = max(self._floor, evicted_id)
+                self._buffer.append(item)
+                self._seen.add(row["id"])
+                self.last_id = max(self.last_id, row["id"])
+                for subscriber in self._subscribers:
+                    subscriber.put(item)
+
+    def prune(self):
+        pool = self.app.extensions["mysql"]
+        conn = pool.checkout()
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                "DELETE FROM demand_events "
+                "WHERE created_at < NOW() - INTERVAL %s SECOND",
+                (self.retention,),
+            )
+            conn.commit()
+            cur.close()
+        finally:
+            pool.checkin(conn)
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self.poll()
+                if time.monotonic() - self._last_prune >= PRUNE_INTERVAL_SECONDS:
+                    self._last_prune = time.monotonic()
+                    self.prune()
+            except Exception:
+                self.app.logger.exception("Falha ao ler demand_events")
+
+
+def get_broker():
+    """Broker do processo, iniciado na primeira assinatura (após o fork)."""
+    global _broker
+    with _lock:
+        if _broker is None or _broker.pid != os.getpid():
+            _broker = Broker(current_app._get_current_object())
+            _broker.start()
+    return _broker
+
+
+def stream(broker, subscriber, max_seconds, heartbeat_seconds):
+    """
+    Corpo da resposta SSE. Encerra após `max_seconds` (o EventSource
+    reconecta sozinho, com Last-Event-ID) para não prender a thread do
+    worker indefinidamente.
+    """
+    deadline = time.monotonic() + max_seconds
+    try:
+        # Intervalo de reconexão sugerido ao navegador
+        yield "retry: 2000\n\n"
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                event_id, kind, data = subscriber.get(
+                    timeout=min(heartbeat_seconds, remaining)
+                )
+            except queue.Empty:
+                # Comentário SSE: mantém a conexão viva em proxies
+                yield ": ping\n\n"
+                continue
+            yield format_event(event_id, kind, data)
+    finally:
+        broker.unsubscribe(subscriber)
@@ -0,0 +1,260 @@
+# export_jobs.py
+# Exportações do relatório em segundo plano.
+#
+# A requisição só registra o job (tabela export_jobs) e devolve o id; um pool
+# de threads local ao worker monta o arquivo, grava o progresso no banco e
+# envia o resultado para o S3. Como o estado fica no banco e o arquivo no S3,
+# o acompanhamento e o download funcionam a partir de qualquer worker/host.
+# Sem S3_BUCKET configurado, o arquivo fica em EXPORT_LOCAL_DIR e o download
+# só funciona nos workers do mesmo host.
+#
+# Os arquivos prontos são reaproveitados: a chave do job combina período,
+# formato e as versões dos dados (versions.py), então a mesma exportação
+# pedida de novo, sem escritas no meio, é servida sem refazer a consulta.
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import MySQLdb.cursors
+from flask import current_app
+
+import extensions
+import storage
+import versions
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Intervalo mínimo entre gravações de progresso de um job.
+PROGRESS_INTERVAL_SECONDS = 1.0
+
+_lock = threading.Lock()
+_executor = None
+_executor_pid = None
+
+
+def cache_key(start_date, end_date, export_format, data_version):
+    raw = f"{start_date or ''}|{end_date or ''}|{export_format}|{data_version}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def artifact_key(key, extension):
+    return f"exports/{key}.{extension}"
+
+
+def stored_locally(config):
+    """Sem bucket configurado, os arquivos prontos ficam no disco do host."""
+    return not config.get("S3_BUCKET")
+
+
+def local_path(config, artifact):
+    directory = config.get("EXPORT_LOCAL_DIR") or os.path.join(
+        tempfile.gettempdir(), "demand-tracker-exports"
+    )
+    return os.path.join(directory, os.path.basename(artifact))
+
+
+def _store(config, out, artifact):
+    if not stored_locally(config):
+        storage.get_client().upload_fileobj(
+            out,
+            config["S3_BUCKET"],
+            artifact,
+            Config=storage.transfer_config(config),
+        )
+        return
+    path = local_path(config, artifact)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Gravado com outro nome e renomeado: um download nunca vê o arquivo pela metade
+    partial = f"{path}.{uuid.uuid4().hex}.part"
+    with open(partial, "wb") as f:
+        shutil.copyfileobj(out, f)
+    os.replace(partial, path)
+
+
+def find_reusable(cur, key):
+    """
+    Job com a mesma chave que ainda serve: pronto dentro de EXPORT_JOB_TTL ou
+    em andamento com progresso recente (EXPORT_JOB_STALE_SECONDS).
+    """
+    config = current_app.config
+    cur.execute(
+        """
+        SELECT id, status FROM export_jobs
+        WHERE cache_key = %s
+          AND ((status = %s AND updated_at >= NOW() - INTERVAL %s SECOND)
+            OR (status IN (%s, %s) AND updated_at >= NOW() - INTERVAL %s SECOND))
+        ORDER BY created_at DESC
+        LIMIT 1
+        """,
+        (
+            key,
+            DONE,
+            config["EXPORT_JOB_TTL"],
+            QUEUED,
+            RUNNING,
+            config["EXPORT_JOB_STALE_SECONDS"],
+        ),
+    )
+    return cur.fetchone()
+
+
+def create(cur, key, start_date, end_date, export_format):
+    job_id = uuid.uuid4().hex
+    cur.execute(
+        "INSERT INTO export_jobs (id, cache_key, format, start_date, end_date, status) "
+        "VALUES (%s, %s, %s, %s, %s, %s)",
+        (job_id, key, export_format, start_date or None, end_date or None, QUEUED),
+    )
+    return job_id
+
+
+def get(job_id):
+    cur = extensions.mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+    cur.execute(
+        "SELECT id, cache_key, format, start_date, end_date, status, rows_done, "
+        "rows_total, artifact_key, error, created_at, updated_at "
+        "FROM export_jobs WHERE id = %s",
+        (job_id,),
+    )
+    job = cur.fetchone()
+    cur.close()
+    return job
+
+
+def enqueue(start_date, end_date, export_format, extension, build):
+    """
+    Reaproveita um job equivalente ou registra um novo e o envia ao pool.
+    Retorna (job_id, reaproveitado).
+    """
+    conn = extensions.mysql.connection
+    data_version = "-".join(
+        str(v) for v in versions.current([versions.DEMANDS, versions.WORK_LOGS])
+    )
+    key = cache_key(start_date, end_date, export_format, data_version)
+
+    cur = conn.cursor(MySQLdb.cursors.DictCursor)
+    existing = find_reusable(cur, key)
+    if existing:
+        cur.close()
+        return existing["id"], True
+
+    job_id = create(cur, key, start_date, end_date, export_format)
+    conn.commit()
+    cur.close()
+
+    job = {
+        "id": job_id,
+        "start_date": start_date,
+        "end_date": end_date,
+        "format": export_format,
+        "artifact_key": artifact_key(key, extension),
+    }
+    submit(current_app._get_current_object(), job, build)
+    return job_id, False
+
+
+def _get_executor(workers):
+    # Criado no primeiro uso de cada processo: um pool herdado do master via
+    # fork não teria threads.
+    global _executor, _executor_pid
+    with _lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="export-job"
+            )
+            _executor_pid = os.getpid()
+    return _executor
+
+
+def submit(app, job, build):
+    """Executa o job no pool (EXPORT_JOB_WORKERS = 0: na própria chamada)."""
+    workers = app.config["EXPORT_JOB_WORKERS"]
+    if workers <= 0:
+        run(app, job, build)
+        return None
+    return _get_executor(workers).submit(run, app, job, build)
+
+
+def _update(job_id, **fields):
+    # Conexão própria: a do job está ocupada lendo o cursor em streaming
+    pool = extensions.mysql.pool
+    conn = pool.checkout()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            "UPDATE export_jobs SET "
+            + ", ".join(f"{name} = %s" for name in fields)
+            + " WHERE id = %s",
+            (*fields.values(), job_id),
+        )
+        conn.commit()
+        cur.close()
+    finally:
+        pool.checkin(conn)
+
+
+def run(app, job, build):
+    """
+    Monta o arquivo com `build(job, arquivo, progresso)`, que devolve o
+    número de linhas, e envia o resultado para o S3 (ou EXPORT_LOCAL_DIR).
+    """
+    with app.app_context():
+        _update(job["id"], status=RUNNING)
+        last_update = [0.0]
+
+        def progress(rows_done, rows_total):
+            now = time.monotonic()
+            if now - last_update[0] >= PROGRESS_INTERVAL_SECONDS:
+                last_update[0] = now
+                _update(job["id"], rows_done=rows_done, rows_total=rows_total)
+
+        try:
+            with tempfile.TemporaryFile() as out:
+                rows = build(job, out, progress)
+                key = None
+                if rows:
+                    out.seek(0)
+                    _store(app.config, out, job["artifact_key"])
+                    key = job["artifact_key"]
+            _update(
+                job["id"],
+                status=DONE,
+                rows_done=rows,
+                rows_total=rows,
+                artifact_key=key,
+            )
+        except Exception as e:
+            app.logger.exception("Falha na exportação %s", job["id"])
+            _update(job["id"], status=FAILED, error=str(e))
+
+
+def content_disposition(filename):
+    """Cabeçalho de download com o nome entre aspas e em UTF-8 (RFC 6266)."""
+    fallback = filename.encode("ascii", "replace").decode("ascii")
+    fallback = fallback.replace("\\", "_").replace('"', "_")
+    return (
+        f'attachment; filename="{fallback}"; '
+        f"filename*=UTF-8''{quote(filename, safe='')}"
+    )
+
+
+def download_url(job, filename):
+    """URL pré-assinada do arquivo pronto, com o nome de download."""
+    return storage.get_client().generate_presigned_url(
+        "get_object",
+        Params={
+            "Bucket": current_app.config["S3_BUCKET"],
+            "Key": job["artifact_key"],
+            "ResponseContentDisposition": content_disposition(filename),
+        },
+        ExpiresIn=current_app.config["S3_PRESIGNED_URL_EXPIRES"],
+    )
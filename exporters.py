@@ -0,0 +1,216 @@
+# exporters.py
+# Geração de arquivos de exportação em streaming (memória constante).
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CSV_MIMETYPE = "text/csv"
+PARQUET_MIMETYPE = "application/vnd.apache.parquet"
+ARROW_MIMETYPE = "application/vnd.apache.arrow.stream"
+
+# Caracteres de controle não são permitidos em XML (ex.: colados de outros sistemas).
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    "</Types>"
+)
+
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    "</Relationships>"
+)
+
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{sheet_name}" sheetId="1" r:id="rId1"/></sheets>'
+    "</workbook>"
+)
+
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    "</Relationships>"
+)
+
+_SHEET_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    "<sheetData>"
+)
+
+_SHEET_FOOTER = "</sheetData></worksheet>"
+
+
+class _ChunkBuffer:
+    """
+    Destino de escrita não pesquisável (sem seek/tell) para o ZipFile: o
+    zipfile passa a usar data descriptors e os bytes podem ser repassados
+    ao cliente à medida que são gerados.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        self.size = 0
+        return data
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return "<c/>"
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, Decimal)):
+        return f"<c><v>{value}</v></c>"
+    if isinstance(value, datetime):
+        value = value.isoformat(sep=" ")
+    elif isinstance(value, date):
+        value = value.isoformat()
+    text = escape(_INVALID_XML_CHARS.sub("", str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(values):
+    return "<row>" + "".join(_xlsx_cell(value) for value in values) + "</row>"
+
+
+def stream_xlsx(headers, rows, sheet_name="Planilha1", flush_bytes=64 * 1024):
+    """
+    Gera um arquivo .xlsx em pedaços de bytes, linha a linha.
+
+    `rows` pode ser qualquer iterável (ex.: um gerador que lê o cursor em
+    lotes); nada além do lote atual e do buffer de compressão fica em memória.
+    """
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        archive.writestr("_rels/.rels", _ROOT_RELS)
+        archive.writestr(
+            "xl/workbook.xml", _WORKBOOK.format(sheet_name=escape(sheet_name))
+        )
+        archive.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+        yield buffer.drain()
+
+        with archive.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            sheet.write(_SHEET_HEADER.encode("utf-8"))
+            sheet.write(_xlsx_row(headers).encode("utf-8"))
+            for row in rows:
+                sheet.write(_xlsx_row(row).encode("utf-8"))
+                if buffer.size >= flush_bytes:
+                    yield buffer.drain()
+            sheet.write(_SHEET_FOOTER.encode("utf-8"))
+
+    yield buffer.drain()
+
+
+def stream_csv(headers, chunks):
+    """
+    Gera um CSV (UTF-8, separador vírgula) em pedaços de bytes, um por lote
+    de linhas. Datas saem em ISO 8601 e números sem formatação.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(headers)
+    for chunk in chunks:
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+class _ArrowSink(_ChunkBuffer):
+    """Destino sequencial para os writers do pyarrow (que consultam tell())."""
+
+    closed = False
+
+    def __init__(self):
+        super().__init__()
+        self._offset = 0
+
+    def write(self, data):
+        self._offset += len(data)
+        return super().write(data)
+
+    def tell(self):
+        return self._offset
+
+    def close(self):
+        self.closed = True
+
+
+def arrow_schema(columns):
+    """
+    Schema a partir de [(nome, tipo)], com tipo "timestamp", "int",
+    "float" ou "string".
+    """
+    import pyarrow as pa
+
+    types = {
+        "timestamp": pa.timestamp("s"),
+        "int": pa.int64(),
+        "float": pa.float64(),
+        "string": pa.string(),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in columns])
+
+
+def stream_arrow(columns, chunks, format="parquet"):
+    """
+    Gera um arquivo Parquet (format="parquet") ou um stream Arrow IPC
+    (format="arrow") com colunas tipadas, um record batch por lote de linhas.
+
+    Cada lote é uma sequência de tuplas na ordem de `columns`; os valores são
+    convertidos direto para as colunas do Arrow, sem formatação por célula.
+    """
+    # pyarrow é pesado: importado só quando uma exportação colunar é pedida
+    import pyarrow as pa
+
+    schema = arrow_schema(columns)
+    sink = _ArrowSink()
+    if format == "parquet":
+        import pyarrow.parquet as pq
+
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    try:
+        for chunk in chunks:
+            arrays = [
+                pa.array(values, type=field.type)
+                for values, field in zip(zip(*chunk), schema)
+            ]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
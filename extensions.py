@@ -1,9 +1,331 @@
-# extensions.py
 # from flask_login import LoginManager,
+import functools
+import os
+import threading
+import time
+from collections import deque
+
+import MySQLdb
+import MySQLdb.cursors
+from flask import current_app, g
 from flask_login import UserMixin
-from flask_mysqldb import MySQL
+
+import metrics
+from assets import Assets
+from cache import Cache
+from querylog import QueryLog
+from templating import TemplateCache
+
+
+class PoolTimeout(Exception):
+    """Nenhuma conexão ficou livre dentro de MYSQL_POOL_TIMEOUT segundos."""
+
+
+class ConnectionPool:
+    """
+    Pool de conexões MySQL seguro para threads.
+
+    Mantém até `size` conexões ociosas abertas e permite `max_overflow`
+    conexões extras em picos (fechadas ao serem devolvidas). Conexões mais
+    antigas que `recycle` segundos são reabertas e, com `pre_ping`, cada
+    conexão ociosa é testada com ping() antes de ser entregue.
+    """
+
+    def __init__(
+        self,
+        connect,
+        size=5,
+        max_overflow=10,
+        timeout=30.0,
+        pre_ping=True,
+        recycle=3600,
+    ):
+        self._connect = connect
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+        self.recycle = recycle
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (conexão, instante de criação)
+        self._created_at = {}
+        self._checked_out = 0
+        self._pid = os.getpid()
+        self._stats = {
+            "checkouts": 0,
+            "connects": 0,
+            "recycled": 0,
+            "ping_failures": 0,
+            "timeouts": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+        }
+
+    def _reset_after_fork(self):
+        # Conexões herdadas do processo pai (ex.: gunicorn --preload) não
+        # podem ser compartilhadas: são descartadas sem fechar o socket.
+        self._idle.clear()
+        self._created_at.clear()
+        self._checked_out = 0
+        self._pid = os.getpid()
+
+    def checkout(self):
+        start = time.monotonic()
+        with self._cond:
+            if self._pid != os.getpid():
+                self._reset_after_fork()
+            while True:
+                if self._idle:
+                    conn, created_at = self._idle.pop()
+                    break
+                if self._checked_out < self.size + self.max_overflow:
+                    conn, created_at = None, None
+                    break
+                remaining = self.timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(
+                        f"Pool de conexões esgotado ({self._checked_out} em uso)."
+                    )
+                self._cond.wait(remaining)
+            self._checked_out += 1
+
+        try:
+            conn = self._validate(conn, created_at)
+            if conn is None:
+                conn = self._connect()
+                with self._cond:
+                    self._created_at[id(conn)] = time.monotonic()
+                    self._stats["connects"] += 1
+        except Exception:
+            with self._cond:
+                self._checked_out -= 1
+                self._cond.notify()
+            raise
+
+        waited = time.monotonic() - start
+        with self._cond:
+            self._stats["checkouts"] += 1
+            self._stats["wait_time_total"] += waited
+            self._stats["wait_time_max"] = max(self._stats["wait_time_max"], waited)
+        return conn
+
+    def _validate(self, conn, created_at):
+        if conn is None:
+            return None
+        if self.recycle and time.monotonic() - created_at > self.recycle:
+            self._discard(conn)
+            with self._cond:
+                self._stats["recycled"] += 1
+            return None
+        if self.pre_ping:
+            try:
+                conn.ping()
+            except MySQLdb.Error:
+                self._discard(conn)
+                with self._cond:
+                    self._stats["ping_failures"] += 1
+                return None
+        return conn
+
+    def _discard(self, conn):
+        with self._cond:
+            self._created_at.pop(id(conn), None)
+        try:
+            conn.close()
+        except MySQLdb.Error:
+            pass
+
+    def checkin(self, conn):
+        # Nunca devolve ao pool uma transação aberta (e seus locks).
+        try:
+            conn.rollback()
+        except MySQLdb.Error:
+            self._discard(conn)
+            conn = None
+
+        with self._cond:
+            self._checked_out -= 1
+            if conn is not None and len(self._idle) < self.size:
+                self._idle.append((conn, self._created_at.get(id(conn), 0.0)))
+                conn = None
+            self._cond.notify()
+
+        if conn is not None:
+            self._discard(conn)  # Conexão de overflow
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["in_use"] = self._checked_out
+            stats["idle"] = len(self._idle)
+            stats["size"] = self.size
+            stats["max_overflow"] = self.max_overflow
+        checkouts = stats["checkouts"]
+        stats["wait_time_avg"] = (
+            stats["wait_time_total"] / checkouts if checkouts else 0.0
+        )
+        return stats
+
+
+# Driver PyMySQL (MYSQL_DRIVER=pymysql), para workers gevent: por ser Python
+# puro, usa os sockets do monkey patching e a espera pelo MySQL cede a vez às
+# outras requisições do worker. O mysqlclient (extensão em C) bloqueia o
+# worker inteiro a cada query. As conexões são embrulhadas para aceitar as
+# classes de cursor do MySQLdb usadas no código e levantar as exceções do
+# MySQLdb, então o resto do app não muda.
+
+
+def _translate_errors(method, *args, **kwargs):
+    import pymysql
+
+    try:
+        return method(*args, **kwargs)
+    except pymysql.Error as e:
+        error_class = getattr(MySQLdb, type(e).__name__, MySQLdb.Error)
+        raise error_class(*e.args) from e
+
+
+class PyMySQLCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, *args, **kwargs):
+        return _translate_errors(self._cursor.execute, *args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        return _translate_errors(self._cursor.executemany, *args, **kwargs)
+
+    def fetchone(self):
+        return _translate_errors(self._cursor.fetchone)
+
+    def fetchmany(self, *args, **kwargs):
+        return _translate_errors(self._cursor.fetchmany, *args, **kwargs)
+
+    def fetchall(self):
+        return _translate_errors(self._cursor.fetchall)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class PyMySQLConnection:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, cursorclass=None):
+        import pymysql.cursors
+
+        if cursorclass is not None:
+            # MySQLdb.cursors.DictCursor -> pymysql.cursors.DictCursor etc.
+            cursorclass = getattr(pymysql.cursors, cursorclass.__name__)
+        return PyMySQLCursor(self._conn.cursor(cursorclass))
+
+    def ping(self):
+        # Sem reconexão automática: o pool descarta a conexão que falhar
+        return _translate_errors(self._conn.ping, reconnect=False)
+
+    def commit(self):
+        return _translate_errors(self._conn.commit)
+
+    def rollback(self):
+        return _translate_errors(self._conn.rollback)
+
+    def close(self):
+        return _translate_errors(self._conn.close)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def _pymysql_connect(connect_kwargs):
+    import pymysql
+    import pymysql.cursors
+
+    kwargs = dict(connect_kwargs)
+    kwargs["password"] = kwargs.pop("passwd")
+    kwargs["database"] = kwargs.pop("db")
+    kwargs["cursorclass"] = getattr(pymysql.cursors, kwargs["cursorclass"].__name__)
+
+    def connect():
+        return PyMySQLConnection(_translate_errors(pymysql.connect, **kwargs))
+
+    return connect
+
+
+class MySQL:
+    """
+    Substitui o Flask-MySQLdb: `mysql.connection` entrega uma conexão do
+    pool, reutilizada durante todo o app context e devolvida no teardown.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        config = app.config
+        cursorclass = getattr(
+            MySQLdb.cursors, config.get("MYSQL_CURSORCLASS", "Cursor")
+        )
+        connect_kwargs = {
+            "host": config.get("MYSQL_HOST", "localhost"),
+            "user": config.get("MYSQL_USER"),
+            "passwd": config.get("MYSQL_PASSWORD"),
+            "db": config.get("MYSQL_DB"),
+            "port": config.get("MYSQL_PORT", 3306),
+            "charset": config.get("MYSQL_CHARSET", "utf8mb4"),
+            "connect_timeout": config.get("MYSQL_CONNECT_TIMEOUT", 10),
+            "cursorclass": cursorclass,
+        }
+
+        driver = config.get("MYSQL_DRIVER", "mysqlclient")
+        if driver == "pymysql":
+            connect = _pymysql_connect(connect_kwargs)
+        elif driver == "mysqlclient":
+            connect = functools.partial(MySQLdb.connect, **connect_kwargs)
+        else:
+            raise ValueError(f"MYSQL_DRIVER desconhecido: {driver}")
+
+        if config.get("METRICS_ENABLED", True) or config.get("QUERY_LOG_ENABLED"):
+            connect = metrics.instrument_connect(connect)
+
+        app.extensions["mysql"] = ConnectionPool(
+            connect,
+            size=config.get("MYSQL_POOL_SIZE", 5),
+            max_overflow=config.get("MYSQL_POOL_MAX_OVERFLOW", 10),
+            timeout=config.get("MYSQL_POOL_TIMEOUT", 30.0),
+            pre_ping=config.get("MYSQL_POOL_PRE_PING", True),
+            recycle=config.get("MYSQL_POOL_RECYCLE", 3600),
+        )
+        app.teardown_appcontext(self.teardown)
+
+    @property
+    def pool(self):
+        return current_app.extensions["mysql"]
+
+    @property
+    def connection(self):
+        if "mysql_connection" not in g:
+            g.mysql_connection = self.pool.checkout()
+        return g.mysql_connection
+
+    def teardown(self, exception):
+        conn = g.pop("mysql_connection", None)
+        if conn is not None:
+            self.pool.checkin(conn)
+
 
 mysql = MySQL()
+cache = Cache()
+request_metrics = metrics.Metrics()
+query_log = QueryLog()
+static_assets = Assets()
+template_cache = TemplateCache()
 # login_manager = LoginManager()
 
 
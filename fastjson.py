@@ -0,0 +1,35 @@
+# fastjson.py
+# Serialização das respostas JSON da API: usa o orjson (várias vezes mais
+# rápido que o json da biblioteca padrão) e cai para o json quando ele não
+# está instalado, com a mesma saída.
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Tipo não serializável em JSON: {type(value).__name__}")
+
+
+def dumps(payload):
+    """Serializa para bytes UTF-8 (decimais viram números, datas ISO 8601)."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default)
+    return json.dumps(
+        payload, default=_default, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def response(payload, status=200):
+    return Response(dumps(payload), status=status, mimetype="application/json")
@@ -0,0 +1,71 @@
+# gunicorn.conf.py
+# Carregado automaticamente pelo gunicorn a partir do diretório de trabalho.
+import os
+import shutil
+import tempfile
+
+# Métricas do Prometheus agregadas entre os workers: cada processo grava em
+# arquivos neste diretório (precisa estar definido antes de os workers
+# importarem o prometheus_client).
+os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR",
+    os.path.join(tempfile.gettempdir(), "demand-tracker-metrics"),
+)
+
+# Workers com threads: cada conexão SSE aberta (/demands/events) ocupa uma
+# thread, e não o worker inteiro como no worker "sync". Cada conexão dura no
+# máximo EVENTS_STREAM_SECONDS; o navegador reconecta em seguida.
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.environ.get("GUNICORN_THREADS", "8"))
+
+# Capacidade do SSE: com gthread, no máximo 1/4 das threads de cada worker
+# fica presa em streams (8 threads x 3 workers: 6 painéis com stream; os
+# demais caem para polling). No "sync" um stream bloquearia o worker inteiro,
+# então todos usam polling. No gevent cada stream é só um greenlet.
+if worker_class == "sync":
+    os.environ.setdefault("EVENTS_MAX_SUBSCRIBERS", "0")
+elif worker_class == "gthread":
+    os.environ.setdefault("EVENTS_MAX_SUBSCRIBERS", str(max(1, threads // 4)))
+
+# Modo de alta concorrência (GUNICORN_WORKER_CLASS=gevent): cada worker
+# atende até `worker_connections` requisições em greenlets, e a espera pelo
+# MySQL/S3 libera o worker para as demais. Exige o driver cooperativo
+# (PyMySQL): com o mysqlclient cada query bloquearia o worker inteiro. O
+# monkey patching acontece no início de cada worker, antes de importar o app,
+# por isso o app não pode ser pré-carregado no master.
+if worker_class == "gevent":
+    worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", "200"))
+    preload_app = False
+    os.environ.setdefault("MYSQL_DRIVER", "pymysql")
+    # Requisições simultâneas por worker disputam o pool do MySQL e o
+    # cliente S3: mais conexões que no modo com threads
+    os.environ.setdefault("MYSQL_POOL_MAX_OVERFLOW", "40")
+    os.environ.setdefault("S3_MAX_POOL_CONNECTIONS", "50")
+    os.environ.setdefault("EVENTS_MAX_SUBSCRIBERS", str(worker_connections // 2))
+
+
+def on_starting(server):
+    # Arquivos de métricas de uma execução anterior não podem ser somados.
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+
+    # Com CACHE_BACKEND=socket, o processo master hospeda o servidor de cache
+    # compartilhado pelos workers (ver cache.py).
+    if os.environ.get("CACHE_BACKEND") == "socket":
+        from cache import CacheServer
+        from config import Config
+
+        cache_server = CacheServer(
+            Config.CACHE_SOCKET_PATH, Config.CACHE_MAXSIZE, Config.CACHE_TTL
+        )
+        cache_server.start_in_thread()
+        server.log.info("Servidor de cache ouvindo em %s", Config.CACHE_SOCKET_PATH)
+
+
+def child_exit(server, worker):
+    # Remove os gauges "live" do worker encerrado; contadores e histogramas
+    # continuam somados.
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
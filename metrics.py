@@ -0,0 +1,223 @@
+# metrics.py
+# Métricas por requisição no formato do Prometheus, expostas em /metrics.
+#
+# Com vários workers do gunicorn, cada processo grava suas métricas em
+# arquivos no diretório PROMETHEUS_MULTIPROC_DIR (preparado pelo
+# gunicorn.conf.py) e o /metrics de qualquer worker agrega todos eles.
+import os
+import time
+
+from flask import Response, g, has_app_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Número de queries por requisição (escala ~Fibonacci: N+1 aparece nas caudas).
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latência das requisições por endpoint.",
+    ["endpoint", "method", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requisições em andamento.",
+    ["endpoint"],
+    multiprocess_mode="livesum",
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "Queries executadas por requisição.",
+    ["endpoint"],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "db_query_seconds_per_request",
+    "Tempo acumulado em queries por requisição.",
+    ["endpoint"],
+)
+DB_QUERIES = Counter(
+    "db_queries",
+    "Queries executadas (inclusive fora de requisições, ex.: comandos CLI).",
+)
+S3_LATENCY = Histogram(
+    "s3_request_duration_seconds",
+    "Latência das chamadas ao S3 por operação.",
+    ["operation", "outcome"],
+)
+
+
+def _endpoint():
+    # O nome do endpoint (e não a URL) mantém a cardinalidade dos rótulos baixa.
+    return request.endpoint or "unmatched"
+
+
+def _before_request():
+    g.metrics_start = time.perf_counter()
+    g.metrics_endpoint = _endpoint()
+    g.db_queries = 0
+    g.db_seconds = 0.0
+    REQUESTS_IN_PROGRESS.labels(g.metrics_endpoint).inc()
+
+
+def _after_request(response):
+    g.metrics_status = response.status_code
+    return response
+
+
+def _teardown_request(exception):
+    start = g.pop("metrics_start", None)
+    if start is None:
+        return
+    endpoint = g.metrics_endpoint
+    status = g.pop("metrics_status", 500)
+    REQUEST_LATENCY.labels(endpoint, request.method, str(status)).observe(
+        time.perf_counter() - start
+    )
+    DB_QUERIES_PER_REQUEST.labels(endpoint).observe(g.db_queries)
+    DB_TIME_PER_REQUEST.labels(endpoint).observe(g.db_seconds)
+    REQUESTS_IN_PROGRESS.labels(endpoint).dec()
+
+
+def record_query(seconds, query=None, args=None, many=False):
+    DB_QUERIES.inc()
+    if not has_app_context():
+        return
+    if "db_queries" in g:
+        g.db_queries += 1
+        g.db_seconds += seconds
+    if "query_log" in g:
+        # Statements guardados para o perfil de SQL da requisição (querylog.py)
+        g.query_log.append((query, args, seconds, many))
+
+
+class InstrumentedCursor:
+    """
+    Cursor que mede cada execute/executemany e entrega o tempo a `on_query`
+    (por padrão record_query). `before_query`, se informado, roda antes de
+    cada statement, fora da medição (ex.: atraso simulado nos benchmarks).
+    """
+
+    def __init__(self, cursor, on_query=record_query, before_query=None):
+        self._cursor = cursor
+        self._on_query = on_query
+        self._before_query = before_query
+
+    def _timed(self, method, query, args, many):
+        if self._before_query is not None:
+            self._before_query()
+        start = time.perf_counter()
+        try:
+            return method(query, args)
+        finally:
+            if self._on_query is not None:
+                self._on_query(time.perf_counter() - start, query, args, many=many)
+
+    def execute(self, query, args=None):
+        return self._timed(self._cursor.execute, query, args, False)
+
+    def executemany(self, query, args):
+        return self._timed(self._cursor.executemany, query, args, True)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class InstrumentedConnection:
+    def __init__(self, conn, on_query=record_query, before_query=None):
+        self._conn = conn
+        self._on_query = on_query
+        self._before_query = before_query
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(
+            self._conn.cursor(*args, **kwargs), self._on_query, self._before_query
+        )
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def unwrap(conn):
+    """Conexão original, para queries que não devem ser medidas (ex.: EXPLAIN)."""
+    while isinstance(conn, InstrumentedConnection):
+        conn = conn._conn
+    return conn
+
+
+def instrument_connect(connect, on_query=record_query, before_query=None):
+    """
+    Envolve a fábrica de conexões do pool para medir todas as queries. Os
+    benchmarks passam seus próprios hooks (contagem, atraso simulado).
+    """
+    return lambda: InstrumentedConnection(connect(), on_query, before_query)
+
+
+def _s3_before_call(context, **kwargs):
+    context["metrics_start"] = time.perf_counter()
+
+
+def _s3_observe(event_name, context, outcome):
+    start = context.pop("metrics_start", None)
+    if start is not None:
+        # event_name: "after-call.s3.PutObject", "after-call-error.s3.UploadPart"...
+        operation = event_name.rsplit(".", 1)[-1]
+        S3_LATENCY.labels(operation, outcome).observe(time.perf_counter() - start)
+
+
+def _s3_after_call(event_name, context, http_response, **kwargs):
+    outcome = "error" if http_response.status_code >= 400 else "success"
+    _s3_observe(event_name, context, outcome)
+
+
+def _s3_after_call_error(event_name, context, **kwargs):
+    # Falhas de transporte (timeout, conexão recusada), sem resposta HTTP
+    _s3_observe(event_name, context, "error")
+
+
+def instrument_s3_client(client):
+    """Registra a latência de cada chamada HTTP do cliente (upload, multipart...)."""
+    events = client.meta.events
+    events.register("before-call.s3", _s3_before_call)
+    events.register("after-call.s3", _s3_after_call)
+    events.register("after-call-error.s3", _s3_after_call_error)
+    return client
+
+
+def _registry():
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def metrics_view():
+    return Response(generate_latest(_registry()), mimetype=CONTENT_TYPE_LATEST)
+
+
+class Metrics:
+    """Extensão Flask: hooks de requisição e a rota /metrics."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not app.config.get("METRICS_ENABLED", True):
+            return
+        app.before_request(_before_request)
+        app.after_request(_after_request)
+        app.teardown_request(_teardown_request)
+        app.add_url_rule("/metrics", "metrics", metrics_view)
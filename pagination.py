@@ -0,0 +1,55 @@
+# pagination.py
+# Utilitários de paginação por cursor (keyset) compartilhados pelos blueprints.
+import base64
+import json
+from datetime import date, datetime
+
+
+def _to_json(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_cursor(row, keys):
+    """Gera um token opaco a partir das colunas de ordenação da última linha."""
+    payload = json.dumps([row[key] for key in keys], default=_to_json)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(token, converters):
+    """
+    Decodifica um token gerado por encode_cursor.
+
+    `converters` é uma sequência de funções aplicadas a cada valor, na mesma
+    ordem das colunas. Lança ValueError se o token for inválido.
+    """
+    try:
+        payload = base64.urlsafe_b64decode(token.encode("ascii"))
+        values = json.loads(payload.decode("utf-8"))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Cursor inválido: {e}") from e
+
+    if not isinstance(values, list) or len(values) != len(converters):
+        raise ValueError("Cursor inválido: número de colunas inesperado.")
+
+    try:
+        return [convert(value) for convert, value in zip(converters, values)]
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Cursor inválido: {e}") from e
+
+
+def parse_datetime(value):
+    return datetime.fromisoformat(value)
+
+
+def paginate(rows, page_size, keys):
+    """
+    Recebe as linhas buscadas com LIMIT page_size + 1 e devolve a página
+    e o cursor para a próxima (ou None quando não há mais linhas).
+    """
+    rows = list(rows)
+    if len(rows) <= page_size:
+        return rows, None
+    page = rows[:page_size]
+    return page, encode_cursor(page[-1], keys)
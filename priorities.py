@@ -0,0 +1,164 @@
+# priorities.py
+# Fila de demandas ativas: leitura via cache e reordenação com escrita em lote.
+import MySQLdb.cursors
+
+import extensions
+
+# Demandas que fazem parte da fila de priorização.
+QUEUE_FILTER = "status IN ('Em Fila', 'Em Execução')"
+
+# Nome da fila no cache; a versão é incrementada a cada escrita que a altera.
+QUEUE_CACHE_NAME = "demands:queue"
+
+QUEUE_QUERY = (
+    "SELECT id, title, status, created_at, priority, executed_hours, estimated_hours "
+    f"FROM demands WHERE {QUEUE_FILTER} "
+    "ORDER BY priority ASC, created_at ASC, id ASC"
+)
+
+# Espaçamento entre prioridades após um rebalanceamento: deixa folga para
+# inserir uma demanda entre duas outras alterando apenas a linha movida.
+PRIORITY_STEP = 1024
+
+
+def _load_queue():
+    cur = extensions.mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+    cur.execute(QUEUE_QUERY)
+    rows = list(cur.fetchall())
+    cur.close()
+    return rows
+
+
+def active_queue():
+    """
+    Fila ativa completa (Em Fila/Em Execução) em ordem de prioridade.
+
+    Compartilhada pelo tracker, pela priorização e pelo painel; só consulta
+    o banco quando a versão da fila mudou ou o valor expirou no cache.
+    A lista devolvida é compartilhada e não deve ser alterada.
+    """
+    return extensions.cache.get_or_load(QUEUE_CACHE_NAME, _load_queue)
+
+
+def invalidate_queue():
+    """Chamado após o commit de qualquer escrita que altere a fila."""
+    extensions.cache.invalidate(QUEUE_CACHE_NAME)
+
+
+def set_order(cur, ordered_ids, base=0, step=1):
+    """Grava a ordem informada em um único UPDATE ... CASE."""
+    if not ordered_ids:
+        return 0
+
+    cases = " ".join(["WHEN %s THEN %s"] * len(ordered_ids))
+    placeholders = ", ".join(["%s"] * len(ordered_ids))
+    params = []
+    for index, demand_id in enumerate(ordered_ids):
+        params.extend([demand_id, base + index * step])
+    params.extend(ordered_ids)
+
+    cur.execute(
+        f"UPDATE demands SET priority = CASE id {cases} END WHERE id IN ({placeholders})",
+        tuple(params),
+    )
+    return len(ordered_ids)
+
+
+def reorder(cur, ordered_ids):
+    """
+    Aplica a ordem completa (ou de uma página) da fila.
+
+    A nova ordem parte da menor prioridade atual desses itens, para que a
+    reordenação de uma página não invada as posições das outras.
+    """
+    placeholders = ", ".join(["%s"] * len(ordered_ids))
+    cur.execute(
+        f"SELECT MIN(priority) AS base FROM demands WHERE id IN ({placeholders})",
+        tuple(ordered_ids),
+    )
+    row = cur.fetchone()
+    base = (row["base"] if row else None) or 0
+    return set_order(cur, ordered_ids, base=base)
+
+
+def rebalance(cur):
+    """Redistribui as prioridades da fila com espaçamento PRIORITY_STEP."""
+    cur.execute(
+        f"SELECT id FROM demands WHERE {QUEUE_FILTER} "
+        "ORDER BY priority ASC, created_at ASC, id ASC FOR UPDATE"
+    )
+    ordered_ids = [row["id"] for row in cur.fetchall()]
+    return set_order(cur, ordered_ids, base=PRIORITY_STEP, step=PRIORITY_STEP)
+
+
+def _between(low, high):
+    if low is None and high is None:
+        return 0
+    if low is None:
+        return high - PRIORITY_STEP
+    if high is None:
+        return low + PRIORITY_STEP
+    if high - low > 1:
+        return (low + high) // 2
+    return None  # Sem folga entre os vizinhos
+
+
+def _neighbors(cur, demand_id, anchor_id, place_before):
+    # Trava a demanda movida e a âncora na mesma consulta.
+    cur.execute(
+        "SELECT id, priority, created_at FROM demands WHERE id IN (%s, %s) FOR UPDATE",
+        (demand_id, anchor_id),
+    )
+    rows = {str(row["id"]): row for row in cur.fetchall()}
+    if str(demand_id) not in rows:
+        raise ValueError("Demanda não encontrada.")
+    anchor = rows.get(str(anchor_id))
+    if not anchor:
+        raise ValueError("Demanda de referência não encontrada.")
+
+    # Vizinho imediatamente antes (before_id) ou depois (after_id) da âncora,
+    # na mesma ordenação usada pelo painel.
+    if place_before:
+        comparison, direction = "<", "DESC"
+    else:
+        comparison, direction = ">", "ASC"
+    cur.execute(
+        f"SELECT priority FROM demands WHERE {QUEUE_FILTER} AND id <> %s "
+        f"AND (priority, created_at, id) {comparison} (%s, %s, %s) "
+        f"ORDER BY priority {direction}, created_at {direction}, id {direction} "
+        "LIMIT 1 FOR UPDATE",
+        (demand_id, anchor["priority"], anchor["created_at"], anchor["id"]),
+    )
+    neighbor = cur.fetchone()
+    neighbor_priority = neighbor["priority"] if neighbor else None
+
+    if place_before:
+        return neighbor_priority, anchor["priority"]
+    return anchor["priority"], neighbor_priority
+
+
+def move(cur, demand_id, before_id=None, after_id=None):
+    """
+    Move uma demanda para antes de `before_id` ou depois de `after_id`.
+
+    No caso comum altera só a linha movida (prioridade no meio do intervalo
+    entre os vizinhos); quando não há folga, rebalanceia a fila uma vez.
+    Retorna a nova prioridade.
+    """
+    if (before_id is None) == (after_id is None):
+        raise ValueError("Informe exatamente um entre before_id e after_id.")
+    anchor_id = before_id if before_id is not None else after_id
+    if str(anchor_id) == str(demand_id):
+        raise ValueError("Uma demanda não pode ser posicionada em relação a si mesma.")
+
+    low, high = _neighbors(cur, demand_id, anchor_id, before_id is not None)
+    new_priority = _between(low, high)
+    if new_priority is None:
+        rebalance(cur)
+        low, high = _neighbors(cur, demand_id, anchor_id, before_id is not None)
+        new_priority = _between(low, high)
+
+    cur.execute(
+        "UPDATE demands SET priority = %s WHERE id = %s", (new_priority, demand_id)
+    )
+    return new_priority
@@ -0,0 +1,211 @@
+# querylog.py
+# Perfil de SQL por requisição (opt-in, para desenvolvimento/homologação):
+#   - statements mais lentos que QUERY_LOG_SLOW_MS vão para o log com o
+#     plano do EXPLAIN;
+#   - requisições que executam o mesmo formato de statement mais de
+#     QUERY_LOG_REPEAT_THRESHOLD vezes são marcadas como suspeitas de N+1;
+#   - os perfis ficam em /_debug/queries (JSON), em um painel no rodapé das
+#     páginas HTML e, opcionalmente, em um arquivo JSON lines.
+#
+# Os statements chegam pelos cursores instrumentados de metrics.py, que os
+# acumulam em g.query_log enquanto o perfil da requisição está aberto.
+import json
+import re
+import threading
+import time
+import uuid
+from collections import Counter, deque
+
+import MySQLdb
+import MySQLdb.cursors
+from flask import current_app, g, jsonify, render_template, request
+
+import metrics
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*%s(?:\s*,\s*%s)+\s*\)")
+_VALUES_LIST = re.compile(r"(\(%s(?:, %s)*\))(?:\s*,\s*\(%s(?:, %s)*\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+_EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "INSERT", "REPLACE")
+
+# Endpoints sem perfil (o próprio dump, métricas e arquivos estáticos).
+UNPROFILED_ENDPOINTS = {"querylog", "metrics", "static", "assets"}
+
+# Tamanho máximo da representação dos parâmetros guardada no perfil.
+PARAMS_REPR_LIMIT = 200
+
+
+def statement_shape(sql):
+    """
+    Formato do statement, sem literais e com listas de placeholders
+    colapsadas: `IN (%s, %s, %s)` e `IN (%s)` repetidos contam como o mesmo.
+    """
+    shape = _WHITESPACE.sub(" ", sql).strip()
+    shape = _STRING.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    shape = _VALUES_LIST.sub(r"\1, ...", shape)
+    shape = _PLACEHOLDER_LIST.sub("(%s, ...)", shape)
+    return shape
+
+
+def _entry(query, params, seconds, many):
+    sql = query.decode("utf-8", "replace") if isinstance(query, bytes) else query
+    params_repr = repr(params)
+    if len(params_repr) > PARAMS_REPR_LIMIT:
+        params_repr = params_repr[:PARAMS_REPR_LIMIT] + "..."
+    return {
+        "sql": sql,
+        "shape": statement_shape(sql),
+        "params": params,
+        "params_repr": params_repr,
+        "ms": seconds * 1000,
+        "many": many,
+    }
+
+
+def _explain(conn, sql, params):
+    verb = sql.lstrip().split(None, 1)[0].upper()
+    if verb not in _EXPLAINABLE:
+        return None
+    cur = metrics.unwrap(conn).cursor(MySQLdb.cursors.DictCursor)
+    try:
+        cur.execute("EXPLAIN " + sql, params)
+        return [dict(row) for row in cur.fetchall()]
+    except MySQLdb.Error as e:
+        return [{"error": str(e)}]
+    finally:
+        cur.close()
+
+
+def _jsonable(row):
+    # Linhas do EXPLAIN podem trazer Decimal e afins
+    return {
+        key: value if isinstance(value, (str, int, float, type(None))) else str(value)
+        for key, value in row.items()
+    }
+
+
+class QueryLog:
+    """Extensão Flask; nada é registrado se QUERY_LOG_ENABLED for falso."""
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not app.config.get("QUERY_LOG_ENABLED", False):
+            return
+        app.extensions["querylog"] = deque(maxlen=app.config["QUERY_LOG_HISTORY"])
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule("/_debug/queries", "querylog", self.dump_view)
+
+    @property
+    def profiles(self):
+        return current_app.extensions["querylog"]
+
+    def _before_request(self):
+        if request.endpoint in UNPROFILED_ENDPOINTS:
+            return
+        g.query_log = []
+        g.query_log_start = time.perf_counter()
+
+    def _after_request(self, response):
+        # Respostas em streaming (ex.: exportação) ainda vão executar queries;
+        # o perfil delas é fechado no teardown.
+        if "query_log" not in g or response.is_streamed:
+            return response
+        profile = self._finish()
+        if current_app.config["QUERY_LOG_PANEL"] and response.mimetype == "text/html":
+            self._inject_panel(response, profile)
+        return response
+
+    def _teardown_request(self, exception):
+        if "query_log" in g:
+            self._finish()
+
+    def _finish(self):
+        config = current_app.config
+        entries = [_entry(*raw) for raw in g.pop("query_log")]
+        slow_ms = config["QUERY_LOG_SLOW_MS"]
+        threshold = config["QUERY_LOG_REPEAT_THRESHOLD"]
+
+        conn = g.get("mysql_connection")
+        slow = []
+        for entry in entries:
+            if entry["ms"] < slow_ms:
+                continue
+            if config["QUERY_LOG_EXPLAIN"] and conn is not None and not entry["many"]:
+                entry["explain"] = _explain(conn, entry["sql"], entry["params"])
+            slow.append(entry)
+            current_app.logger.warning(
+                "Query lenta (%.1f ms) em %s: %s params=%s explain=%s",
+                entry["ms"],
+                request.endpoint,
+                entry["sql"],
+                entry["params_repr"],
+                json.dumps(entry.get("explain"), default=str),
+            )
+
+        counts = Counter(entry["shape"] for entry in entries)
+        repeated = [
+            {"shape": shape, "count": count}
+            for shape, count in counts.most_common()
+            if count > threshold
+        ]
+        for item in repeated:
+            current_app.logger.warning(
+                "Possível N+1 em %s: %d execuções de %s",
+                request.endpoint,
+                item["count"],
+                item["shape"],
+            )
+
+        profile = {
+            "id": uuid.uuid4().hex,
+            "method": request.method,
+            "path": request.full_path.rstrip("?"),
+            "endpoint": request.endpoint,
+            "duration_ms": (time.perf_counter() - g.pop("query_log_start")) * 1000,
+            "query_count": len(entries),
+            "query_ms": sum(entry["ms"] for entry in entries),
+            "queries": [
+                {
+                    "sql": entry["sql"],
+                    "params": entry["params_repr"],
+                    "ms": entry["ms"],
+                    "slow": entry["ms"] >= slow_ms,
+                    "explain": [_jsonable(row) for row in entry.get("explain") or []]
+                    or None,
+                }
+                for entry in entries
+            ],
+            "repeated": repeated,
+            "slow_count": len(slow),
+        }
+        self.profiles.append(profile)
+
+        dump_path = config.get("QUERY_LOG_DUMP_PATH")
+        if dump_path:
+            with self._lock, open(dump_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(profile, default=str) + "\n")
+        return profile
+
+    def _inject_panel(self, response, profile):
+        body = response.get_data(as_text=True)
+        index = body.rfind("</body>")
+        if index == -1:
+            return
+        panel = render_template("_query_panel.html", profile=profile)
+        response.set_data(body[:index] + panel + body[index:])
+
+    def dump_view(self):
+        """Perfis mais recentes em JSON (?flagged=1: só lentos ou com N+1)."""
+        profiles = list(self.profiles)
+        if request.args.get("flagged"):
+            profiles = [p for p in profiles if p["slow_count"] or p["repeated"]]
+        return jsonify(profiles=profiles[::-1])
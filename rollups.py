@@ -0,0 +1,132 @@
+# rollups.py
+# Tabelas de totais diários (minutos por demanda/dia e por dia de sessão),
+# mantidas incrementalmente pelo tracker e reconstruídas pelo comando
+# `flask rollups rebuild`.
+from datetime import date, timedelta
+
+import click
+import MySQLdb.cursors
+from flask.cli import AppGroup
+
+import extensions
+import versions
+
+# A mesma agregação é usada no incremento e na reconstrução, então os dois
+# caminhos sempre concordam (inclusive no dia calculado por DATE()).
+_DEMAND_ROLLUP_SELECT = """
+    SELECT DATE(ws.start_time), wl.demand_id, SUM(wl.minutes_spent), COUNT(*)
+    FROM work_logs wl
+    JOIN work_sessions ws ON ws.id = wl.work_session_id
+    WHERE {where}
+    GROUP BY DATE(ws.start_time), wl.demand_id
+"""
+
+_SESSION_ROLLUP_SELECT = """
+    SELECT DATE(ws.start_time), COUNT(*), SUM(ws.total_minutes)
+    FROM work_sessions ws
+    WHERE {where}
+    GROUP BY DATE(ws.start_time)
+"""
+
+_DEMAND_ROLLUP_INSERT = (
+    "INSERT INTO daily_demand_minutes (day, demand_id, minutes, log_count)"
+)
+_SESSION_ROLLUP_INSERT = (
+    "INSERT INTO daily_session_minutes (day, session_count, total_minutes)"
+)
+
+
+def record_sessions(cur, session_ids):
+    """
+    Soma as sessões recém-criadas aos totais diários, na mesma transação
+    do INSERT das sessões. Lê apenas as linhas dessas sessões.
+    """
+    if not session_ids:
+        return
+    where = f"ws.id IN ({', '.join(['%s'] * len(session_ids))})"
+    params = tuple(session_ids)
+
+    cur.execute(
+        _DEMAND_ROLLUP_INSERT
+        + _DEMAND_ROLLUP_SELECT.format(where=where)
+        + "ON DUPLICATE KEY UPDATE minutes = minutes + VALUES(minutes), "
+        "log_count = log_count + VALUES(log_count)",
+        params,
+    )
+    cur.execute(
+        _SESSION_ROLLUP_INSERT
+        + _SESSION_ROLLUP_SELECT.format(where=where)
+        + "ON DUPLICATE KEY UPDATE session_count = session_count + VALUES(session_count), "
+        "total_minutes = total_minutes + VALUES(total_minutes)",
+        params,
+    )
+
+
+def rebuild(cur, start_date=None, end_date=None):
+    """
+    Recalcula os totais a partir dos logs brutos, para todo o histórico ou
+    apenas para os dias entre start_date e end_date (inclusive).
+    """
+    day_filters, day_params = period_filters(start_date, end_date)
+    time_filters = []
+    time_params = []
+    if start_date:
+        time_filters.append("ws.start_time >= %s")
+        time_params.append(start_date)
+    if end_date:
+        time_filters.append("ws.start_time < %s")
+        time_params.append(end_date + timedelta(days=1))
+
+    delete_where = " WHERE " + " AND ".join(day_filters) if day_filters else ""
+    select_where = " AND ".join(time_filters) or "1 = 1"
+
+    cur.execute(f"DELETE FROM daily_demand_minutes{delete_where}", tuple(day_params))
+    cur.execute(f"DELETE FROM daily_session_minutes{delete_where}", tuple(day_params))
+    cur.execute(
+        _DEMAND_ROLLUP_INSERT + _DEMAND_ROLLUP_SELECT.format(where=select_where),
+        tuple(time_params),
+    )
+    cur.execute(
+        _SESSION_ROLLUP_INSERT + _SESSION_ROLLUP_SELECT.format(where=select_where),
+        tuple(time_params),
+    )
+
+
+def period_filters(start_date, end_date, column="day"):
+    """Cláusulas e parâmetros para filtrar as tabelas de totais por período."""
+    clauses = []
+    params = []
+    if start_date:
+        clauses.append(f"{column} >= %s")
+        params.append(start_date)
+    if end_date:
+        clauses.append(f"{column} <= %s")
+        params.append(end_date)
+    return clauses, params
+
+
+rollups_cli = AppGroup("rollups", help="Manutenção das tabelas de totais diários.")
+
+
+@rollups_cli.command("rebuild")
+@click.option("--start-date", type=click.DateTime(formats=["%Y-%m-%d"]))
+@click.option("--end-date", type=click.DateTime(formats=["%Y-%m-%d"]))
+def rebuild_command(start_date, end_date):
+    """Reconstrói os totais diários a partir de work_sessions/work_logs."""
+    start = start_date.date() if start_date else None
+    end = end_date.date() if end_date else None
+
+    conn = extensions.mysql.connection
+    cur = conn.cursor(MySQLdb.cursors.DictCursor)
+    try:
+        rebuild(cur, start, end)
+        versions.bump(cur, versions.WORK_LOGS)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    period = f"{start or 'início'} a {end or date.today()}"
+    click.echo(f"Totais diários reconstruídos ({period}).")
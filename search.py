@@ -0,0 +1,132 @@
+# search.py
+# Busca textual em demandas (título e descrição) e nas anotações dos
+# registros de trabalho, pelos índices FULLTEXT do InnoDB.
+#
+# Os índices são atualizados pelo próprio MySQL no commit de cada escrita
+# (save_demand, log_work...), então não há índice para manter na aplicação.
+import re
+
+import MySQLdb.cursors
+from markupsafe import Markup, escape
+
+import extensions
+
+# Termos menores que innodb_ft_min_token_size (padrão 3) não são indexados.
+MIN_TERM_LENGTH = 3
+
+# Máximo de termos por busca (cada um vira um +termo* no modo booleano).
+MAX_TERMS = 10
+
+# Caracteres de contexto em volta do primeiro termo encontrado no trecho.
+SNIPPET_WIDTH = 160
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+DEMANDS_MATCH = "MATCH (title, description) AGAINST (%s IN BOOLEAN MODE)"
+WORK_LOGS_MATCH = "MATCH (wl.description) AGAINST (%s IN BOOLEAN MODE)"
+
+
+def terms(text):
+    """Palavras da busca que o índice consegue encontrar, sem repetição."""
+    words = [word.lower() for word in _WORD.findall(text or "")]
+    found = [word for word in words if len(word) >= MIN_TERM_LENGTH]
+    return list(dict.fromkeys(found))[:MAX_TERMS]
+
+
+def boolean_query(search_terms):
+    """
+    Expressão do modo booleano: todos os termos obrigatórios, por prefixo.
+    Os operadores digitados pelo usuário já foram descartados por terms().
+    """
+    return " ".join(f"+{term}*" for term in search_terms)
+
+
+def snippet(text, search_terms, width=SNIPPET_WIDTH):
+    """
+    Trecho do texto em volta do primeiro termo encontrado, com HTML escapado
+    e os termos marcados com <mark>. Devolve None se nenhum termo aparece.
+    """
+    if not text or not search_terms:
+        return None
+    pattern = re.compile(
+        r"\b(" + "|".join(re.escape(term) for term in search_terms) + r")\w*",
+        re.IGNORECASE | re.UNICODE,
+    )
+    match = pattern.search(text)
+    if match is None:
+        return None
+
+    start = max(0, match.start() - width // 3)
+    end = min(len(text), start + width)
+    if start > 0:
+        # Não corta a primeira palavra ao meio
+        space = text.find(" ", start, match.start())
+        start = space + 1 if space != -1 else start
+    excerpt = text[start:end]
+
+    parts = []
+    last = 0
+    for found in pattern.finditer(excerpt):
+        parts.append(escape(excerpt[last : found.start()]))
+        parts.append(Markup("<mark>%s</mark>") % found.group(0))
+        last = found.end()
+    parts.append(escape(excerpt[last:]))
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if end < len(text) else ""
+    return Markup(prefix) + Markup("").join(parts) + Markup(suffix)
+
+
+def search(text, limit):
+    """
+    Demandas que batem com a busca, da mais relevante para a menos.
+
+    A relevância soma a nota do título/descrição com a da melhor anotação de
+    trabalho da demanda; cada resultado traz os trechos destacados.
+    """
+    search_terms = terms(text)
+    if not search_terms:
+        return []
+    expression = boolean_query(search_terms)
+    cur = extensions.mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+
+    cur.execute(
+        f"SELECT id, title, description, status, {DEMANDS_MATCH} AS score "
+        f"FROM demands WHERE {DEMANDS_MATCH} ORDER BY score DESC LIMIT %s",
+        (expression, expression, limit),
+    )
+    results = {row["id"]: dict(row, note=None) for row in cur.fetchall()}
+
+    # Melhor anotação por demanda (as linhas chegam da mais relevante)
+    cur.execute(
+        f"SELECT wl.demand_id, wl.description, {WORK_LOGS_MATCH} AS score "
+        f"FROM work_logs wl WHERE {WORK_LOGS_MATCH} ORDER BY score DESC LIMIT %s",
+        (expression, expression, limit),
+    )
+    notes = {}
+    for row in cur.fetchall():
+        notes.setdefault(row["demand_id"], row)
+
+    missing = [demand_id for demand_id in notes if demand_id not in results]
+    if missing:
+        cur.execute(
+            "SELECT id, title, description, status, 0 AS score FROM demands "
+            f"WHERE id IN ({', '.join(['%s'] * len(missing))})",
+            tuple(missing),
+        )
+        results.update({row["id"]: dict(row, note=None) for row in cur.fetchall()})
+    cur.close()
+
+    for demand_id, note in notes.items():
+        if demand_id in results:
+            results[demand_id]["score"] += note["score"]
+            results[demand_id]["note"] = note["description"]
+
+    ranked = sorted(results.values(), key=lambda r: (-r["score"], r["id"]))[:limit]
+    for result in ranked:
+        result["score"] = float(result["score"])
+        result["title_html"] = snippet(result["title"], search_terms) or escape(
+            result["title"]
+        )
+        result["description_html"] = snippet(result["description"], search_terms)
+        result["note_html"] = snippet(result.pop("note"), search_terms)
+    return ranked
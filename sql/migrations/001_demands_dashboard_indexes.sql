@@ -0,0 +1,7 @@
+-- sql/migrations/001_demands_dashboard_indexes.sql
+-- Índices para a paginação por cursor do painel de demandas em bancos já existentes.
+-- (Instalações novas já recebem os índices via sql/schema.sql.)
+
+ALTER TABLE `demands`
+  ADD KEY `idx_demands_queue` (`status`, `priority`, `created_at`),
+  ADD KEY `idx_demands_created` (`created_at`, `id`);
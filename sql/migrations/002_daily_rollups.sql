@@ -0,0 +1,20 @@
+-- sql/migrations/002_daily_rollups.sql
+-- Tabelas de totais diários usadas pelos relatórios.
+-- Após aplicar, preencha o histórico com: flask --app wsgi rollups rebuild
+
+CREATE TABLE IF NOT EXISTS `daily_demand_minutes` (
+  `day` date NOT NULL,
+  `demand_id` int NOT NULL,
+  `minutes` int NOT NULL DEFAULT '0',
+  `log_count` int NOT NULL DEFAULT '0',
+  PRIMARY KEY (`day`, `demand_id`),
+  KEY `idx_daily_demand_minutes_demand` (`demand_id`, `day`),
+  CONSTRAINT `daily_demand_minutes_ibfk_1` FOREIGN KEY (`demand_id`) REFERENCES `demands` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS `daily_session_minutes` (
+  `day` date NOT NULL,
+  `session_count` int NOT NULL DEFAULT '0',
+  `total_minutes` int NOT NULL DEFAULT '0',
+  PRIMARY KEY (`day`)
+) ENGINE=InnoDB;
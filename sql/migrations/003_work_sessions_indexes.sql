@@ -0,0 +1,7 @@
+-- sql/migrations/003_work_sessions_indexes.sql
+-- Índice de período para o relatório de horas (paginação por cursor em
+-- (start_time, id)) em bancos já existentes.
+-- (Instalações novas já recebem os índices via sql/schema.sql.)
+
+ALTER TABLE `work_sessions`
+  ADD KEY `idx_work_sessions_start` (`start_time`, `id`);
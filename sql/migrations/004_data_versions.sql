@@ -0,0 +1,9 @@
+-- sql/migrations/004_data_versions.sql
+-- Contadores de versão usados no GET condicional (ETag) das páginas.
+-- As linhas são criadas na primeira escrita (INSERT ... ON DUPLICATE KEY UPDATE).
+
+CREATE TABLE IF NOT EXISTS `data_versions` (
+  `name` varchar(50) NOT NULL,
+  `version` bigint NOT NULL DEFAULT '0',
+  PRIMARY KEY (`name`)
+) ENGINE=InnoDB;
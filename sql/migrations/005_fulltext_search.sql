@@ -0,0 +1,9 @@
+-- sql/migrations/005_fulltext_search.sql
+-- Índices FULLTEXT da busca (/demands/search) em bancos já existentes.
+-- (Instalações novas já recebem os índices via sql/schema.sql.)
+
+ALTER TABLE `demands`
+  ADD FULLTEXT KEY `ft_demands_text` (`title`, `description`);
+
+ALTER TABLE `work_logs`
+  ADD FULLTEXT KEY `ft_work_logs_description` (`description`);
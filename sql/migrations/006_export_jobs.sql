@@ -0,0 +1,21 @@
+-- sql/migrations/006_export_jobs.sql
+-- Jobs de exportação do relatório: estado, progresso e arquivo gerado no S3
+-- (exports/<cache_key>.<ext>), reaproveitado enquanto os dados não mudam.
+
+CREATE TABLE IF NOT EXISTS `export_jobs` (
+  `id` char(32) NOT NULL,
+  `cache_key` char(64) NOT NULL,
+  `format` varchar(10) NOT NULL,
+  `start_date` date DEFAULT NULL,
+  `end_date` date DEFAULT NULL,
+  `status` varchar(10) NOT NULL DEFAULT 'queued',
+  `rows_done` int NOT NULL DEFAULT '0',
+  `rows_total` int DEFAULT NULL,
+  `artifact_key` varchar(255) DEFAULT NULL,
+  `error` text,
+  `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
+  `updated_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  -- Reaproveitamento: último job com a mesma chave (período, formato, versão dos dados)
+  KEY `idx_export_jobs_cache` (`cache_key`, `created_at`)
+) ENGINE=InnoDB;
@@ -0,0 +1,14 @@
+-- sql/migrations/007_demand_events.sql
+-- Eventos da fila (prioridade, status, demandas novas) lidos pelo broker de
+-- cada processo e enviados aos navegadores por SSE (/demands/events).
+-- Linhas mais antigas que EVENTS_RETENTION_SECONDS são removidas pelo broker.
+
+CREATE TABLE IF NOT EXISTS `demand_events` (
+  `id` bigint NOT NULL AUTO_INCREMENT,
+  `kind` varchar(20) NOT NULL,
+  `payload` text NOT NULL,
+  `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  -- Limpeza periódica por idade
+  KEY `idx_demand_events_created` (`created_at`)
+) ENGINE=InnoDB;
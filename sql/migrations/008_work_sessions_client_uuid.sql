@@ -0,0 +1,8 @@
+-- sql/migrations/008_work_sessions_client_uuid.sql
+-- Identificador gerado pelo navegador para cada sessão do tracker: uma sessão
+-- da fila offline reenviada depois de já gravada (ex.: a conexão caiu após o
+-- commit) não soma horas nem work_logs de novo. Sessões antigas ficam com NULL.
+
+ALTER TABLE `work_sessions`
+  ADD COLUMN `client_uuid` char(36) DEFAULT NULL,
+  ADD UNIQUE KEY `uq_work_sessions_client_uuid` (`client_uuid`);
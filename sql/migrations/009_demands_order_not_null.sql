@@ -0,0 +1,21 @@
+-- sql/migrations/009_demands_order_not_null.sql
+-- priority e created_at compõem o cursor da paginação do painel
+-- ((priority, created_at, id) e (created_at, id)). Com NULL, a comparação de
+-- linha no WHERE não avança e o cursor não pode ser decodificado; preenche os
+-- valores ausentes e passa as colunas para NOT NULL.
+
+-- Sem data de criação: usa a última alteração (ou agora)
+UPDATE `demands`
+SET `created_at` = COALESCE(`updated_at`, NOW())
+WHERE `created_at` IS NULL;
+
+-- Sem prioridade: vão para o fim da fila, na ordem de criação
+SET @next_priority := (SELECT COALESCE(MAX(`priority`), -1) FROM `demands`);
+UPDATE `demands`
+SET `priority` = (@next_priority := @next_priority + 1)
+WHERE `priority` IS NULL
+ORDER BY `created_at`, `id`;
+
+ALTER TABLE `demands`
+  MODIFY `priority` int NOT NULL DEFAULT '0',
+  MODIFY `created_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP;
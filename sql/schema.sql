@@ -16,12 +16,19 @@ CREATE TABLE IF NOT EXISTS `demands` (
   `title` varchar(255) NOT NULL,
   `description` text,
   `status` varchar(50) NOT NULL DEFAULT 'Em Fila',
-  `priority` int DEFAULT '0',
+  -- priority e created_at são NOT NULL: compõem o cursor da paginação
+  `priority` int NOT NULL DEFAULT '0',
   `estimated_hours` decimal(10,2) DEFAULT NULL,
   `executed_hours` decimal(10,2) DEFAULT '0.00',
-  `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
+  `created_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
   `updated_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-  PRIMARY KEY (`id`)
+  PRIMARY KEY (`id`),
+  -- Fila de priorização: filtro por status + ordenação por prioridade (paginação por cursor)
+  KEY `idx_demands_queue` (`status`, `priority`, `created_at`),
+  -- Visão "Todas": ordenação por data de criação (paginação por cursor)
+  KEY `idx_demands_created` (`created_at`, `id`),
+  -- Busca textual (/demands/search)
+  FULLTEXT KEY `ft_demands_text` (`title`, `description`)
 ) ENGINE=InnoDB;
 
 -- Tabela de Anexos
@@ -42,7 +49,12 @@ CREATE TABLE IF NOT EXISTS `work_sessions` (
   `start_time` datetime NOT NULL,
   `end_time` datetime NOT NULL,
   `total_minutes` int NOT NULL,
-  PRIMARY KEY (`id`)
+  -- Gerado pelo navegador; evita gravar de novo uma sessão reenviada pela fila offline
+  `client_uuid` char(36) DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uq_work_sessions_client_uuid` (`client_uuid`),
+  -- Relatório de horas: filtro por período + paginação por cursor (start_time, id)
+  KEY `idx_work_sessions_start` (`start_time`, `id`)
 ) ENGINE=InnoDB;
 
 -- Tabela de Logs de Trabalho (detalhes de cada sessão)
@@ -56,10 +68,68 @@ CREATE TABLE IF NOT EXISTS `work_logs` (
   PRIMARY KEY (`id`),
   KEY `work_session_id` (`work_session_id`),
   KEY `demand_id` (`demand_id`),
+  FULLTEXT KEY `ft_work_logs_description` (`description`),
   CONSTRAINT `work_logs_ibfk_1` FOREIGN KEY (`work_session_id`) REFERENCES `work_sessions` (`id`) ON DELETE CASCADE,
   CONSTRAINT `work_logs_ibfk_2` FOREIGN KEY (`demand_id`) REFERENCES `demands` (`id`) ON DELETE CASCADE
 ) ENGINE=InnoDB;
 
+-- Totais diários de minutos por demanda (mantidos pelo tracker; ver rollups.py)
+CREATE TABLE IF NOT EXISTS `daily_demand_minutes` (
+  `day` date NOT NULL,
+  `demand_id` int NOT NULL,
+  `minutes` int NOT NULL DEFAULT '0',
+  `log_count` int NOT NULL DEFAULT '0',
+  PRIMARY KEY (`day`, `demand_id`),
+  KEY `idx_daily_demand_minutes_demand` (`demand_id`, `day`),
+  CONSTRAINT `daily_demand_minutes_ibfk_1` FOREIGN KEY (`demand_id`) REFERENCES `demands` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+-- Totais diários das sessões de trabalho (pelo dia de início da sessão)
+CREATE TABLE IF NOT EXISTS `daily_session_minutes` (
+  `day` date NOT NULL,
+  `session_count` int NOT NULL DEFAULT '0',
+  `total_minutes` int NOT NULL DEFAULT '0',
+  PRIMARY KEY (`day`)
+) ENGINE=InnoDB;
+
+-- Contadores de versão dos dados, incrementados na mesma transação de cada
+-- escrita; usados como ETag pelas páginas (ver versions.py)
+CREATE TABLE IF NOT EXISTS `data_versions` (
+  `name` varchar(50) NOT NULL,
+  `version` bigint NOT NULL DEFAULT '0',
+  PRIMARY KEY (`name`)
+) ENGINE=InnoDB;
+
+-- Exportações do relatório em segundo plano (export_jobs.py)
+CREATE TABLE IF NOT EXISTS `export_jobs` (
+  `id` char(32) NOT NULL,
+  `cache_key` char(64) NOT NULL,
+  `format` varchar(10) NOT NULL,
+  `start_date` date DEFAULT NULL,
+  `end_date` date DEFAULT NULL,
+  `status` varchar(10) NOT NULL DEFAULT 'queued',
+  `rows_done` int NOT NULL DEFAULT '0',
+  `rows_total` int DEFAULT NULL,
+  `artifact_key` varchar(255) DEFAULT NULL,
+  `error` text,
+  `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
+  `updated_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  -- Reaproveitamento: último job com a mesma chave (período, formato, versão dos dados)
+  KEY `idx_export_jobs_cache` (`cache_key`, `created_at`)
+) ENGINE=InnoDB;
+
+-- Eventos da fila enviados por SSE (events.py)
+CREATE TABLE IF NOT EXISTS `demand_events` (
+  `id` bigint NOT NULL AUTO_INCREMENT,
+  `kind` varchar(20) NOT NULL,
+  `payload` text NOT NULL,
+  `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  -- Limpeza periódica por idade
+  KEY `idx_demand_events_created` (`created_at`)
+) ENGINE=InnoDB;
+
 -- Inserir um usuário padrão para login inicial
 -- ATENÇÃO: A senha aqui é 'admin'. Em um ambiente de produção, use um método mais seguro para criar o primeiro usuário.
 INSERT INTO `users` (username, name, password_hash) VALUES ('admin', 'Administrador', 'admin') ON DUPLICATE KEY UPDATE name='Administrador';
\ No newline at end of file
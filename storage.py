@@ -0,0 +1,165 @@
+# storage.py
+# Acesso ao S3: cliente compartilhado, envio paralelo de anexos e cache de
+# URLs pré-assinadas para download.
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+import metrics
+from cache import LRUCache
+
+_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Cliente S3 do app, criado no primeiro uso (e não na importação do
+    módulo) e compartilhado entre requisições e threads.
+    """
+    client = current_app.extensions.get("s3_client")
+    if client is None:
+        with _lock:
+            client = current_app.extensions.get("s3_client")
+            if client is None:
+                # boto3/botocore só são importados aqui, no primeiro uso: o boot
+                # dos workers não paga por eles (ver benchmarks/startup.py).
+                import boto3
+                from botocore.config import Config
+
+                client = boto3.client(
+                    "s3",
+                    endpoint_url=current_app.config.get("S3_ENDPOINT_URL"),
+                    config=Config(
+                        max_pool_connections=max_pool_connections(current_app.config)
+                    ),
+                )
+                if current_app.config.get("METRICS_ENABLED", True):
+                    metrics.instrument_s3_client(client)
+                current_app.extensions["s3_client"] = client
+    return client
+
+
+def max_pool_connections(config):
+    """
+    Tamanho do pool HTTP do cliente: no mínimo o configurado, e o suficiente
+    para um envio de anexos (workers × partes em paralelo) não esgotá-lo.
+    """
+    uploads = config["S3_UPLOAD_WORKERS"] * config["S3_MULTIPART_CONCURRENCY"]
+    return max(config["S3_MAX_POOL_CONNECTIONS"], uploads)
+
+
+def _presign_cache():
+    cache = current_app.extensions.get("s3_presign_cache")
+    if cache is None:
+        with _lock:
+            cache = current_app.extensions.setdefault(
+                "s3_presign_cache",
+                LRUCache(
+                    maxsize=current_app.config["S3_PRESIGN_CACHE_SIZE"],
+                    ttl=_presign_cache_ttl(),
+                ),
+            )
+    return cache
+
+
+def _presign_cache_ttl():
+    # A URL sai do cache antes de expirar: quem a recebe ainda tem pelo
+    # menos S3_PRESIGNED_URL_MARGIN segundos para usá-la.
+    config = current_app.config
+    return max(
+        0, config["S3_PRESIGNED_URL_EXPIRES"] - config["S3_PRESIGNED_URL_MARGIN"]
+    )
+
+
+def transfer_config(config):
+    """
+    Configuração de transferência do boto3: arquivos acima do limite são
+    enviados em partes (multipart), com partes enviadas em paralelo.
+    """
+    from boto3.s3.transfer import TransferConfig
+
+    return TransferConfig(
+        multipart_threshold=config["S3_MULTIPART_THRESHOLD"],
+        multipart_chunksize=config["S3_MULTIPART_PART_SIZE"],
+        max_concurrency=config["S3_MULTIPART_CONCURRENCY"],
+    )
+
+
+def object_key(demand_id, filename):
+    return f"demands/{demand_id}/{filename}"
+
+
+def upload_attachments(client, bucket, demand_id, files, config):
+    """
+    Envia os arquivos (lista de (filename, fileobj)) para o S3 em um pool de
+    threads limitado por S3_UPLOAD_WORKERS.
+
+    Retorna (enviados, falhas): `enviados` é a lista de (filename, key) e
+    `falhas` a lista de (filename, exceção), na ordem recebida.
+    """
+    if not files:
+        return [], []
+
+    transfer = transfer_config(config)
+
+    def upload(item):
+        filename, fileobj = item
+        key = object_key(demand_id, filename)
+        try:
+            client.upload_fileobj(fileobj, bucket, key, Config=transfer)
+            return filename, key, None
+        except Exception as e:
+            return filename, key, e
+
+    workers = max(1, min(config["S3_UPLOAD_WORKERS"], len(files)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(upload, files))
+
+    uploaded = [(filename, key) for filename, key, error in results if error is None]
+    failed = [(filename, error) for filename, _, error in results if error is not None]
+    return uploaded, failed
+
+
+def key_from_filepath(filepath):
+    """Extrai o object key da URL completa salva no banco."""
+    # Ex: https://bucket-name.s3.amazonaws.com/demands/1/file.pdf -> demands/1/file.pdf
+    location = current_app.config["S3_LOCATION"]
+    if filepath.startswith(location):
+        return filepath[len(location) :]
+    return filepath.split(".s3.amazonaws.com/", 1)[1]
+
+
+def cached_presigned_url(attachment_id):
+    return _presign_cache().get(attachment_id)
+
+
+def presigned_url(attachment_id, filepath):
+    """URL temporária de download do anexo, reaproveitada enquanto válida."""
+    cache = _presign_cache()
+    url = cache.get(attachment_id)
+    if url is None:
+        url = get_client().generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": current_app.config["S3_BUCKET"],
+                "Key": key_from_filepath(filepath),
+            },
+            ExpiresIn=current_app.config["S3_PRESIGNED_URL_EXPIRES"],
+        )
+        cache.set(attachment_id, url)
+    return url
+
+
+def presign_attachments(attachments):
+    """
+    URLs pré-assinadas para vários anexos de uma vez (ex.: página de detalhe).
+    Retorna {attachment_id: url}; em caso de falha (ex.: sem credenciais)
+    retorna {} e a página usa a rota de download como alternativa.
+    """
+    try:
+        return {
+            att["id"]: presigned_url(att["id"], att["filepath"]) for att in attachments
+        }
+    except Exception:
+        return {}
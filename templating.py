@@ -0,0 +1,104 @@
+# templating.py
+# Cache dos templates Jinja.
+#
+# - Bytecode: os templates compilados ficam em TEMPLATE_BYTECODE_CACHE_DIR,
+#   compartilhados por todos os workers e reinícios; um worker novo carrega o
+#   bytecode em vez de compilar. O Jinja compara o checksum do fonte, então
+#   um template alterado é recompilado sozinho. `flask templates warm`
+#   preenche o diretório (ex.: no build da imagem).
+# - Trechos: {% cache "nome", chave, ... %}...{% endcache %} guarda o HTML
+#   renderizado em um LRU local do worker. A chave precisa conter tudo de que
+#   o trecho depende; para dados do banco, data_version("demands", ...) muda
+#   a cada escrita (versions.py) e descarta o trecho antigo sem invalidação.
+import os
+import tempfile
+
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+
+import versions
+from cache import LRUCache
+
+
+def data_version(*names):
+    """Versão atual dos dados em `names` (a mesma lida para o ETag)."""
+    return "-".join(str(v) for v in versions.for_request(names))
+
+
+class FragmentCacheExtension(Extension):
+    """Tag {% cache %}: guarda o HTML do bloco sob a chave informada."""
+
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            key.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        # A chave só é avaliada com o cache ligado: data_version() não
+        # consulta o banco à toa
+        key = nodes.CondExpr(
+            self.call_method("_enabled"), nodes.List(key), nodes.Const(None)
+        )
+        return nodes.CallBlock(
+            self.call_method("_cached", [key]), [], [], body
+        ).set_lineno(lineno)
+
+    def _enabled(self):
+        return "fragments" in current_app.extensions
+
+    def _cached(self, key, caller):
+        if key is None:
+            return caller()
+        fragments = current_app.extensions["fragments"]
+        key = repr(key)
+        html = fragments.get(key)
+        if html is None:
+            html = caller()
+            fragments.set(key, html)
+        return html
+
+
+class TemplateCache:
+    """Extensão Flask: cache de bytecode e a tag {% cache %}."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        config = app.config
+        app.cli.add_command(templates_cli)
+        app.jinja_env.add_extension(FragmentCacheExtension)
+        app.jinja_env.globals["data_version"] = data_version
+
+        directory = config.get("TEMPLATE_BYTECODE_CACHE_DIR")
+        if directory is None:
+            directory = os.path.join(tempfile.gettempdir(), "demand-tracker-jinja")
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+
+        if config.get("FRAGMENT_CACHE_ENABLED", True):
+            app.extensions["fragments"] = LRUCache(
+                config.get("FRAGMENT_CACHE_MAXSIZE", 512),
+                config.get("FRAGMENT_CACHE_TTL", 300),
+            )
+
+
+templates_cli = AppGroup("templates", help="Cache dos templates.")
+
+
+@templates_cli.command("warm")
+@with_appcontext
+def warm_command():
+    """Compila todos os templates para o cache de bytecode."""
+    env = current_app.jinja_env
+    names = env.list_templates(extensions=["html"])
+    for name in names:
+        env.get_template(name)
+    click.echo(f"{len(names)} templates compilados.")
@@ -0,0 +1,94 @@
+import gzip
+import os
+
+import pytest
+from flask import Flask, render_template_string
+
+import assets
+
+
+@pytest.fixture
+def static_folder(tmp_path):
+    static = tmp_path / "static"
+    (static / "images").mkdir(parents=True)
+    (static / "style.css").write_text("body { color: #304f7a; }\n" * 200)
+    (static / "images" / "logo.svg").write_text("<svg></svg>")
+    (static / "images" / "Relatorio.xlsx").write_bytes(b"PK\x03\x04")
+    return static
+
+
+@pytest.fixture
+def client(static_folder):
+    assets.build(str(static_folder), log=lambda message: None)
+    app = Flask(__name__, static_folder=str(static_folder))
+    assets.Assets(app)
+
+    @app.route("/page")
+    def page():
+        return render_template_string("{{ url_for('static', filename='style.css') }}")
+
+    with app.test_client() as client:
+        yield client
+
+
+def test_build_fingerprints_compresses_and_skips_spreadsheets(static_folder):
+    """
+    Testa o build: nomes com hash do conteúdo, variante .gz só quando
+    compensa e planilhas fora da publicação.
+    """
+    manifest = assets.build(str(static_folder), log=lambda message: None)
+    dist = static_folder / assets.DIST_DIR
+
+    css = manifest["style.css"]
+    assert css["path"].startswith("style.") and css["path"].endswith(".css")
+    assert "gzip" in css["encodings"]
+    assert (dist / (css["path"] + ".gz")).exists()
+    assert "images/Relatorio.xlsx" not in manifest
+    assert manifest["images/logo.svg"]["encodings"] == []  # pequeno demais
+
+    # Mesmo conteúdo, mesmo nome; conteúdo novo, nome novo
+    assert assets.build(str(static_folder), log=lambda message: None) == manifest
+    (static_folder / "style.css").write_text("body { color: red; }")
+    rebuilt = assets.build(str(static_folder), log=lambda message: None)
+    assert rebuilt["style.css"]["path"] != css["path"]
+
+
+def test_url_for_points_to_fingerprinted_file(client, static_folder):
+    manifest = assets.load_manifest(str(static_folder))
+    hashed = manifest["files"]["style.css"]["path"]
+
+    response = client.get("/page")
+
+    assert response.get_data(as_text=True) == f"/static/dist/{hashed}"
+
+
+def test_fingerprinted_files_are_immutable_and_precompressed(client):
+    """
+    Testa que a cópia com hash sai com cache eterno e, quando o navegador
+    aceita, na variante gzip gerada no build.
+    """
+    url = client.get("/page").get_data(as_text=True)
+
+    response = client.get(url, headers={"Accept-Encoding": "gzip, deflate"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.mimetype == "text/css"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert "immutable" in response.headers["Cache-Control"]
+    assert "max-age=31536000" in response.headers["Cache-Control"]
+    assert gzip.decompress(response.data).startswith(b"body { color")
+
+    response = client.get(url)
+    assert "Content-Encoding" not in response.headers
+    assert response.data.startswith(b"body { color")
+
+
+def test_app_without_manifest_keeps_plain_static_urls(static_folder):
+    app = Flask(__name__, static_folder=str(static_folder))
+    assets.Assets(app)
+
+    with app.test_request_context():
+        url = render_template_string("{{ url_for('static', filename='style.css') }}")
+    assert url == "/static/style.css"
+    assert "assets" not in app.extensions
+    assert not os.path.exists(static_folder / assets.DIST_DIR)
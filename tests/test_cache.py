@@ -0,0 +1,114 @@
+import os
+import time
+
+from flask import Flask
+
+from cache import (
+    CacheServer,
+    FileVersions,
+    LocalBackend,
+    LRUCache,
+    NullBackend,
+    SocketBackend,
+)
+
+
+def test_lru_cache_evicts_and_expires():
+    """
+    Testa a remoção do item menos usado e a expiração por TTL.
+    """
+    lru = LRUCache(maxsize=2, ttl=60)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.get("a")
+    lru.set("c", 3)
+
+    assert lru.get("a") == 1
+    assert lru.get("b") is None  # menos usado recentemente
+    assert lru.get("c") == 3
+
+    lru.set("d", 4, ttl=-1)
+    assert lru.get("d") is None
+
+
+def test_file_versions_are_shared_between_instances(tmp_path):
+    """
+    Testa que o incremento de versão é visto por outra instância (outro worker).
+    """
+    writer = FileVersions(str(tmp_path))
+    reader = FileVersions(str(tmp_path))
+
+    assert reader.get("demands:queue") == 0
+    writer.bump("demands:queue")
+    writer.bump("demands:queue")
+    assert reader.get("demands:queue") == 2
+
+
+def test_local_backend_invalidates_by_version(tmp_path):
+    """
+    Testa que um valor gravado antes do incremento de versão não é mais servido.
+    """
+    worker_a = LocalBackend(16, 60, str(tmp_path))
+    worker_b = LocalBackend(16, 60, str(tmp_path))
+
+    version, value = worker_b.get_versioned("fila")
+    assert value is None
+    worker_b.set_versioned("fila", version, ["antiga"])
+    assert worker_b.get_versioned("fila")[1] == ["antiga"]
+
+    worker_a.bump("fila")  # escrita em outro worker
+    assert worker_b.get_versioned("fila")[1] is None
+
+
+def test_socket_backend_round_trip(tmp_path):
+    """
+    Testa o servidor de cache compartilhado e a degradação para miss sem servidor.
+    """
+    path = str(tmp_path / "cache.sock")
+    server = CacheServer(path)
+    server.start_in_thread()
+    try:
+        client = SocketBackend(path, str(tmp_path))
+        version, value = client.get_versioned("fila")
+        assert (version, value) == ((0, 0), None)
+
+        client.set_versioned("fila", version, [{"id": 1}])
+        assert client.get_versioned("fila") == ((0, 0), [{"id": 1}])
+
+        assert client.bump("fila") == (1, 0)
+        assert client.get_versioned("fila") == ((1, 0), None)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    offline = SocketBackend(str(tmp_path / "inexistente.sock"), str(tmp_path))
+    assert offline.get_versioned("fila") == (None, None)
+    assert NullBackend().get_versioned("fila") == (0, None)
+
+
+def test_socket_backend_failed_bump_invalidates_other_workers(tmp_path):
+    """
+    Testa que uma invalidação que não chega ao servidor ainda impede outros
+    workers de servir o valor antigo, pelo contador em arquivo.
+    """
+    path = str(tmp_path / "cache.sock")
+    server = CacheServer(path)
+    server.start_in_thread()
+    try:
+        reader = SocketBackend(path, str(tmp_path))
+        version, _ = reader.get_versioned("fila")
+        reader.set_versioned("fila", version, ["antiga"])
+        assert reader.get_versioned("fila")[1] == ["antiga"]
+
+        # Worker que escreveu mas não alcançou o servidor
+        writer = SocketBackend(str(tmp_path / "inexistente.sock"), str(tmp_path))
+        with Flask(__name__).app_context():
+            assert writer.bump("fila") == (None, 1)
+
+        version, value = reader.get_versioned("fila")
+        assert (version, value) == ((0, 1), None)
+        reader.set_versioned("fila", version, ["nova"])
+        assert reader.get_versioned("fila")[1] == ["nova"]
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,66 @@
+import random
+from collections import Counter
+from unittest.mock import Mock
+
+import pytest
+
+from benchmarks import dataset
+
+
+def test_split_counts_keeps_exact_total():
+    counts = dataset.split_counts(random.Random(1), 1000, 300)
+
+    assert len(counts) == 300
+    assert sum(counts) == 1000
+    assert min(counts) >= 1
+
+
+def test_split_counts_rejects_impossible_split():
+    with pytest.raises(ValueError):
+        dataset.split_counts(random.Random(1), 5, 10)
+
+
+def test_generate_builds_consistent_skewed_dataset(monkeypatch):
+    """
+    Testa que o gerador grava exatamente as quantidades pedidas, que todo
+    log aponta para sessões e demandas existentes e que as horas seguem uma
+    distribuição concentrada (Zipf).
+    """
+    loaded = {}
+
+    def fake_insert_rows(cur, table, columns, rows, batch_size=None):
+        loaded.setdefault(table, []).extend(dict(zip(columns, row)) for row in rows)
+
+    monkeypatch.setattr(dataset, "insert_rows", fake_insert_rows)
+    rebuild = Mock()
+    monkeypatch.setattr(dataset.rollups, "rebuild", rebuild)
+
+    rows = dataset.generate(
+        Mock(), demands=200, sessions=1000, work_logs=3000, attachments=50
+    )
+
+    assert rows == {
+        "work_sessions": 1000,
+        "work_logs": 3000,
+        "demands": 200,
+        "attachments": 50,
+    }
+    rebuild.assert_called_once()
+
+    sessions = {row["id"]: row for row in loaded["work_sessions"]}
+    demands = {row["id"]: row for row in loaded["demands"]}
+    for log in loaded["work_logs"]:
+        assert log["work_session_id"] in sessions
+        assert demands[log["demand_id"]]["created_at"] <= (
+            sessions[log["work_session_id"]]["start_time"]
+        )
+
+    # Sessões em ordem cronológica e em dias úteis
+    starts = [sessions[i]["start_time"] for i in sorted(sessions)]
+    assert starts == sorted(starts)
+    assert all(start.weekday() < 5 for start in starts)
+
+    # As 10% demandas mais trabalhadas concentram a maior parte dos logs
+    per_demand = Counter(log["demand_id"] for log in loaded["work_logs"])
+    top = sum(count for _, count in per_demand.most_common(20))
+    assert top > 3000 * 0.5
@@ -1,9 +1,17 @@
-from datetime import datetime
+import base64
+import io
+import json
+from datetime import date, datetime
+from unittest.mock import call
+from urllib.parse import quote
 
 import pytest
 
+import storage
 from app import create_app
 from config import TestConfig
+from extensions import cache
+from pagination import encode_cursor
 
 
 @pytest.fixture
@@ -113,16 +121,585 @@ def test_update_priorities(client, mock_mysql):
     json_data = response.get_json()
     assert json_data["status"] == "success"
 
-    # Verifica as chamadas de UPDATE no banco
+    # Toda a nova ordem deve ser gravada em um único UPDATE
     cursor_mock = mock_mysql.connection.cursor.return_value
     cursor_mock.execute.assert_any_call(
-        "UPDATE demands SET priority = %s WHERE id = %s", (0, "3")
+        "UPDATE demands SET priority = CASE id WHEN %s THEN %s WHEN %s THEN %s "
+        "WHEN %s THEN %s END WHERE id IN (%s, %s, %s)",
+        ("3", 0, "1", 1, "2", 2, "3", "1", "2"),
     )
-    cursor_mock.execute.assert_any_call(
-        "UPDATE demands SET priority = %s WHERE id = %s", (1, "1")
+    updates = [
+        c for c in cursor_mock.execute.call_args_list if c[0][0].startswith("UPDATE")
+    ]
+    assert len(updates) == 1
+
+    mock_mysql.connection.commit.assert_called_once()
+
+
+def test_move_demand_updates_single_row(client, mock_mysql):
+    """
+    Testa o movimento de uma única demanda: só a linha movida é alterada,
+    com prioridade no meio do intervalo entre os vizinhos.
+    """
+    cursor_mock = mock_mysql.connection.cursor.return_value
+    cursor_mock.fetchall.return_value = [
+        {"id": 5, "priority": 4096, "created_at": datetime(2025, 8, 1)},
+        {"id": 2, "priority": 2048, "created_at": datetime(2025, 8, 1)},
+    ]
+    cursor_mock.fetchone.return_value = {"priority": 1024}  # vizinho anterior
+
+    response = client.post("/demands/update_priorities", json={"id": 5, "before_id": 2})
+
+    assert response.status_code == 200
+    assert response.get_json()["priority"] == 1536
+    update, event, bump = cursor_mock.execute.call_args_list[-3:]
+    assert update == call("UPDATE demands SET priority = %s WHERE id = %s", (1536, 5))
+    # Evento publicado na mesma transação para as páginas abertas (SSE)
+    assert event == call(
+        "INSERT INTO demand_events (kind, payload) VALUES (%s, %s)",
+        ("move", '{"id":5,"priority":1536,"before_id":2,"after_id":null}'),
+    )
+    # Versão dos dados incrementada na mesma transação (ETag das páginas)
+    assert bump == call(
+        "INSERT INTO data_versions (name, version) VALUES (%s, 1) "
+        "ON DUPLICATE KEY UPDATE version = version + 1",
+        ("demands",),
     )
+    mock_mysql.connection.commit.assert_called_once()
+
+
+def test_move_demand_rebalances_when_no_gap(client, mock_mysql):
+    """
+    Testa que, sem folga entre os vizinhos, a fila é rebalanceada em um
+    único UPDATE antes de posicionar a demanda.
+    """
+    cursor_mock = mock_mysql.connection.cursor.return_value
+    cursor_mock.fetchall.side_effect = [
+        # Demanda movida e âncora (prioridades densas)
+        [
+            {"id": 3, "priority": 2, "created_at": datetime(2025, 8, 1)},
+            {"id": 1, "priority": 0, "created_at": datetime(2025, 8, 1)},
+        ],
+        # Fila completa para o rebalanceamento
+        [{"id": 1}, {"id": 2}, {"id": 3}],
+        # Demanda movida e âncora após o rebalanceamento
+        [
+            {"id": 3, "priority": 3072, "created_at": datetime(2025, 8, 1)},
+            {"id": 1, "priority": 1024, "created_at": datetime(2025, 8, 1)},
+        ],
+    ]
+    cursor_mock.fetchone.side_effect = [{"priority": 1}, {"priority": 2048}]
+
+    response = client.post("/demands/update_priorities", json={"id": 3, "after_id": 1})
+
+    assert response.status_code == 200
+    assert response.get_json()["priority"] == 1536
     cursor_mock.execute.assert_any_call(
-        "UPDATE demands SET priority = %s WHERE id = %s", (2, "2")
+        "UPDATE demands SET priority = CASE id WHEN %s THEN %s WHEN %s THEN %s "
+        "WHEN %s THEN %s END WHERE id IN (%s, %s, %s)",
+        (1, 1024, 2, 2048, 3, 3072, 1, 2, 3),
     )
 
-    mock_mysql.connection.commit.assert_called_once()
+
+def test_move_demand_requires_single_anchor(client, mock_mysql):
+    """
+    Testa que o movimento exige exatamente um vizinho de referência.
+    """
+    response = client.post("/demands/update_priorities", json={"id": 3})
+
+    assert response.status_code == 400
+    assert response.get_json()["status"] == "error"
+    mock_mysql.connection.commit.assert_not_called()
+
+
+def test_dashboard_paginates_with_cursor(client, mock_mysql):
+    """
+    Testa a paginação por cursor: busca page_size + 1 linhas e gera o link
+    para a próxima página a partir da última linha exibida.
+    """
+    client.application.config["DEMANDS_PAGE_SIZE"] = 1
+    mock_demands = [
+        {
+            "id": 7,
+            "title": "Primeira da Fila",
+            "status": "Em Fila",
+            "created_at": datetime(2025, 8, 1, 9, 0),
+            "priority": 0,
+            "executed_hours": 0,
+            "estimated_hours": None,
+        },
+        {
+            "id": 8,
+            "title": "Segunda da Fila",
+            "status": "Em Fila",
+            "created_at": datetime(2025, 8, 2, 9, 0),
+            "priority": 1,
+            "executed_hours": 0,
+            "estimated_hours": None,
+        },
+    ]
+    cursor_mock = mock_mysql.connection.cursor.return_value
+    cursor_mock.fetchall.return_value = mock_demands
+
+    response = client.get("/demands/")
+    assert response.status_code == 200
+    assert b"Primeira da Fila" in response.data
+    assert b"Segunda da Fila" not in response.data
+    assert b"Pr\xc3\xb3xima p\xc3\xa1gina" in response.data  # Próxima página
+
+    query, params = cursor_mock.execute.call_args[0]
+    assert "LIMIT %s" in query
+    assert params == (2,)
+
+    next_cursor = encode_cursor(mock_demands[0], ("priority", "created_at", "id"))
+    cursor_mock.fetchall.return_value = mock_demands[1:]
+    response = client.get(f"/demands/?after={next_cursor}&pos=1")
+    assert response.status_code == 200
+    assert b"Segunda da Fila" in response.data
+
+    query, params = cursor_mock.execute.call_args[0]
+    assert "(priority, created_at, id) > (%s, %s, %s)" in query
+    assert params == (0, datetime(2025, 8, 1, 9, 0), 7, 2)
+
+
+def test_dashboard_ignores_invalid_cursor(client, mock_mysql):
+    """
+    Testa que um cursor inválido volta para a primeira página.
+    """
+    response = client.get("/demands/?view=all&after=nao-e-um-cursor")
+    assert response.status_code == 200
+
+    cursor_mock = mock_mysql.connection.cursor.return_value
+    query, params = cursor_mock.execute.call_args[0]
+    assert "WHERE" not in query
+    assert params == (51,)
+
+
+@pytest.mark.parametrize("values", [[None, "x", 1], [1, {"a": 1}, 2]])
+def test_dashboard_ignores_cursor_with_wrong_types(client, mock_mysql, values):
+    """
+    Testa que um cursor bem formado, mas com valores de tipo errado, também
+    volta para a primeira página em vez de gerar erro 500.
+    """
+    after = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+    response = client.get(f"/demands/?after={after}")
+    assert response.status_code == 200
+
+    cursor_mock = mock_mysql.connection.cursor.return_value
+    query, params = cursor_mock.execute.call_args[0]
+    assert "(priority, created_at, id) >" not in query
+
+
+def test_dashboard_pages_cached_queue_with_null_keys(client, mock_mysql, tmp_path):
+    """
+    Testa a paginação da fila em cache com prioridade e data nulas: NULL vem
+    primeiro, como no ORDER BY do banco, sem erro ao comparar com o cursor.
+    """
+    app = client.application
+    app.config.update(
+        CACHE_BACKEND="local", CACHE_VERSION_DIR=str(tmp_path), DEMANDS_PAGE_SIZE=1
+    )
+    cache.init_app(app)
+    queue = [
+        {"id": 3, "title": "Sem Prioridade", "priority": None, "created_at": None},
+        {
+            "id": 1,
+            "title": "Primeira da Fila",
+            "priority": 0,
+            "created_at": datetime(2025, 8, 1, 9, 0),
+        },
+        {
+            "id": 2,
+            "title": "Segunda da Fila",
+            "priority": 1,
+            "created_at": datetime(2025, 8, 2, 9, 0),
+        },
+    ]
+    for row in queue:
+        row.update(status="Em Fila", executed_hours=0, estimated_hours=None)
+    mock_mysql.connection.cursor.return_value.fetchall.return_value = queue
+
+    response = client.get("/demands/")
+    assert b"Sem Prioridade" in response.data
+    assert b"Primeira da Fila" not in response.data
+
+    after = encode_cursor(queue[1], ("priority", "created_at", "id"))
+    response = client.get(f"/demands/?after={after}&pos=2")
+    assert response.status_code == 200
+    assert b"Segunda da Fila" in response.data
+    assert b"Primeira da Fila" not in response.data
+    assert b"Sem Prioridade" not in response.data
+
+
+def test_api_list_returns_requested_fields(client, mock_mysql):
+    """
+    Testa a API JSON: só os campos pedidos saem na resposta, mas as colunas
+    da ordenação são lidas para montar o cursor.
+    """
+    client.application.config["DEMANDS_PAGE_SIZE"] = 1
+    mock_demands = [
+        {
+            "id": 7,
+            "title": "Primeira da Fila",
+            "priority": 0,
+            "created_at": datetime(2025, 8, 1, 9, 0),
+        },
+        {
+            "id": 8,
+            "title": "Segunda da Fila",
+            "priority": 1,
+            "created_at": datetime(2025, 8, 2, 9, 0),
+        },
+    ]
+    cursor_mock = mock_mysql.connection.cursor.return_value
+    cursor_mock.fetchall.return_value = mock_demands
+
+    response = client.get("/demands/api?fields=id,title")
+    assert response.status_code == 200
+    assert response.mimetype == "application/json"
+    data = response.get_json()
+    assert data["demands"] == [{"id": 7, "title": "Primeira da Fila"}]
+    assert data["next_cursor"] == encode_cursor(
+        mock_demands[0], ("priority", "created_at", "id")
+    )
+
+    query, params = cursor_mock.execute.call_args[0]
+    assert query.startswith("SELECT id, title, priority, created_at FROM demands")
+    assert "description" not in query
+    assert params == (2,)
+
+
+def test_api_list_filters_status_and_paginates(client, mock_mysql):
+    """
+    Testa o filtro por status (lista separada por vírgula ou repetida) junto
+    com o cursor da ordem por data de criação.
+    """
+    cursor_mock = mock_mysql.connection.cursor.return_value
+    cursor_mock.fetchall.return_value = [
+        {
+            "id": 3,
+            "status": "Concluída",
+            "description": "Detalhes",
+            "created_at": datetime(2025, 8, 1, 9, 0),
+        }
+    ]
+    after = encode_cursor(
+        {"created_at": datetime(2025, 8, 5, 9, 0), "id": 9}, ("created_at", "id")
+    )
+
+    response = client.get(
+        "/demands/api?fields=id,status,description&order=created&limit=10"
+        f"&status=Em Fila,Concluída&status=Cancelada&after={after}"
+    )
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["demands"] == [
+        {"id": 3, "status": "Concluída", "description": "Detalhes"}
+    ]
+    assert data["next_cursor"] is None
+
+    query, params = cursor_mock.execute.call_args[0]
+    assert "status IN (%s, %s, %s)" in query
+    assert "(created_at, id) < (%s, %s)" in query
+    assert "ORDER BY created_at DESC, id DESC" in query
+    assert params == (
+        "Em Fila",
+        "Concluída",
+        "Cancelada",
+        datetime(2025, 8, 5, 9, 0),
+        9,
+        11,
+    )
+
+
+@pytest.mark.parametrize(
+    "query_string",
+    ["fields=id,senha", "order=titulo", "limit=0", "limit=501", "after=invalido"],
+)
+def test_api_list_rejects_invalid_params(client, mock_mysql, query_string):
+    """
+    Testa que parâmetros inválidos respondem 400 sem consultar as demandas.
+    """
+    response = client.get(f"/demands/api?{query_string}")
+    assert response.status_code == 400
+    assert response.get_json()["status"] == "error"
+    mock_mysql.connection.cursor.return_value.execute.assert_not_called()
+
+
+@pytest.fixture
+def s3_bucket(client):
+    """S3 local (moto) com um bucket de testes."""
+    moto = pytest.importorskip("moto")
+    import boto3
+
+    with moto.mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="bucket-de-teste")
+        client.application.extensions["s3_client"] = s3
+        client.application.config.update(
+            S3_BUCKET="bucket-de-teste",
+            S3_LOCATION="https://bucket-de-teste.s3.amazonaws.com/",
+            S3_MULTIPART_THRESHOLD=5 * 1024 * 1024,
+            S3_MULTIPART_PART_SIZE=5 * 1024 * 1024,
+        )
+        yield s3
+
+
+def test_save_demand_uploads_attachments_after_commit(client, mock_mysql, s3_bucket):
+    """
+    Testa o envio paralelo dos anexos para o S3 (local), depois do commit da
+    demanda, e o registro de todos eles em um único lote.
+    """
+    conn = mock_mysql.connection
+    cursor_mock = conn.cursor.return_value
+    events = []
+    conn.commit.side_effect = lambda: events.append("commit")
+    cursor_mock.executemany.side_effect = lambda *args: events.append("attachments")
+
+    big_file = b"x" * (6 * 1024 * 1024)  # acima do limite: envio multipart
+    response = client.post(
+        "/demands/save",
+        data={
+            "demand_id": "42",
+            "title": "Demanda com anexos",
+            "description": "",
+            "status": "Em Fila",
+            "attachments": [
+                (io.BytesIO(b"conteudo"), "notas.txt"),
+                (io.BytesIO(big_file), "grande.pdf"),
+                (io.BytesIO(b"nao permitido"), "script.exe"),
+            ],
+        },
+        content_type="multipart/form-data",
+    )
+
+    assert response.status_code == 302
+    assert events == ["commit", "attachments", "commit"]
+
+    query, rows = cursor_mock.executemany.call_args[0]
+    assert query.startswith("INSERT INTO attachments")
+    assert rows == [
+        (
+            "42",
+            "notas.txt",
+            "https://bucket-de-teste.s3.amazonaws.com/demands/42/notas.txt",
+        ),
+        (
+            "42",
+            "grande.pdf",
+            "https://bucket-de-teste.s3.amazonaws.com/demands/42/grande.pdf",
+        ),
+    ]
+
+    stored = s3_bucket.get_object(Bucket="bucket-de-teste", Key="demands/42/grande.pdf")
+    assert stored["ContentLength"] == len(big_file)
+    assert "-" in stored["ETag"]  # ETag de upload multipart
+
+
+def test_s3_pool_fits_parallel_uploads(client, s3_bucket):
+    """
+    Testa que o pool HTTP do cliente S3 comporta todos os envios simultâneos
+    (workers × partes em paralelo), mesmo com S3_MAX_POOL_CONNECTIONS menor.
+    """
+    app = client.application
+    app.config.update(
+        S3_UPLOAD_WORKERS=4, S3_MULTIPART_CONCURRENCY=4, S3_MAX_POOL_CONNECTIONS=10
+    )
+    app.extensions.pop("s3_client", None)
+
+    with app.app_context():
+        s3 = storage.get_client()
+
+    assert s3.meta.config.max_pool_connections == 16
+
+
+def test_download_attachment_reuses_presigned_url(client, mock_mysql, s3_bucket):
+    """
+    Testa que a URL pré-assinada é reaproveitada: o segundo clique não
+    consulta o banco nem assina uma nova URL.
+    """
+    cursor_mock = mock_mysql.connection.cursor.return_value
+    cursor_mock.fetchone.return_value = {
+        "filename": "notas.txt",
+        "filepath": "https://bucket-de-teste.s3.amazonaws.com/demands/42/notas.txt",
+    }
+
+    first = client.get("/demands/attachment/7")
+    second = client.get("/demands/attachment/7")
+
+    assert first.status_code == 302
+    assert "demands/42/notas.txt" in first.headers["Location"]
+    assert second.headers["Location"] == first.headers["Location"]
+    assert cursor_mock.execute.call_count == 1
+
+
+def _detail_row(**attachment):
+    row = {
+        "id": 42,
+        "title": "Demanda com anexos",
+        "description": "",
+        "status": "Em Fila",
+        "priority": 0,
+        "estimated_hours": None,
+        "executed_hours": 0,
+        "created_at": datetime(2025, 8, 1, 9, 0),
+        "updated_at": datetime(2025, 8, 1, 9, 0),
+        "attachment_id": None,
+        "filename": None,
+        "filepath": None,
+        "log_count": 0,
+        "minutes": 0,
+        "last_day": None,
+    }
+    row.update(attachment)
+    return row
+
+
+def test_detail_links_attachments_through_download_route(client, mock_mysql):
+    """
+    Testa que a página de detalhe não embute URLs assinadas: com o ETag da
+    página, elas expirariam em um HTML ainda revalidado com 304.
+    """
+    cursor_mock = mock_mysql.connection.cursor.return_value
+    cursor_mock.fetchall.side_effect = [
+        [
+            _detail_row(
+                attachment_id=1,
+                filename="a.txt",
+                filepath="https://bucket-de-teste.s3.amazonaws.com/demands/42/a.txt",
+            ),
+            _detail_row(
+                attachment_id=2,
+                filename="b.txt",
+                filepath="https://bucket-de-teste.s3.amazonaws.com/demands/42/b.txt",
+            ),
+        ],
+        [],
+    ]
+
+    response = client.get("/demands/42")
+
+    assert response.status_code == 200
+    assert b"/demands/attachment/1" in response.data
+    assert b"/demands/attachment/2" in response.data
+    assert b"amazonaws.com" not in response.data
+    assert b"/demands/42/attachment-links" in response.data
+
+
+def test_attachment_links_presigns_in_batch(client, mock_mysql, s3_bucket):
+    """
+    Testa o endpoint que assina em lote os links da página de detalhe, fora
+    do ETag da página e sem cache no navegador.
+    """
+    cursor_mock = mock_mysql.connection.cursor.return_value
+    cursor_mock.fetchall.return_value = [
+        {
+            "id": 1,
+            "filepath": "https://bucket-de-teste.s3.amazonaws.com/demands/42/a.txt",
+        },
+        {
+            "id": 2,
+            "filepath": "https://bucket-de-teste.s3.amazonaws.com/demands/42/b.txt",
+        },
+    ]
+
+    response = client.get("/demands/42/attachment-links")
+
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "no-store"
+    assert "ETag" not in response.headers
+    data = response.get_json()
+    assert "demands/42/a.txt?" in data["links"]["1"]  # URL assinada
+    assert "demands/42/b.txt?" in data["links"]["2"]
+    assert data["valid_for"] == client.application.config["S3_PRESIGNED_URL_MARGIN"]
+    cursor_mock.execute.assert_called_once_with(
+        "SELECT id, filepath FROM attachments WHERE demand_id = %s", (42,)
+    )
+
+
+def test_detail_fetches_header_attachments_and_totals_at_once(client, mock_mysql):
+    """
+    Testa que cabeçalho, anexos e totais vêm de uma única consulta e que o
+    histórico traz só a primeira página, com o link para as seguintes.
+    """
+    client.application.config["DEMAND_HISTORY_PAGE_SIZE"] = 1
+    cursor_mock = mock_mysql.connection.cursor.return_value
+    history = [
+        {
+            "id": 9,
+            "minutes_spent": 30,
+            "description": "Revisão",
+            "start_time": datetime(2025, 8, 4, 14, 0),
+            "end_time": datetime(2025, 8, 4, 15, 0),
+        },
+        {
+            "id": 8,
+            "minutes_spent": 45,
+            "description": "Primeira sessão",
+            "start_time": datetime(2025, 8, 1, 9, 0),
+            "end_time": datetime(2025, 8, 1, 10, 0),
+        },
+    ]
+    cursor_mock.fetchall.side_effect = [
+        [_detail_row(log_count=12, minutes=390, last_day=date(2025, 8, 4))],
+        history,
+    ]
+
+    response = client.get("/demands/42")
+    assert response.status_code == 200
+    html = response.get_data(as_text=True)
+    assert "Registros: <strong>12</strong>" in html
+    assert "6.50h" in html
+    assert "04/08/2025" in html
+    assert "Revisão" in html
+    assert "Primeira sessão" not in html
+    next_cursor = encode_cursor(history[0], ("start_time", "id"))
+    assert f"/demands/42/history?after={quote(next_cursor)}" in html
+
+    assert cursor_mock.execute.call_count == 2
+    detail_call, history_call = cursor_mock.execute.call_args_list
+    assert "LEFT JOIN attachments" in detail_call[0][0]
+    assert "daily_demand_minutes" in detail_call[0][0]
+    assert detail_call[0][1] == (42, 42)
+    assert history_call[0][1] == (42, 2)
+
+
+def test_work_history_continues_from_cursor(client, mock_mysql):
+    """
+    Testa o carregamento sob demanda do histórico por (start_time, id).
+    """
+    cursor_mock = mock_mysql.connection.cursor.return_value
+    cursor_mock.fetchall.return_value = [
+        {
+            "id": 8,
+            "minutes_spent": 45,
+            "description": "Primeira sessão",
+            "start_time": datetime(2025, 8, 1, 9, 0),
+            "end_time": datetime(2025, 8, 1, 10, 0),
+        }
+    ]
+    after = encode_cursor(
+        {"start_time": datetime(2025, 8, 4, 14, 0), "id": 9}, ("start_time", "id")
+    )
+
+    response = client.get(f"/demands/42/history?after={after}")
+    assert response.status_code == 200
+    html = response.get_data(as_text=True)
+    assert "Primeira sessão" in html
+    assert "Carregar mais" not in html
+
+    query, params = cursor_mock.execute.call_args[0]
+    assert "(ws.start_time, wl.id) < (%s, %s)" in query
+    assert params == (42, datetime(2025, 8, 4, 14, 0), 9, 51)
+
+    response = client.get("/demands/42/history?after=invalido")
+    assert response.status_code == 400
+
+
+def test_detail_redirects_when_demand_is_missing(client, mock_mysql):
+    mock_mysql.connection.cursor.return_value.fetchall.return_value = []
+
+    response = client.get("/demands/404")
+
+    assert response.status_code == 302
+    assert response.headers["Location"].endswith("/demands/")
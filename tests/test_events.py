@@ -0,0 +1,190 @@
+from unittest.mock import Mock, call
+
+import pytest
+
+import events
+from app import create_app
+from config import TestConfig
+
+
+@pytest.fixture
+def app():
+    return create_app(TestConfig)
+
+
+@pytest.fixture
+def client(app):
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def pool_cursor(app):
+    """Cursor das conexões do pool usadas pelo broker."""
+    cursor = Mock()
+    conn = Mock()
+    conn.cursor.return_value = cursor
+    pool = Mock()
+    pool.checkout.return_value = conn
+    app.extensions["mysql"] = pool
+    return cursor
+
+
+def _broker(app, last_id):
+    broker = events.Broker(app)
+    broker.last_id = broker._floor = last_id
+    return broker
+
+
+def _drain(subscriber):
+    items = []
+    while not subscriber.empty():
+        items.append(subscriber.get())
+    return items
+
+
+def test_publish_inserts_event(mock_mysql):
+    cur = mock_mysql.connection.cursor.return_value
+
+    events.publish(cur, events.REORDER, {"ids": [3, 1, 2]})
+
+    cur.execute.assert_called_once_with(
+        "INSERT INTO demand_events (kind, payload) VALUES (%s, %s)",
+        ("reorder", '{"ids":[3,1,2]}'),
+    )
+
+
+def test_poll_fans_out_new_events_once(app, pool_cursor):
+    broker = _broker(app, 10)
+    subscriber = broker.subscribe()
+
+    pool_cursor.fetchall.return_value = [
+        {"id": 11, "kind": "move", "payload": '{"id":1}'},
+        {"id": 12, "kind": "status", "payload": '{"demands":[]}'},
+    ]
+    broker.poll()
+    # A releitura dos ids recentes não repete eventos já entregues
+    broker.poll()
+
+    assert _drain(subscriber) == [
+        (11, "move", '{"id":1}'),
+        (12, "status", '{"demands":[]}'),
+    ]
+    assert broker.last_id == 12
+    assert pool_cursor.execute.call_args == call(
+        "SELECT id, kind, payload FROM demand_events WHERE id > %s ORDER BY id",
+        (0,),
+    )
+
+
+def test_subscribe_replays_buffered_events(app, pool_cursor):
+    broker = _broker(app, 10)
+    pool_cursor.fetchall.return_value = [
+        {"id": 11, "kind": "move", "payload": "{}"},
+        {"id": 12, "kind": "move", "payload": "{}"},
+    ]
+    broker.poll()
+
+    assert _drain(broker.subscribe(after_id=11)) == [(12, "move", "{}")]
+    assert _drain(broker.subscribe(after_id=12)) == []
+
+
+def test_subscribe_resets_when_events_were_lost(app, pool_cursor):
+    # Eventos anteriores ao início do broker não estão em memória
+    broker = _broker(app, 10)
+
+    assert _drain(broker.subscribe(after_id=7)) == [(10, events.RESET, "{}")]
+
+
+def test_subscribe_is_capped_per_process(app, pool_cursor):
+    app.config["EVENTS_MAX_SUBSCRIBERS"] = 1
+    broker = _broker(app, 10)
+
+    first = broker.subscribe()
+    assert broker.subscribe() is None
+    broker.unsubscribe(first)
+    assert broker.subscribe() is not None
+
+
+def test_events_since_returns_buffered_events_for_polling(app, pool_cursor):
+    broker = _broker(app, 10)
+    pool_cursor.fetchall.return_value = [
+        {"id": 11, "kind": "move", "payload": "{}"},
+        {"id": 12, "kind": "move", "payload": "{}"},
+    ]
+    broker.poll()
+
+    assert broker.events_since(11) == ([(12, "move", "{}")], 12)
+    assert broker.events_since(7) == ([(12, events.RESET, "{}")], 12)
+    # Polling não ocupa vaga de assinante
+    assert broker._subscribers == set()
+
+
+def test_stream_formats_events_and_heartbeats(app, pool_cursor):
+    broker = _broker(app, 10)
+    subscriber = broker.subscribe()
+    subscriber.put((11, "move", '{"id":1}'))
+
+    body = events.stream(broker, subscriber, max_seconds=0.2, heartbeat_seconds=0.05)
+
+    assert next(body) == "retry: 2000\n\n"
+    assert next(body) == 'id: 11\nevent: move\ndata: {"id":1}\n\n'
+    assert next(body) == ": ping\n\n"
+    # Ao fim do tempo máximo o stream encerra e libera a assinatura
+    assert set(body) <= {": ping\n\n"}
+    assert subscriber not in broker._subscribers
+
+
+def test_events_stream_route(client, monkeypatch):
+    broker = Mock()
+    monkeypatch.setattr(events, "get_broker", lambda: broker)
+    monkeypatch.setattr(events, "stream", lambda *args: iter(["retry: 2000\n\n"]))
+
+    response = client.get("/demands/events?last_id=3", headers={"Last-Event-ID": "8"})
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert response.data == b"retry: 2000\n\n"
+    # O Last-Event-ID da reconexão prevalece sobre o id da página
+    broker.subscribe.assert_called_once_with(8)
+
+
+def test_events_stream_falls_back_when_full(client, monkeypatch):
+    broker = Mock()
+    broker.subscribe.return_value = None
+    monkeypatch.setattr(events, "get_broker", lambda: broker)
+
+    response = client.get("/demands/events?last_id=3")
+
+    # 204: o EventSource não reconecta e a página passa ao polling
+    assert response.status_code == 204
+
+
+def test_events_poll_route(client, monkeypatch):
+    broker = Mock()
+    broker.events_since.return_value = ([(12, "move", '{"id":1}')], 12)
+    monkeypatch.setattr(events, "get_broker", lambda: broker)
+
+    response = client.get("/demands/events/poll?last_id=11")
+
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "no-store"
+    assert response.get_json() == {
+        "events": [{"id": 12, "kind": "move", "data": '{"id":1}'}],
+        "last_id": 12,
+    }
+    broker.events_since.assert_called_once_with(11)
+
+
+def test_dashboard_embeds_last_event_id(client, mock_mysql):
+    cursor = mock_mysql.connection.cursor.return_value
+    cursor.fetchone.return_value = {"last_id": 42}
+
+    response = client.get("/demands/")
+
+    assert response.status_code == 200
+    assert b'data-last-event-id="42"' in response.data
+    assert cursor.execute.call_args_list[0] == call(
+        "SELECT MAX(id) AS last_id FROM demand_events"
+    )
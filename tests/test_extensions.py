@@ -0,0 +1,145 @@
+import threading
+from unittest.mock import Mock
+
+import MySQLdb
+import pytest
+
+from extensions import ConnectionPool, PoolTimeout
+
+
+def make_pool(**kwargs):
+    connections = []
+
+    def connect():
+        conn = Mock()
+        connections.append(conn)
+        return conn
+
+    return ConnectionPool(connect, **kwargs), connections
+
+
+def test_pool_reuses_idle_connection():
+    """
+    Testa que a conexão devolvida ao pool é reaproveitada no próximo checkout.
+    """
+    pool, connections = make_pool(size=2, max_overflow=0)
+
+    conn = pool.checkout()
+    pool.checkin(conn)
+    assert pool.checkout() is conn
+
+    assert len(connections) == 1
+    conn.rollback.assert_called_once()  # transação aberta nunca volta ao pool
+    stats = pool.stats()
+    assert stats["checkouts"] == 2
+    assert stats["connects"] == 1
+    assert stats["in_use"] == 1
+
+
+def test_pool_closes_overflow_connections():
+    """
+    Testa que conexões além do tamanho do pool são fechadas ao serem devolvidas.
+    """
+    pool, connections = make_pool(size=1, max_overflow=1)
+
+    first = pool.checkout()
+    second = pool.checkout()
+    pool.checkin(first)
+    pool.checkin(second)
+
+    assert pool.stats()["idle"] == 1
+    second.close.assert_called_once()
+
+
+def test_pool_times_out_when_exhausted():
+    """
+    Testa o tempo limite de espera quando todas as conexões estão em uso.
+    """
+    pool, _ = make_pool(size=1, max_overflow=0, timeout=0.05)
+    pool.checkout()
+
+    with pytest.raises(PoolTimeout):
+        pool.checkout()
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_pool_waits_for_checkin():
+    """
+    Testa que um checkout aguarda a devolução de outra conexão e registra a espera.
+    """
+    pool, _ = make_pool(size=1, max_overflow=0, timeout=2)
+    conn = pool.checkout()
+
+    timer = threading.Timer(0.05, pool.checkin, args=(conn,))
+    timer.start()
+    assert pool.checkout() is conn
+    timer.join()
+
+    assert pool.stats()["wait_time_max"] >= 0.04
+
+
+def test_pool_replaces_dead_and_expired_connections():
+    """
+    Testa o pre-ping (conexão morta) e a reciclagem por idade.
+    """
+    pool, connections = make_pool(size=1, max_overflow=0, pre_ping=True)
+    conn = pool.checkout()
+    pool.checkin(conn)
+    conn.ping.side_effect = MySQLdb.OperationalError("gone away")
+
+    assert pool.checkout() is not conn
+    assert pool.stats()["ping_failures"] == 1
+
+    pool, connections = make_pool(size=1, max_overflow=0, recycle=-1)
+    conn = pool.checkout()
+    pool.checkin(conn)
+    assert pool.checkout() is not conn
+    assert pool.stats()["recycled"] == 1
+
+
+def test_pymysql_driver_uses_mysqldb_cursor_classes_and_errors(monkeypatch):
+    """
+    Testa o driver cooperativo: parâmetros de conexão do PyMySQL, classes de
+    cursor do MySQLdb traduzidas e exceções do PyMySQL levantadas como as do
+    MySQLdb (que o pool e o app tratam).
+    """
+    import pymysql
+    import pymysql.cursors
+
+    from extensions import _pymysql_connect
+
+    raw = Mock()
+    raw.ping.side_effect = pymysql.err.OperationalError(2006, "gone away")
+    connect_calls = []
+
+    def fake_connect(**kwargs):
+        connect_calls.append(kwargs)
+        return raw
+
+    monkeypatch.setattr(pymysql, "connect", fake_connect)
+    connect = _pymysql_connect(
+        {
+            "host": "db",
+            "user": "app",
+            "passwd": "secret",
+            "db": "demands",
+            "cursorclass": MySQLdb.cursors.DictCursor,
+        }
+    )
+
+    conn = connect()
+    conn.cursor(MySQLdb.cursors.SSCursor)
+
+    assert connect_calls == [
+        {
+            "host": "db",
+            "user": "app",
+            "password": "secret",
+            "database": "demands",
+            "cursorclass": pymysql.cursors.DictCursor,
+        }
+    ]
+    raw.cursor.assert_called_once_with(pymysql.cursors.SSCursor)
+    with pytest.raises(MySQLdb.OperationalError):
+        conn.ping()
+    raw.ping.assert_called_once_with(reconnect=False)
@@ -0,0 +1,97 @@
+from unittest.mock import Mock
+
+import pytest
+from prometheus_client import REGISTRY
+
+import metrics
+from app import create_app
+from config import TestConfig
+
+
+@pytest.fixture
+def client():
+    app = create_app(TestConfig)
+    with app.test_client() as client:
+        yield client
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_metrics_endpoint_exposes_request_latency(client):
+    """
+    Testa que cada requisição é contada no histograma de latência do seu
+    endpoint e que /metrics expõe o formato do Prometheus.
+    """
+    labels = {"endpoint": "auth.login", "method": "GET", "status": "200"}
+    before = sample("http_request_duration_seconds_count", **labels)
+
+    client.get("/auth/login")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert b"http_request_duration_seconds_bucket" in response.data
+    assert sample("http_request_duration_seconds_count", **labels) == before + 1
+    assert sample("http_requests_in_progress", endpoint="auth.login") == 0
+
+
+def test_queries_are_counted_per_request(client):
+    """
+    Testa que as queries feitas por uma conexão instrumentada entram na
+    contagem e no tempo de banco da requisição em andamento.
+    """
+    app = client.application
+    conn = metrics.InstrumentedConnection(Mock())
+    before_count = sample("db_queries_per_request_count", endpoint="reports.index")
+    before_sum = sample("db_queries_per_request_sum", endpoint="reports.index")
+
+    with app.test_request_context("/reports/"):
+        app.preprocess_request()
+        cur = conn.cursor()
+        cur.execute("SELECT 1")
+        cur.executemany("INSERT INTO t VALUES (%s)", [(1,), (2,)])
+        conn.cursor().execute("SELECT 2")
+        app.do_teardown_request()
+
+    assert sample("db_queries_per_request_count", endpoint="reports.index") == (
+        before_count + 1
+    )
+    assert sample("db_queries_per_request_sum", endpoint="reports.index") == (
+        before_sum + 3
+    )
+
+
+def test_s3_calls_are_timed_by_operation():
+    """
+    Testa que as chamadas do cliente S3 instrumentado são medidas por
+    operação, separando respostas de erro.
+    """
+    moto = pytest.importorskip("moto")
+    import boto3
+
+    with moto.mock_aws():
+        s3 = metrics.instrument_s3_client(boto3.client("s3", region_name="us-east-1"))
+        s3.create_bucket(Bucket="bucket-de-teste")
+        ok = sample(
+            "s3_request_duration_seconds_count",
+            operation="PutObject",
+            outcome="success",
+        )
+        errors = sample(
+            "s3_request_duration_seconds_count",
+            operation="GetObject",
+            outcome="error",
+        )
+
+        s3.put_object(Bucket="bucket-de-teste", Key="a.txt", Body=b"a")
+        with pytest.raises(s3.exceptions.NoSuchKey):
+            s3.get_object(Bucket="bucket-de-teste", Key="nao-existe.txt")
+
+    assert sample(
+        "s3_request_duration_seconds_count", operation="PutObject", outcome="success"
+    ) == (ok + 1)
+    assert sample(
+        "s3_request_duration_seconds_count", operation="GetObject", outcome="error"
+    ) == (errors + 1)
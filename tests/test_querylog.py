@@ -0,0 +1,97 @@
+from unittest.mock import Mock
+
+import pytest
+from flask import Response, g
+
+import metrics
+from app import create_app
+from config import TestConfig
+from querylog import statement_shape
+
+
+class QueryLogConfig(TestConfig):
+    QUERY_LOG_ENABLED = True
+    QUERY_LOG_REPEAT_THRESHOLD = 3
+
+
+@pytest.fixture
+def app():
+    return create_app(QueryLogConfig)
+
+
+def test_statement_shape_ignores_literals_and_list_sizes():
+    assert statement_shape(
+        "SELECT * FROM demands WHERE id IN (%s, %s, %s) AND status = 'Em Fila'"
+    ) == statement_shape(
+        "SELECT  *\n FROM demands WHERE id IN (%s, %s) AND status = 'X'"
+    )
+    assert statement_shape(
+        "INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s), (%s, %s)"
+    ) == ("INSERT INTO t (a, b) VALUES (%s, ...), ...")
+    assert statement_shape("SELECT 1 LIMIT 50") == "SELECT ? LIMIT ?"
+
+
+def test_request_profile_flags_repeated_statements_and_explains_slow_ones(app):
+    """
+    Testa que o perfil da requisição marca o formato executado mais de N
+    vezes (N+1), roda EXPLAIN nos statements lentos e injeta o painel.
+    """
+    app.config["QUERY_LOG_SLOW_MS"] = 0  # Todo statement conta como lento
+    raw = Mock()
+    raw.cursor.return_value.fetchall.return_value = [
+        {"id": 1, "type": "ref", "key": "demand_id", "rows": 12}
+    ]
+    conn = metrics.InstrumentedConnection(raw)
+
+    with app.test_request_context("/tracker/log_work", method="POST"):
+        app.preprocess_request()
+        g.mysql_connection = conn
+        cur = conn.cursor()
+        for demand_id in range(1, 5):
+            cur.execute(
+                "UPDATE demands SET executed_hours = executed_hours + %s WHERE id = %s",
+                (1, demand_id),
+            )
+        cur.executemany("INSERT INTO work_logs VALUES (%s)", [(1,), (2,)])
+        response = app.process_response(
+            Response("<html><body></body></html>", mimetype="text/html")
+        )
+        app.do_teardown_request()
+
+    profile = app.extensions["querylog"][-1]
+    assert profile["query_count"] == 5
+    assert profile["repeated"] == [
+        {
+            "shape": "UPDATE demands SET executed_hours = executed_hours + %s "
+            "WHERE id = %s",
+            "count": 4,
+        }
+    ]
+    assert profile["queries"][0]["explain"] == [
+        {"id": 1, "type": "ref", "key": "demand_id", "rows": 12}
+    ]
+    assert profile["queries"][4]["explain"] is None  # executemany: sem EXPLAIN
+    raw.cursor.return_value.execute.assert_any_call(
+        "EXPLAIN UPDATE demands SET executed_hours = executed_hours + %s "
+        "WHERE id = %s",
+        (1, 1),
+    )
+    assert b'id="query-panel"' in response.data
+    assert "possível N+1" in response.get_data(as_text=True)
+
+
+def test_dump_endpoint_lists_flagged_profiles(app):
+    client = app.test_client()
+    client.get("/auth/login")
+
+    all_profiles = client.get("/_debug/queries").get_json()["profiles"]
+    flagged = client.get("/_debug/queries?flagged=1").get_json()["profiles"]
+
+    assert [p["endpoint"] for p in all_profiles] == ["auth.login"]
+    assert flagged == []
+
+
+def test_query_log_is_off_by_default():
+    app = create_app(TestConfig)
+
+    assert app.test_client().get("/_debug/queries").status_code == 404
@@ -1,9 +1,17 @@
-from datetime import datetime
+import io
+import os
+from datetime import date, datetime
+from unittest.mock import Mock, call
+from urllib.parse import quote
 
 import pytest
+from openpyxl import load_workbook
 
+import export_jobs
 from app import create_app
+from blueprints.reports import build_export
 from config import TestConfig
+from pagination import encode_cursor
 
 
 @pytest.fixture
@@ -13,29 +21,65 @@ def client():
         yield client
 
 
+MOCK_SESSIONS = [
+    {
+        "id": 2,
+        "start_time": datetime(2025, 8, 21, 9, 0),
+        "end_time": datetime(2025, 8, 21, 10, 30),
+        "total_minutes": 90,
+    },
+    {
+        "id": 1,
+        "start_time": datetime(2025, 8, 20, 10, 0),
+        "end_time": datetime(2025, 8, 20, 11, 0),
+        "total_minutes": 60,
+    },
+]
+MOCK_ALLOCATIONS = [
+    {
+        "work_session_id": 1,
+        "demand_id": 7,
+        "demand_title": "Demanda A",
+        "minutes_spent": 60,
+        "description": "Fiz X e Y",
+        "status_changed_to": None,
+    },
+    {
+        "work_session_id": 2,
+        "demand_id": 7,
+        "demand_title": "Demanda A",
+        "minutes_spent": 30,
+        "description": "Continuei X",
+        "status_changed_to": None,
+    },
+    {
+        "work_session_id": 2,
+        "demand_id": 8,
+        "demand_title": "Demanda B",
+        "minutes_spent": 60,
+        "description": "Descrição; com ponto e vírgula",
+        "status_changed_to": "Concluída",
+    },
+]
+
+
 def test_reports_page_loads(client, mock_mysql):
     """
     Testa se a página de relatórios carrega com dados mockados.
     """
-    mock_sessions = [
-        {
-            "id": 1,
-            "start_time": datetime(2025, 8, 20, 10, 0),
-            "end_time": datetime(2025, 8, 20, 11, 0),
-            "total_minutes": 60,
-            "demands_worked": "Demanda A",
-            "work_descriptions": "Fiz X e Y",
-        },
+    mock_mysql.connection.cursor.return_value.fetchall.side_effect = [
+        [dict(row) for row in MOCK_SESSIONS],
+        [dict(row) for row in MOCK_ALLOCATIONS],
     ]
-    mock_mysql.connection.cursor.return_value.fetchall.return_value = mock_sessions
 
     response = client.get("/reports/")
     assert response.status_code == 200
     assert (
         b"Relat\xc3\xb3rio de Horas Trabalhadas" in response.data
     )  # Relatório de Horas Trabalhadas
-    assert b"Demanda A" in response.data
+    assert b"Demanda A; Demanda B" in response.data
     assert b"Fiz X e Y" in response.data
+    assert b"Pr\xc3\xb3xima p\xc3\xa1gina" not in response.data
 
 
 def test_reports_page_with_filter(client, mock_mysql):
@@ -52,33 +96,430 @@ def test_reports_page_with_filter(client, mock_mysql):
 
     assert "ws.start_time >= %s" in query
     assert "ws.end_time <= %s" in query
-    assert params == ("2025-08-01", "2025-08-31 23:59:59")
+    # O fim do período também limita start_time, para usar o índice
+    assert "ws.start_time <= %s" in query
+    assert "ORDER BY ws.start_time DESC, ws.id DESC LIMIT %s" in query
+    assert params == (
+        "2025-08-01",
+        "2025-08-31 23:59:59",
+        "2025-08-31 23:59:59",
+        101,
+    )
 
 
-def test_export_report(client, mock_mysql):
+def test_reports_page_paginates_by_cursor(client, mock_mysql):
+    """
+    Testa a paginação por cursor (start_time, id) do relatório.
+    """
+    client.application.config["REPORTS_PAGE_SIZE"] = 1
+    cursor_mock = mock_mysql.connection.cursor.return_value
+    cursor_mock.fetchall.side_effect = [
+        [dict(row) for row in MOCK_SESSIONS],
+        [dict(row) for row in MOCK_ALLOCATIONS if row["work_session_id"] == 2],
+    ]
+
+    response = client.get("/reports/?start_date=2025-08-01")
+
+    assert b"Pr\xc3\xb3xima p\xc3\xa1gina" in response.data
+    next_cursor = encode_cursor(MOCK_SESSIONS[0], ("start_time", "id"))
+    assert quote(next_cursor).encode() in response.data
+
+    # Apenas a sessão da página tem as alocações buscadas
+    query, params = cursor_mock.execute.call_args[0]
+    assert "wl.work_session_id IN (%s)" in query
+    assert params == (2,)
+
+    cursor_mock.fetchall.side_effect = [[], []]
+    client.get(f"/reports/?start_date=2025-08-01&after={next_cursor}")
+    query, params = cursor_mock.execute.call_args[0]
+    assert "(ws.start_time, ws.id) < (%s, %s)" in query
+    assert params == ("2025-08-01", datetime(2025, 8, 21, 9, 0), 2, 2)
+
+
+def test_sessions_json_returns_structured_allocations(client, mock_mysql):
     """
-    Testa a funcionalidade de exportar o relatório para Excel.
+    Testa o endpoint JSON: alocações como listas (sem GROUP_CONCAT), com
+    textos que contêm o antigo separador preservados.
     """
-    mock_data = [
+    mock_mysql.connection.cursor.return_value.fetchall.side_effect = [
+        [dict(row) for row in MOCK_SESSIONS],
+        [dict(row) for row in MOCK_ALLOCATIONS],
+    ]
+
+    response = client.get("/reports/sessions?start_date=2025-08-01")
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["next_cursor"] is None
+    assert [s["id"] for s in data["sessions"]] == [2, 1]
+    assert data["sessions"][0]["start_time"] == "2025-08-21T09:00:00"
+    assert data["sessions"][0]["allocations"] == [
         {
-            "start_time": datetime(2025, 8, 20, 10, 0),
-            "end_time": datetime(2025, 8, 20, 11, 0),
-            "total_minutes": 60,
+            "demand_id": 7,
             "demand_title": "Demanda A",
+            "minutes_spent": 30,
+            "description": "Continuei X",
+            "status_changed_to": None,
+        },
+        {
+            "demand_id": 8,
+            "demand_title": "Demanda B",
             "minutes_spent": 60,
-            "description": "Descrição A",
+            "description": "Descrição; com ponto e vírgula",
+            "status_changed_to": "Concluída",
         },
     ]
-    mock_mysql.connection.cursor.return_value.fetchall.return_value = mock_data
+
+
+def test_sessions_json_rejects_invalid_cursor(client, mock_mysql):
+    response = client.get("/reports/sessions?after=invalido")
+
+    assert response.status_code == 400
+    assert response.get_json()["status"] == "error"
+
+
+EXPORT_ROWS = [
+    (
+        datetime(2025, 8, 20, 10, 0),
+        datetime(2025, 8, 20, 11, 30),
+        90,
+        "Demanda A",
+        60,
+        "Descrição, com vírgula",
+    ),
+    (datetime(2025, 8, 20, 10, 0), datetime(2025, 8, 20, 11, 30), 90, "B", 30, None),
+]
+
+
+def _build_export(client, mock_mysql, export_format, chunks):
+    """Executa build_export como o pool de jobs faria, gravando em memória."""
+    cursor_mock = mock_mysql.connection.cursor.return_value
+    cursor_mock.fetchone.return_value = {"total": sum(len(c) for c in chunks)}
+    # A exportação lê o cursor do servidor em lotes até receber um lote vazio
+    cursor_mock.fetchmany.side_effect = [*chunks, []]
+    job = {
+        "id": "job1",
+        "format": export_format,
+        "start_date": "2025-08-01",
+        "end_date": "2025-08-31",
+    }
+    out = io.BytesIO()
+    progress = Mock()
+    with client.application.app_context():
+        rows = build_export(job, out, progress)
+    return rows, out.getvalue(), progress
+
+
+def test_export_report(client, mock_mysql):
+    """
+    Testa a montagem do relatório em Excel, com o progresso a cada lote.
+    """
+    rows, data, progress = _build_export(
+        client, mock_mysql, "xlsx", [EXPORT_ROWS[:1], EXPORT_ROWS[1:]]
+    )
+
+    assert rows == 2
+    assert progress.call_args_list == [call(0, 2), call(1, 2), call(2, 2)]
+
+    # O arquivo gerado em streaming deve ser uma planilha válida
+    workbook = load_workbook(io.BytesIO(data), read_only=True)
+    sheet_rows = list(workbook["HorasTrabalhadas"].iter_rows(values_only=True))
+    assert sheet_rows[0][0] == "Início da Sessão"
+    assert sheet_rows[1] == (
+        "20/08/2025 10:00",
+        "20/08/2025 11:30",
+        90,
+        "Demanda A",
+        60,
+        "Descrição, com vírgula",
+    )
+    mock_mysql.connection.cursor.return_value.close.assert_called()
+
+
+def test_export_report_as_csv(client, mock_mysql):
+    """
+    Testa a exportação em CSV: nomes de coluna estáveis, datas em ISO 8601
+    e números sem formatação, lote a lote.
+    """
+    rows, data, _ = _build_export(
+        client, mock_mysql, "csv", [EXPORT_ROWS[:1], EXPORT_ROWS[1:]]
+    )
+
+    assert data.decode("utf-8").splitlines() == [
+        "session_start,session_end,session_minutes,demand,demand_minutes,description",
+        '2025-08-20 10:00:00,2025-08-20 11:30:00,90,Demanda A,60,"Descrição, com vírgula"',
+        "2025-08-20 10:00:00,2025-08-20 11:30:00,90,B,30,",
+    ]
+
+
+@pytest.mark.parametrize("export_format", ["parquet", "arrow"])
+def test_export_report_as_typed_columns(client, mock_mysql, export_format):
+    """
+    Testa as exportações colunares: timestamps e inteiros tipados no schema.
+    """
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    _, data, _ = _build_export(client, mock_mysql, export_format, [EXPORT_ROWS])
+
+    if export_format == "parquet":
+        table = pq.read_table(io.BytesIO(data))
+    else:
+        table = pa.ipc.open_stream(io.BytesIO(data)).read_all()
+    # (o Parquet não tem resolução em segundos e grava em milissegundos)
+    assert pa.types.is_timestamp(table.schema.field("session_start").type)
+    assert table.schema.field("demand_minutes").type == pa.int64()
+    assert table.column("demand").to_pylist() == ["Demanda A", "B"]
+    assert table.column("session_end").to_pylist()[0] == datetime(2025, 8, 20, 11, 30)
+
+
+def test_export_without_data_builds_nothing(client, mock_mysql):
+    rows, data, progress = _build_export(client, mock_mysql, "csv", [])
+
+    assert rows == 0
+    assert data == b""
+    mock_mysql.connection.cursor.return_value.fetchmany.assert_not_called()
+
+
+def test_export_report_rejects_unknown_format(client, mock_mysql):
+    response = client.post("/reports/export", data={"format": "pdf"})
+
+    assert response.status_code == 302
+    mock_mysql.connection.cursor.return_value.execute.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "period",
+    [{"start_date": "2025-02-30"}, {"end_date": "31/08/2025"}],
+)
+def test_export_report_rejects_invalid_dates(client, mock_mysql, period):
+    """
+    Testa que datas inválidas são recusadas antes de registrar o job.
+    """
+    response = client.post("/reports/export", data={"format": "csv", **period})
+    assert response.status_code == 302
+
+    response = client.post(
+        "/reports/export",
+        data={"format": "csv", **period},
+        headers={"Accept": "application/json"},
+    )
+    assert response.status_code == 400
+    assert response.get_json()["status"] == "error"
+    mock_mysql.connection.cursor.return_value.execute.assert_not_called()
+
+
+@pytest.fixture
+def s3_bucket(client):
+    """S3 local (moto) com um bucket de testes."""
+    moto = pytest.importorskip("moto")
+    import boto3
+
+    with moto.mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="bucket-de-teste")
+        client.application.extensions["s3_client"] = s3
+        client.application.config.update(S3_BUCKET="bucket-de-teste")
+        yield s3
+
+
+def _job_updates(mock_mysql):
+    # Estado e progresso são gravados em uma conexão própria do pool
+    conn = mock_mysql.pool.checkout.return_value
+    return [c[0] for c in conn.cursor.return_value.execute.call_args_list]
+
+
+def test_export_report_runs_job_and_uploads_artifact(client, mock_mysql, s3_bucket):
+    """
+    Testa que a exportação vira um job: registrado no banco, montado pelo
+    pool (aqui na própria chamada, EXPORT_JOB_WORKERS = 0) e enviado ao S3.
+    """
+    cursor_mock = mock_mysql.connection.cursor.return_value
+    # Nenhum job reaproveitável; depois, o COUNT(*) da exportação
+    cursor_mock.fetchone.side_effect = [None, {"total": 2}]
+    cursor_mock.fetchmany.side_effect = [EXPORT_ROWS, []]
+
+    response = client.post(
+        "/reports/export",
+        data={"start_date": "2025-08-01", "end_date": "2025-08-31", "format": "csv"},
+    )
+
+    assert response.status_code == 302
+    job_id = response.headers["Location"].rsplit("/", 1)[1]
+    insert = next(
+        c[0] for c in cursor_mock.execute.call_args_list if "INSERT" in c[0][0]
+    )
+    assert insert[1][0] == job_id
+    assert insert[1][2:] == ("csv", "2025-08-01", "2025-08-31", "queued")
+    mock_mysql.connection.commit.assert_called()
+
+    key = export_jobs.artifact_key(insert[1][1], "csv")
+    body = s3_bucket.get_object(Bucket="bucket-de-teste", Key=key)["Body"].read()
+    assert body.decode("utf-8").count("\n") == 3
+
+    updates = _job_updates(mock_mysql)
+    assert updates[0] == (
+        "UPDATE export_jobs SET status = %s WHERE id = %s",
+        ("running", job_id),
+    )
+    assert updates[-1][1] == ("done", 2, 2, key, job_id)
+
+
+def test_export_without_s3_is_stored_and_served_locally(client, mock_mysql, tmp_path):
+    """
+    Testa que, sem S3_BUCKET, o arquivo pronto fica em EXPORT_LOCAL_DIR e o
+    download é servido pelo próprio app.
+    """
+    client.application.config.update(S3_BUCKET=None, EXPORT_LOCAL_DIR=str(tmp_path))
+    cursor_mock = mock_mysql.connection.cursor.return_value
+    cursor_mock.fetchone.side_effect = [None, {"total": 2}]
+    cursor_mock.fetchmany.side_effect = [EXPORT_ROWS, []]
+
+    response = client.post(
+        "/reports/export", data={"start_date": "2025-08-01", "format": "csv"}
+    )
+    assert response.status_code == 302
+    job_id = response.headers["Location"].rsplit("/", 1)[1]
+    key = _job_updates(mock_mysql)[-1][1][3]
+    assert _job_updates(mock_mysql)[-1][1][0] == "done"
+    assert (tmp_path / os.path.basename(key)).read_bytes().count(b"\n") == 3
+
+    cursor_mock.fetchone.side_effect = None
+    cursor_mock.fetchone.return_value = {
+        "id": job_id,
+        "format": "csv",
+        "start_date": date(2025, 8, 1),
+        "end_date": None,
+        "status": "done",
+        "artifact_key": key,
+    }
+    response = client.get(f"/reports/exports/{job_id}/download")
+    assert response.status_code == 200
+    assert response.data.count(b"\n") == 3
+    assert "Relatorio_Horas_20250801.csv" in response.headers["Content-Disposition"]
+
+
+def test_export_report_reuses_equivalent_job(client, mock_mysql):
+    """
+    Testa que a mesma exportação, com os dados na mesma versão, reaproveita
+    o job existente sem consultar o relatório de novo.
+    """
+    cursor_mock = mock_mysql.connection.cursor.return_value
+    cursor_mock.fetchall.return_value = [
+        {"name": "demands", "version": 3},
+        {"name": "work_logs", "version": 5},
+    ]
+    cursor_mock.fetchone.return_value = {"id": "abc123", "status": "done"}
 
     response = client.post(
-        "/reports/export", data={"start_date": "2025-08-01", "end_date": "2025-08-31"}
+        "/reports/export",
+        data={"start_date": "2025-08-01", "format": "xlsx"},
+        headers={"Accept": "application/json"},
+    )
+
+    assert response.status_code == 202
+    assert response.get_json()["job_id"] == "abc123"
+    assert response.get_json()["reused"] is True
+    query, params = cursor_mock.execute.call_args[0]
+    assert "FROM export_jobs" in query
+    assert params[0] == export_jobs.cache_key("2025-08-01", None, "xlsx", "3-5")
+    cursor_mock.fetchmany.assert_not_called()
+    mock_mysql.pool.checkout.assert_not_called()
+
+
+def test_export_status_and_download(client, mock_mysql, s3_bucket):
+    cursor_mock = mock_mysql.connection.cursor.return_value
+    cursor_mock.fetchone.return_value = {
+        "id": "abc123",
+        "cache_key": "k",
+        "format": "csv",
+        "start_date": date(2025, 8, 1),
+        "end_date": None,
+        "status": "done",
+        "rows_done": 40,
+        "rows_total": 40,
+        "artifact_key": "exports/k.csv",
+        "error": None,
+        "created_at": datetime(2025, 8, 31, 9, 0),
+        "updated_at": datetime(2025, 8, 31, 9, 1),
+    }
+
+    status = client.get("/reports/exports/abc123/status").get_json()
+    assert status["progress"] == 100
+    assert status["download_url"] == "/reports/exports/abc123/download"
+
+    page = client.get("/reports/exports/abc123")
+    assert "Relatorio_Horas_20250801.csv" in page.get_data(as_text=True)
+
+    response = client.get("/reports/exports/abc123/download")
+    assert response.status_code == 302
+    assert "exports/k.csv" in response.headers["Location"]
+    assert "Relatorio_Horas_20250801.csv" in response.headers["Location"]
+    assert (
+        "filename%3D%22Relatorio_Horas_20250801.csv%22" in response.headers["Location"]
     )
 
+    cursor_mock.fetchone.return_value = None
+    assert client.get("/reports/exports/nao-existe/status").status_code == 404
+
+
+def test_reports_summary_reads_from_rollups(client, mock_mysql):
+    """
+    Testa a página de resumo, que lê os totais das tabelas diárias.
+    """
+    cursor_mock = mock_mysql.connection.cursor.return_value
+    cursor_mock.fetchone.return_value = {"session_count": 3, "total_minutes": 150}
+    cursor_mock.fetchall.side_effect = [
+        [
+            {
+                "id": 1,
+                "title": "Demanda A",
+                "status": "Em Execução",
+                "minutes": 120,
+                "log_count": 2,
+                "last_day": date(2025, 8, 20),
+            }
+        ],
+        [{"day": date(2025, 8, 20), "session_count": 3, "total_minutes": 150}],
+    ]
+
+    response = client.get("/reports/summary?start_date=2025-08-01")
+
     assert response.status_code == 200
+    assert b"Demanda A" in response.data
+    assert b"2.00h" in response.data
+    assert b"2.50h" in response.data
+
+    queries = [c[0][0] for c in cursor_mock.execute.call_args_list]
+    assert all("work_logs" not in query for query in queries)
+    assert cursor_mock.execute.call_args_list[1][0][1] == ("2025-08-01",)
+
+
+def test_rollups_rebuild_command(client, mock_mysql):
+    """
+    Testa o comando que reconstrói os totais diários de um período.
+    """
+    runner = client.application.test_cli_runner()
+
+    result = runner.invoke(
+        args=[
+            "rollups",
+            "rebuild",
+            "--start-date",
+            "2025-08-01",
+            "--end-date",
+            "2025-08-31",
+        ]
+    )
+
+    assert result.exit_code == 0, result.output
+    cursor_mock = mock_mysql.connection.cursor.return_value
+    delete_query, params = cursor_mock.execute.call_args_list[0][0]
     assert (
-        response.mimetype
-        == "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        delete_query == "DELETE FROM daily_demand_minutes WHERE day >= %s AND day <= %s"
     )
-    assert "attachment" in response.headers["Content-Disposition"]
-    assert ".xlsx" in response.headers["Content-Disposition"]
+    assert params == (date(2025, 8, 1), date(2025, 8, 31))
+    insert_query, params = cursor_mock.execute.call_args_list[2][0]
+    assert "ws.start_time < %s" in insert_query
+    assert params == (date(2025, 8, 1), date(2025, 9, 1))
+    mock_mysql.connection.commit.assert_called_once()
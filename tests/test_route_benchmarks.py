@@ -0,0 +1,91 @@
+import os
+from unittest.mock import Mock
+
+import pytest
+
+import metrics
+from app import create_app
+from benchmarks import concurrency, routes
+from config import TestConfig
+
+
+@pytest.fixture
+def client():
+    app = create_app(TestConfig)
+    with app.test_client() as client:
+        yield client
+
+
+def test_every_route_is_benchmarked(client):
+    """
+    Testa que toda rota dos blueprints tem um cenário no benchmark (ou está
+    explicitamente fora dele).
+    """
+    endpoints = {rule.endpoint for rule in client.application.url_map.iter_rules()}
+    measured = {name.split("[")[0] for name in routes.ROUTES}
+
+    assert endpoints - routes.UNMEASURED <= measured
+
+
+def test_percentile_interpolates_between_samples():
+    samples = [10, 20, 30, 40, 50]
+
+    assert routes.percentile(samples, 50) == 30
+    assert routes.percentile(samples, 95) == pytest.approx(48)
+    assert routes.percentile([7], 99) == 7
+
+
+def test_query_counter_counts_every_statement():
+    """
+    Testa que execute e executemany de qualquer cursor da conexão entram
+    na contagem de queries.
+    """
+    counter = routes.QueryCounter()
+    conn = metrics.InstrumentedConnection(Mock(), on_query=counter.record)
+
+    cur = conn.cursor()
+    cur.execute("SELECT 1")
+    cur.executemany("INSERT INTO t VALUES (%s)", [(1,), (2,)])
+    conn.cursor().execute("SELECT 2")
+
+    assert counter.count == 3
+
+
+def test_compare_flags_slower_routes_and_extra_queries():
+    baseline = {
+        "a": {"p95_ms": 10.0, "queries": 2},
+        "b": {"p95_ms": 10.0, "queries": 2},
+        "c": {"p95_ms": 10.0, "queries": 2},
+    }
+    results = {
+        "a": {"p95_ms": 10.5, "queries": 2},  # Dentro da tolerância
+        "b": {"p95_ms": 20.0, "queries": 2},  # Mais lenta
+        "c": {"p95_ms": 10.0, "queries": 3},  # Query a mais
+        "nova": {"p95_ms": 99.0, "queries": 9},  # Sem referência
+    }
+
+    regressions = routes.compare(results, baseline)
+
+    assert len(regressions) == 2
+    assert regressions[0].startswith("b:")
+    assert regressions[1].startswith("c:")
+
+
+def test_concurrency_load_uses_read_only_routes():
+    """
+    Testa que a carga do benchmark de workers só usa rotas GET existentes.
+    """
+    ctx = {
+        "hot_demand_id": 1,
+        "history_cursor": "x",
+        "month_start": "2025-01-01",
+        "year_start": "2024-01-01",
+        "last_day": "2025-02-01",
+    }
+    for name in concurrency.LOAD_ROUTES:
+        method, _, kwargs = routes.ROUTES[name](ctx, 0)
+        assert method == "GET" and kwargs == {}
+
+
+def test_concurrency_measures_process_tree_rss():
+    assert concurrency._rss_mb(os.getpid()) > 0
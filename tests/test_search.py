@@ -0,0 +1,116 @@
+import pytest
+
+import search
+from app import create_app
+from config import TestConfig
+
+
+@pytest.fixture
+def client():
+    app = create_app(TestConfig)
+    with app.test_client() as client:
+        yield client
+
+
+def test_terms_drop_short_words_and_operators():
+    """
+    Testa que operadores do modo booleano e palavras curtas demais para o
+    índice FULLTEXT são descartados.
+    """
+    assert search.terms('Revisão de +código* "Código" -db') == ["revisão", "código"]
+    assert search.boolean_query(["revisão", "código"]) == "+revisão* +código*"
+    assert search.terms("de a") == []
+
+
+def test_snippet_highlights_terms_and_escapes_html():
+    """
+    Testa o trecho destacado: HTML escapado, termos (por prefixo) em <mark>
+    e reticências quando o texto é cortado.
+    """
+    text = "x " * 100 + "Corrigido <script> no relatório de horas " + "y " * 100
+    result = search.snippet(text, ["relat"], width=60)
+    assert "<mark>relatório</mark>" in result
+    assert "&lt;script&gt;" in result
+    assert result.startswith("…") and result.endswith("…")
+    assert search.snippet("Sem relação", ["deploy"]) is None
+
+
+def test_search_page_ranks_demands_and_work_log_notes(client, mock_mysql):
+    """
+    Testa que a relevância soma a nota da demanda com a da melhor anotação
+    e que demandas encontradas só pelas anotações também aparecem.
+    """
+    cursor_mock = mock_mysql.connection.cursor.return_value
+    cursor_mock.fetchall.side_effect = [
+        # Demandas (título/descrição)
+        [
+            {
+                "id": 1,
+                "title": "Relatório mensal",
+                "description": "Gerar o relatório de horas",
+                "status": "Em Fila",
+                "score": 1.5,
+            }
+        ],
+        # Anotações de trabalho, da mais relevante para a menos
+        [
+            {"demand_id": 2, "description": "Ajuste no relatório", "score": 2.0},
+            {"demand_id": 1, "description": "Relatório revisado", "score": 1.0},
+            {"demand_id": 2, "description": "Outro relatório", "score": 0.5},
+        ],
+        # Demandas encontradas só pelas anotações
+        [
+            {
+                "id": 2,
+                "title": "Ajustes de layout",
+                "description": None,
+                "status": "Concluída",
+                "score": 0,
+            }
+        ],
+    ]
+
+    response = client.get("/demands/search?q=relatório&format=json")
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [r["id"] for r in results] == [1, 2]
+    assert results[0]["score"] == 2.5
+    assert results[0]["title_html"] == "<mark>Relatório</mark> mensal"
+    assert results[0]["note_html"] == "<mark>Relatório</mark> revisado"
+    assert results[1]["description_html"] is None
+    assert results[1]["note_html"] == "Ajuste no <mark>relatório</mark>"
+
+    demands_call, logs_call, missing_call = cursor_mock.execute.call_args_list
+    assert "MATCH (title, description) AGAINST (%s IN BOOLEAN MODE)" in (
+        demands_call[0][0]
+    )
+    assert demands_call[0][1] == ("+relatório*", "+relatório*", 50)
+    assert "MATCH (wl.description)" in logs_call[0][0]
+    assert missing_call[0][1] == (2,)
+
+
+def test_search_page_renders_highlights(client, mock_mysql):
+    """
+    Testa a página HTML de resultados e a mensagem para buscas curtas demais.
+    """
+    cursor_mock = mock_mysql.connection.cursor.return_value
+    cursor_mock.fetchall.side_effect = [
+        [
+            {
+                "id": 5,
+                "title": "Deploy do servidor",
+                "description": "",
+                "status": "Em Execução",
+                "score": 1.0,
+            }
+        ],
+        [],
+    ]
+    response = client.get("/demands/search?q=deploy")
+    assert response.status_code == 200
+    assert "<mark>Deploy</mark> do servidor" in response.get_data(as_text=True)
+
+    response = client.get("/demands/search?q=de")
+    assert response.status_code == 200
+    assert "pelo menos 3 letras" in response.get_data(as_text=True)
+    assert cursor_mock.execute.call_count == 2
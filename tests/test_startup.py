@@ -0,0 +1,32 @@
+import pytest
+
+from benchmarks import startup
+
+
+@pytest.mark.slow
+def test_cold_start_within_budget():
+    """
+    Testa que importar o app e executar create_app() em um processo novo
+    fica dentro do orçamento de tempo e memória, sem carregar dependências
+    pesadas (boto3/botocore só devem ser importados no primeiro uso).
+    """
+    result = startup.measure(runs=3)
+
+    assert result["heavy_modules"] == []
+    assert startup.check_budget(result) == []
+
+
+def test_check_budget_reports_violations():
+    """
+    Testa que cada violação do orçamento gera uma mensagem.
+    """
+    result = {
+        "total_seconds": startup.BUDGET_SECONDS + 1,
+        "peak_rss_mb": startup.BUDGET_RSS_MB + 1,
+        "heavy_modules": ["boto3"],
+    }
+
+    problems = startup.check_budget(result)
+
+    assert len(problems) == 3
+    assert "boto3" in problems[2]
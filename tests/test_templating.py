@@ -0,0 +1,138 @@
+import os
+from datetime import datetime
+
+import pytest
+from flask import render_template_string
+
+from app import create_app
+from benchmarks import templates as template_benchmarks
+from config import TestConfig
+
+
+@pytest.fixture
+def app(tmp_path):
+    class FragmentConfig(TestConfig):
+        FRAGMENT_CACHE_ENABLED = True
+        TEMPLATE_BYTECODE_CACHE_DIR = str(tmp_path / "jinja")
+
+    return create_app(FragmentConfig)
+
+
+FRAGMENT = "{% cache 'contador', key %}{{ render() }}{% endcache %}"
+
+
+def _renderer():
+    calls = []
+
+    def render():
+        calls.append(1)
+        return f"<b>{len(calls)}</b>"
+
+    return render, calls
+
+
+def test_fragment_is_reused_until_key_changes(app):
+    render, calls = _renderer()
+    with app.test_request_context():
+        first = render_template_string(FRAGMENT, key=1, render=render)
+        second = render_template_string(FRAGMENT, key=1, render=render)
+        changed = render_template_string(FRAGMENT, key=2, render=render)
+
+    assert first == second == "&lt;b&gt;1&lt;/b&gt;"
+    assert changed == "&lt;b&gt;2&lt;/b&gt;"
+    assert len(calls) == 2
+
+
+def test_disabled_fragment_cache_skips_key():
+    """
+    Testa que, com o cache de trechos desligado, o bloco é sempre renderizado
+    e a chave nem é avaliada (data_version não consulta o banco).
+    """
+    app = create_app(TestConfig)
+    render, calls = _renderer()
+    key_calls = []
+
+    def key():
+        key_calls.append(1)
+        return 1
+
+    with app.test_request_context():
+        for _ in range(2):
+            render_template_string(
+                "{% cache 'x', key() %}{{ render() }}{% endcache %}",
+                key=key,
+                render=render,
+            )
+
+    assert len(calls) == 2
+    assert key_calls == []
+
+
+def test_data_version_reads_versions_once_per_request(app, mock_mysql):
+    cursor = mock_mysql.connection.cursor.return_value
+    cursor.fetchall.return_value = [{"name": "demands", "version": 7}]
+
+    with app.test_request_context():
+        rendered = render_template_string(
+            "{{ data_version('demands') }}/{{ data_version('demands') }}"
+        )
+
+    assert rendered == "7/7"
+    assert cursor.execute.call_count == 1
+
+
+def test_bytecode_cache_is_written_and_warmed(app, tmp_path):
+    result = app.test_cli_runner().invoke(args=["templates", "warm"])
+
+    assert result.exit_code == 0
+    assert "templates compilados" in result.output
+    assert os.listdir(tmp_path / "jinja")
+
+
+def test_render_benchmark_measures_first_and_steady_renders(tmp_path):
+    class BenchTestConfig(TestConfig):
+        TEMPLATE_BYTECODE_CACHE_DIR = str(tmp_path)
+
+    first, rest = template_benchmarks.measure_page(
+        BenchTestConfig,
+        template_benchmarks.ROUTES["auth.login"],
+        ctx={},
+        iterations=3,
+    )
+
+    assert first > 0
+    assert len(rest) == 3
+    assert set(template_benchmarks.PAGES) <= set(template_benchmarks.ROUTES)
+
+
+def test_pages_render_with_fragment_cache(app, mock_mysql):
+    """
+    Testa que o layout e a lista do painel, vindos do cache de trechos,
+    continuam na página.
+    """
+    cursor = mock_mysql.connection.cursor.return_value
+    demands = [
+        {
+            "id": 1,
+            "title": "Demanda em cache",
+            "status": "Em Fila",
+            "created_at": datetime(2025, 8, 1),
+            "priority": 0,
+            "executed_hours": 1,
+            "estimated_hours": 2,
+        }
+    ]
+    cursor.fetchall.side_effect = lambda: (
+        [{"name": "demands", "version": 3}]
+        if "data_versions" in cursor.execute.call_args[0][0]
+        else demands
+    )
+
+    with app.test_client() as client:
+        first = client.get("/demands/")
+        second = client.get("/demands/")
+
+    assert first.status_code == second.status_code == 200
+    assert first.data == second.data
+    assert b"Demanda em cache" in second.data
+    assert b"DEMAND TRACKER" in second.data
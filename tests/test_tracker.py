@@ -5,6 +5,7 @@ import pytest
 
 from app import create_app
 from config import TestConfig
+from extensions import cache
 
 
 @pytest.fixture
@@ -73,28 +74,39 @@ def test_log_work_success(client, mock_mysql):
 
     # Verifica a inserção na tabela work_sessions
     cursor_mock.execute.assert_any_call(
-        "INSERT INTO work_sessions (start_time, end_time, total_minutes) VALUES (%s, %s, %s)",
-        (start_time, end_time, 60),
+        "INSERT INTO work_sessions (start_time, end_time, total_minutes, client_uuid) "
+        "VALUES (%s, %s, %s, %s)",
+        (start_time, end_time, 60, None),
     )
 
-    # Verifica as inserções na tabela work_logs
-    cursor_mock.execute.assert_any_call(
+    # Verifica que todas as alocações foram inseridas em um único executemany
+    cursor_mock.executemany.assert_called_once_with(
         "INSERT INTO work_logs (work_session_id, demand_id, minutes_spent, description, status_changed_to) VALUES (%s, %s, %s, %s, %s)",
-        (99, "1", 40, "Trabalhei na demanda 1", "Concluída"),
-    )
-    cursor_mock.execute.assert_any_call(
-        "INSERT INTO work_logs (work_session_id, demand_id, minutes_spent, description, status_changed_to) VALUES (%s, %s, %s, %s, %s)",
-        (99, "2", 20, "Trabalhei na demanda 2", None),
+        [
+            (99, 1, 40, "Trabalhei na demanda 1", "Concluída"),
+            (99, 2, 20, "Trabalhei na demanda 2", None),
+        ],
     )
 
-    # Verifica os updates na tabela demands
-    hours_spent_1 = 40.0 / 60.0
+    # Verifica que horas e status das demandas são atualizados em um único UPDATE
     cursor_mock.execute.assert_any_call(
-        "UPDATE demands SET executed_hours = executed_hours + %s WHERE id = %s",
-        (hours_spent_1, "1"),
+        "UPDATE demands SET executed_hours = executed_hours + CASE id "
+        "WHEN %s THEN %s WHEN %s THEN %s END, "
+        "status = CASE id WHEN %s THEN %s ELSE status END WHERE id IN (%s, %s)",
+        (1, 40.0 / 60.0, 2, 20.0 / 60.0, 1, "Concluída", 1, 2),
     )
-    cursor_mock.execute.assert_any_call(
-        "UPDATE demands SET status = %s WHERE id = %s", ("Concluída", "1")
+    # Sessão, UPDATE agregado, evento de status, os dois incrementos dos
+    # totais diários e as versões dos dados
+    assert cursor_mock.execute.call_count == 6
+    assert cursor_mock.execute.call_args_list[2][0] == (
+        "INSERT INTO demand_events (kind, payload) VALUES (%s, %s)",
+        ("status", '{"demands":[{"id":1,"status":"Concluída"}]}'),
+    )
+    assert "daily_demand_minutes" in cursor_mock.execute.call_args_list[3][0][0]
+    assert cursor_mock.execute.call_args_list[5][0] == (
+        "INSERT INTO data_versions (name, version) VALUES (%s, 1), (%s, 1) "
+        "ON DUPLICATE KEY UPDATE version = version + 1",
+        ("demands", "work_logs"),
     )
 
     mock_mysql.connection.commit.assert_called_once()
@@ -117,3 +129,193 @@ def test_log_work_incomplete_data(client):
     json_data = response.get_json()
     assert json_data["status"] == "error"
     assert json_data["message"] == "Dados incompletos."
+
+
+def test_log_work_bulk_syncs_sessions_in_one_transaction(client, mock_mysql):
+    """
+    Testa a sincronização em lote: várias sessões, um executemany para os
+    logs e um UPDATE agregado por demanda, tudo em um único commit.
+    """
+    start_time = datetime(2025, 8, 20, 9, 0)
+    sessions = [
+        {
+            "start_time": start_time.isoformat(),
+            "end_time": (start_time + timedelta(minutes=30)).isoformat(),
+            "total_minutes": 30,
+            "allocations": [
+                {"demand_id": "1", "minutes_spent": 30, "description": "Manhã"},
+            ],
+        },
+        {
+            "start_time": (start_time + timedelta(hours=4)).isoformat() + "Z",
+            "end_time": (start_time + timedelta(hours=5)).isoformat() + "Z",
+            "total_minutes": 60,
+            "allocations": [
+                {
+                    "demand_id": 1,
+                    "minutes_spent": 60,
+                    "description": "Tarde",
+                    "new_status": "Concluída",
+                },
+            ],
+        },
+    ]
+    cursor_mock = mock_mysql.connection.cursor.return_value
+    cursor_mock.lastrowid = 10
+
+    response = client.post("/tracker/log_work/bulk", json={"sessions": sessions})
+
+    assert response.status_code == 201
+    json_data = response.get_json()
+    assert json_data["status"] == "success"
+    assert json_data["session_ids"] == [10, 10]
+
+    logged_rows = cursor_mock.executemany.call_args[0][1]
+    assert [row[3] for row in logged_rows] == ["Manhã", "Tarde"]
+
+    # Os minutos da mesma demanda ("1" e 1) são somados antes do UPDATE
+    cursor_mock.execute.assert_any_call(
+        "UPDATE demands SET executed_hours = executed_hours + CASE id "
+        "WHEN %s THEN %s END, "
+        "status = CASE id WHEN %s THEN %s ELSE status END WHERE id IN (%s)",
+        (1, 1.5, 1, "Concluída", 1),
+    )
+    mock_mysql.connection.commit.assert_called_once()
+
+
+def test_log_work_bulk_skips_sessions_already_stored(client, mock_mysql):
+    """
+    Testa que uma sessão reenviada pela fila offline (mesmo session_uuid) não
+    é gravada de novo, e que só as novas somam horas.
+    """
+    stored_uuid = "0b7c6a5e-3f1d-4c2b-9a8e-1d2c3b4a5f60"
+    new_uuid = "5f4e3d2c-1b0a-4987-8654-3210fedcba98"
+
+    def session(session_uuid, description):
+        return {
+            "session_uuid": session_uuid,
+            "start_time": "2025-08-20T09:00:00Z",
+            "end_time": "2025-08-20T10:00:00Z",
+            "total_minutes": 60,
+            "allocations": [
+                {"demand_id": 1, "minutes_spent": 60, "description": description}
+            ],
+        }
+
+    cursor_mock = mock_mysql.connection.cursor.return_value
+    cursor_mock.fetchall.return_value = [(stored_uuid, 5)]
+    cursor_mock.lastrowid = 10
+
+    response = client.post(
+        "/tracker/log_work/bulk",
+        json={"sessions": [session(stored_uuid, "Antiga"), session(new_uuid, "Nova")]},
+    )
+
+    assert response.status_code == 201
+    assert response.get_json()["session_ids"] == [5, 10]
+    query, params = cursor_mock.execute.call_args_list[0][0]
+    assert "WHERE client_uuid IN (%s, %s)" in query
+    assert sorted(params) == sorted([stored_uuid, new_uuid])
+    logged_rows = cursor_mock.executemany.call_args[0][1]
+    assert [row[3] for row in logged_rows] == ["Nova"]
+
+    # Reenvio do lote inteiro: nada é gravado de novo
+    cursor_mock.reset_mock()
+    cursor_mock.fetchall.return_value = [(stored_uuid, 5), (new_uuid, 10)]
+    response = client.post(
+        "/tracker/log_work/bulk",
+        json={"sessions": [session(stored_uuid, "Antiga"), session(new_uuid, "Nova")]},
+    )
+    assert response.status_code == 201
+    assert response.get_json()["session_ids"] == [5, 10]
+    assert cursor_mock.execute.call_count == 1
+    cursor_mock.executemany.assert_not_called()
+
+
+def test_log_work_bulk_rejects_invalid_session(client, mock_mysql):
+    """
+    Testa que uma sessão inválida rejeita o lote inteiro sem gravar nada.
+    """
+    payload = {
+        "sessions": [
+            {
+                "start_time": datetime.utcnow().isoformat(),
+                "end_time": datetime.utcnow().isoformat(),
+                "total_minutes": 10,
+                "allocations": [{"demand_id": "1", "minutes_spent": 10}],
+            }
+        ]
+    }
+
+    response = client.post("/tracker/log_work/bulk", json=payload)
+
+    assert response.status_code == 400
+    assert response.get_json()["message"].startswith("Sessão 0:")
+    assert response.get_json()["index"] == 0
+    mock_mysql.connection.cursor.return_value.execute.assert_not_called()
+    mock_mysql.connection.commit.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        {"allocations": "abc"},
+        {"allocations": ["x"]},
+        {"start_time": 1700000000},
+        {"end_time": ["2025-08-01T10:00:00"]},
+        {"allocations": [{"demand_id": "abc", "minutes_spent": 5, "description": "x"}]},
+        {"allocations": [{"demand_id": [1], "minutes_spent": 5, "description": "x"}]},
+        {"session_uuid": "nao-e-uuid"},
+        {"session_uuid": 12},
+    ],
+)
+def test_log_work_rejects_malformed_payload(client, mock_mysql, changes):
+    """
+    Testa que tipos inesperados no payload respondem 400 em vez de erro 500.
+    """
+    payload = {
+        "start_time": "2025-08-01T09:00:00Z",
+        "end_time": "2025-08-01T10:00:00Z",
+        "total_minutes": 60,
+        "allocations": [{"demand_id": "1", "minutes_spent": 60, "description": "x"}],
+    }
+    payload.update(changes)
+
+    response = client.post("/tracker/log_work", json=payload)
+    assert response.status_code == 400
+    assert response.get_json()["status"] == "error"
+
+    response = client.post("/tracker/log_work/bulk", json={"sessions": [payload]})
+    assert response.status_code == 400
+    assert response.get_json()["message"].startswith("Sessão 0:")
+    mock_mysql.connection.commit.assert_not_called()
+
+
+def test_tracker_queue_is_cached_until_log_work(client, mock_mysql, tmp_path):
+    """
+    Testa que a fila ativa vem do cache e é invalidada após registrar trabalho.
+    """
+    app = client.application
+    app.config.update(CACHE_BACKEND="local", CACHE_VERSION_DIR=str(tmp_path))
+    cache.init_app(app)
+
+    cursor_mock = mock_mysql.connection.cursor.return_value
+    cursor_mock.fetchall.return_value = [{"id": 1, "title": "Demanda em Cache"}]
+
+    assert b"Demanda em Cache" in client.get("/tracker/").data
+    assert b"Demanda em Cache" in client.get("/tracker/").data
+    assert cursor_mock.execute.call_count == 1  # segunda leitura veio do cache
+
+    payload = {
+        "start_time": datetime(2025, 8, 20, 9, 0).isoformat(),
+        "end_time": datetime(2025, 8, 20, 10, 0).isoformat(),
+        "total_minutes": 60,
+        "allocations": [
+            {"demand_id": "1", "minutes_spent": 60, "description": "Trabalho"}
+        ],
+    }
+    assert client.post("/tracker/log_work", json=payload).status_code == 201
+
+    cursor_mock.execute.reset_mock()
+    client.get("/tracker/")
+    assert cursor_mock.execute.call_count == 1  # versão mudou: consulta o banco
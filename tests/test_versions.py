@@ -0,0 +1,85 @@
+import pytest
+
+from app import create_app
+from config import TestConfig
+
+
+class ConditionalConfig(TestConfig):
+    CONDITIONAL_GET_ENABLED = True
+    APP_RELEASE = "r1"
+
+
+@pytest.fixture
+def client():
+    app = create_app(ConditionalConfig)
+    with app.test_client() as client:
+        yield client
+
+
+def versions_row(version):
+    return [{"name": "demands", "version": version}]
+
+
+def test_dashboard_sends_etag_from_data_version(client, mock_mysql):
+    cursor_mock = mock_mysql.connection.cursor.return_value
+    cursor_mock.fetchall.side_effect = [versions_row(7), []]
+
+    response = client.get("/demands/")
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] == 'W/"r1-7"'
+    assert response.headers["Cache-Control"] == "private, no-cache"
+
+
+def test_matching_etag_returns_304_without_page_queries(client, mock_mysql):
+    """
+    Testa que, com a versão dos dados inalterada, a resposta é um 304 feito
+    apenas com a leitura dos contadores (sem as consultas da página).
+    """
+    cursor_mock = mock_mysql.connection.cursor.return_value
+    cursor_mock.fetchall.side_effect = [versions_row(7)]
+
+    response = client.get("/demands/", headers={"If-None-Match": 'W/"r1-7"'})
+
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == 'W/"r1-7"'
+    assert cursor_mock.execute.call_count == 1
+    assert "data_versions" in cursor_mock.execute.call_args[0][0]
+
+
+def test_changed_data_version_renders_page(client, mock_mysql):
+    cursor_mock = mock_mysql.connection.cursor.return_value
+    cursor_mock.fetchall.side_effect = [versions_row(8), []]
+
+    response = client.get("/demands/", headers={"If-None-Match": 'W/"r1-7"'})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] == 'W/"r1-8"'
+
+
+def test_detail_depends_on_demands_and_work_logs(client, mock_mysql):
+    cursor_mock = mock_mysql.connection.cursor.return_value
+    cursor_mock.fetchall.side_effect = [
+        [{"name": "demands", "version": 3}, {"name": "work_logs", "version": 5}]
+    ]
+
+    response = client.get("/demands/1", headers={"If-None-Match": 'W/"r1-3-5"'})
+
+    assert response.status_code == 304
+    assert cursor_mock.execute.call_args[0][1] == ("demands", "work_logs")
+
+
+def test_pending_flash_messages_skip_conditional_get(client, mock_mysql):
+    """
+    Testa que uma mensagem flash pendente força a renderização da página,
+    mesmo com o ETag atual.
+    """
+    with client.session_transaction() as session:
+        session["_flashes"] = [("info", "Mensagem pendente")]
+
+    response = client.get("/demands/", headers={"If-None-Match": 'W/"r1-0"'})
+
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+    assert "Mensagem pendente" in response.get_data(as_text=True)
@@ -0,0 +1,104 @@
+# versions.py
+# Contadores de versão dos dados (tabela data_versions) e GET condicional.
+#
+# Cada escrita incrementa, na mesma transação, o contador dos dados que
+# alterou. As páginas usam esses contadores como ETag: se o navegador já tem
+# a versão atual (If-None-Match), a resposta é um 304 feito com uma única
+# leitura por chave primária, sem as consultas da página nem o template.
+#
+# Os contadores ficam no banco (e não no cache local) para valerem entre
+# workers, hosts e reinícios.
+import functools
+import hashlib
+import os
+
+import MySQLdb.cursors
+from flask import current_app, g, make_response, request, session
+
+import extensions
+
+DEMANDS = "demands"  # demandas, prioridades, status, horas e anexos
+WORK_LOGS = "work_logs"  # sessões de trabalho e totais diários
+
+
+def bump(cur, *names):
+    """Incrementa os contadores; chamar antes do commit da escrita."""
+    cur.execute(
+        "INSERT INTO data_versions (name, version) VALUES "
+        + ", ".join(["(%s, 1)"] * len(names))
+        + " ON DUPLICATE KEY UPDATE version = version + 1",
+        names,
+    )
+
+
+def current(names):
+    cur = extensions.mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+    cur.execute(
+        "SELECT name, version FROM data_versions WHERE name IN ("
+        + ", ".join(["%s"] * len(names))
+        + ")",
+        tuple(names),
+    )
+    found = {row["name"]: row["version"] for row in cur.fetchall()}
+    cur.close()
+    return [found.get(name, 0) for name in names]
+
+
+def for_request(names):
+    """current() lido uma vez por requisição: o ETag e os templates compartilham."""
+    found = g.setdefault("data_versions", {})
+    missing = [name for name in names if name not in found]
+    if missing:
+        found.update(zip(missing, current(missing)))
+    return [found[name] for name in names]
+
+
+def _release():
+    """
+    Identifica o código em execução (APP_RELEASE ou, na falta dele, os
+    templates), para que um deploy com HTML novo não responda 304.
+    """
+    release = current_app.extensions.get("versions_release")
+    if release is None:
+        release = current_app.config.get("APP_RELEASE")
+        if not release:
+            digest = hashlib.sha1()
+            for root, _, files in sorted(os.walk(current_app.template_folder)):
+                for filename in sorted(files):
+                    path = os.path.join(root, filename)
+                    digest.update(f"{path}:{os.path.getmtime(path)}".encode())
+            release = digest.hexdigest()[:10]
+        current_app.extensions["versions_release"] = release
+    return release
+
+
+def conditional(*names):
+    """
+    Decorator de views GET: responde 304 quando o If-None-Match traz a
+    versão atual de `names`; caso contrário gera a página e envia o ETag.
+    """
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            # Mensagens flash pendentes precisam de uma renderização nova
+            if not current_app.config["CONDITIONAL_GET_ENABLED"] or session.get(
+                "_flashes"
+            ):
+                return view(*args, **kwargs)
+
+            etag = "-".join([_release()] + [str(v) for v in for_request(names)])
+            if request.if_none_match.contains_weak(etag):
+                response = make_response("", 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            # O navegador guarda a página, mas sempre revalida antes de usar
+            response.headers["Cache-Control"] = "private, no-cache"
+            return response
+
+        return wrapper
+
+    return decorator